@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark de codecs para las respuestas almacenadas en el cache
+Reporta bytes por entrada y costo de codificación/decodificación para cada
+combinación de serializador, compresión y esquema compacto
+
+Uso:
+    python3 benchmark_codecs.py --iterations 2000
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import itertools
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services', 'cache'))
+
+from codec import ValueCodec, SERIALIZERS, COMPRESSIONS  # noqa: E402
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sample_data.csv')
+
+def load_sample_responses():
+    """Construye respuestas con la misma forma que las que genera el LLM Service"""
+    responses = []
+    with open(DATA_PATH, encoding='utf-8') as f:
+        for i, row in enumerate(csv.DictReader(f), start=1):
+            # Respuesta LLM sintética de tamaño realista (~1024 tokens máx.)
+            llm_response = (row['best_answer'] + ' ') * 12
+            responses.append({
+                'question_id': i,
+                'question_title': row['title'],
+                'question_text': row['question'],
+                'original_answer': row['best_answer'],
+                'llm_response': llm_response,
+                'response_time_ms': 1834,
+                'llm_model': 'gemini-pro',
+                'composite_score': 0.4213,
+                'cosine_similarity': 0.5121,
+                'bleu_score': 0.1187,
+                'length_similarity': 0.0833,
+                'keyword_overlap': 0.2954,
+                'weights': {'cosine': 0.4, 'bleu': 0.3, 'length': 0.1, 'keyword': 0.2},
+                'evaluation_time_ms': 12,
+                'original_length': len(row['best_answer'].split()),
+                'llm_length': len(llm_response.split()),
+                'stored': True
+            })
+    return responses
+
+def measure(codec, responses, iterations):
+    """Devuelve (bytes promedio, µs de encode, µs de decode) por entrada"""
+    encoded = [codec.encode(r) for r in responses]
+    avg_bytes = sum(len(e) for e in encoded) / len(encoded)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for response in responses:
+            codec.encode(response)
+    encode_us = (time.perf_counter() - start) / (iterations * len(responses)) * 1_000_000
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for data in encoded:
+            codec.decode(data)
+    decode_us = (time.perf_counter() - start) / (iterations * len(responses)) * 1_000_000
+
+    return avg_bytes, encode_us, decode_us
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de codecs del cache")
+    parser.add_argument('--iterations', type=int, default=1000)
+    args = parser.parse_args()
+
+    responses = load_sample_responses()
+    legacy_bytes = sum(len(json.dumps(r)) for r in responses) / len(responses)
+
+    print(f"🔬 Benchmark de codecs ({len(responses)} respuestas de ejemplo, {args.iterations} iteraciones)")
+    print(f"   JSON original (json.dumps): {legacy_bytes:.0f} bytes/entrada")
+    print(f"{'codec':<10} {'compresión':<11} {'compacto':<9} {'bytes':>8} {'ratio':>7} {'encode µs':>10} {'decode µs':>10}")
+
+    for serializer, compression, compact in itertools.product(SERIALIZERS, COMPRESSIONS, (False, True)):
+        codec = ValueCodec(serializer, compression, compact_schema=compact)
+        # Se omiten combinaciones no disponibles (dependencia opcional no instalada)
+        if codec.serializer != serializer or codec.compression != compression:
+            continue
+        avg_bytes, encode_us, decode_us = measure(codec, responses, args.iterations)
+        print(f"{serializer:<10} {compression:<11} {str(compact):<9} {avg_bytes:>8.0f} "
+              f"{avg_bytes / legacy_bytes:>7.2f} {encode_us:>10.1f} {decode_us:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del camino de cache hit del servicio de cache
+Compara la latencia p50/p99 del camino original (4 round trips a Redis + POST
+síncrono a storage) contra el camino actual (un único script Lua y notificación
+a storage en segundo plano)
+
+Uso:
+    REDIS_HOST=localhost REDIS_PORT=6380 python3 benchmark_hit_path.py --iterations 5000
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import contextlib
+import requests
+
+# Base de datos de Redis separada para no interferir con el cache real
+os.environ.setdefault('REDIS_DB', '15')
+os.environ.setdefault('REDIS_PORT', '6380')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services', 'cache'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services'))
+
+from app import CacheManager  # noqa: E402
+
+QUESTION_ID = 1
+SAMPLE_RESPONSE = {
+    'question_id': QUESTION_ID,
+    'question_title': 'Sample Question 1',
+    'question_text': 'This is sample question number 1 for testing purposes.',
+    'original_answer': 'This is the sample answer for question 1.',
+    'llm_response': 'Respuesta de ejemplo generada por el LLM. ' * 40,
+    'response_time_ms': 1500,
+    'llm_model': 'gemini-pro',
+    'composite_score': 0.4213,
+}
+
+def percentile(samples, pct):
+    """Percentil por rango más cercano sobre una lista de latencias"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def legacy_hit(manager, question_id, storage_url):
+    """Camino de hit original: un round trip por operación y POST bloqueante"""
+    client = manager.redis_client
+    cache_key = f"question:{question_id}"
+
+    client.incr("stats:total_requests")
+    cached_data = client.get(cache_key)
+    client.zadd("cache:lru", {cache_key: time.time()})
+    client.incr("stats:cache_hits")
+    if storage_url:
+        try:
+            requests.post(f"{storage_url}/question/{question_id}/access",
+                          json={"cache_hit": True}, timeout=5)
+        except Exception:
+            pass
+    return json.loads(cached_data)
+
+def current_hit(manager, question_id, storage_url):
+    """Camino de hit actual del CacheManager"""
+    return manager.process_question_request(question_id)
+
+def run(label, func, manager, iterations, storage_url):
+    """Ejecuta el camino indicado y devuelve las latencias en microsegundos"""
+    samples = []
+    # Se silencian los prints del servicio para no medir la escritura a stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func(manager, QUESTION_ID, storage_url)
+            samples.append((time.perf_counter() - start) * 1_000_000)
+
+    print(f"{label:<10} p50={percentile(samples, 50):8.1f}µs  "
+          f"p99={percentile(samples, 99):8.1f}µs  "
+          f"media={sum(samples) / len(samples):8.1f}µs")
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark del camino de cache hit")
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--storage-url', default=None,
+                        help="Si se indica, el camino original incluye el POST síncrono a storage")
+    args = parser.parse_args()
+
+    # El cliente HTTP de storage se crea con el CacheManager, así que STORAGE_URL debe fijarse antes;
+    # sin storage disponible las notificaciones en segundo plano se descartan
+    os.environ['STORAGE_URL'] = args.storage_url or 'http://127.0.0.1:9'
+    manager = CacheManager()
+    manager.redis_client.flushdb()
+    manager.store_response(QUESTION_ID, dict(SAMPLE_RESPONSE))
+
+    print(f"🔬 Benchmark de cache hit ({args.iterations} iteraciones)")
+    run("antes", legacy_hit, manager, args.iterations, args.storage_url)
+    run("después", current_hit, manager, args.iterations, args.storage_url)
+
+    manager.redis_client.flushdb()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark de políticas de evicción del servicio de cache
+Reproduce una traza Zipf (similar al sesgo de accesos de Yahoo Answers) contra
+cada política disponible y reporta hit ratio y operaciones por segundo
+
+Uso:
+    REDIS_HOST=localhost REDIS_PORT=6380 python3 benchmark_policies.py --requests 20000 --cache-size 100
+"""
+
+import os
+import sys
+import io
+import time
+import random
+import argparse
+import contextlib
+
+# Base de datos de Redis separada para no interferir con el cache real
+os.environ.setdefault('REDIS_DB', '15')
+os.environ.setdefault('REDIS_PORT', '6380')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services', 'cache'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services'))
+
+from app import CacheManager  # noqa: E402
+from policies import CachePolicy  # noqa: E402
+
+def zipf_trace(n_requests, n_questions, alpha, seed):
+    """Genera una secuencia de IDs de pregunta con distribución Zipf"""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank ** alpha) for rank in range(1, n_questions + 1)]
+    ids = list(range(1, n_questions + 1))
+    # Se barajan los IDs para que la popularidad no coincida con el orden
+    rng.shuffle(ids)
+    return rng.choices(ids, weights=weights, k=n_requests)
+
+def run_policy(manager, policy, trace):
+    """Reproduce la traza con la política indicada y devuelve (hit_ratio, ops/s)"""
+    manager.redis_client.flushdb()
+    manager.set_policy(policy)
+
+    hits = 0
+    # Se silencian los prints del servicio para no medir la escritura a stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for question_id in trace:
+            if manager.get_cached_response(question_id) is not None:
+                hits += 1
+            else:
+                manager.store_response(question_id, {'question_id': question_id, 'llm_response': 'x' * 256})
+        elapsed = time.perf_counter() - start
+
+    return hits / len(trace), len(trace) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de políticas de evicción")
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--questions', type=int, default=5000)
+    parser.add_argument('--cache-size', type=int, default=100)
+    parser.add_argument('--alpha', type=float, default=0.9, help="Exponente de la distribución Zipf")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    manager = CacheManager()
+    # Vía configuración compartida: así se recalcula también el tamaño máximo de cada shard
+    manager.update_settings({'max_cache_size': args.cache_size, 'cache_ttl': 3600})
+    trace = zipf_trace(args.requests, args.questions, args.alpha, args.seed)
+
+    print(f"🔬 Benchmark de políticas: {args.requests} solicitudes, {args.questions} preguntas, "
+          f"cache={args.cache_size}, zipf α={args.alpha}")
+    print(f"{'política':<10} {'hit ratio':>10} {'ops/s':>10}")
+    for policy in CachePolicy:
+        hit_ratio, ops_per_second = run_policy(manager, policy, trace)
+        print(f"{policy.value:<10} {hit_ratio:>10.4f} {ops_per_second:>10.0f}")
+
+    manager.redis_client.flushdb()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark del sharding del cache sobre varios nodos Redis
+Carga entradas a través del CacheManager, reporta cómo quedan repartidas entre
+los shards y, si se indica --add-node, mide cuántas claves se remapean y cuánto
+tarda el rebalanceo al agregar un nodo al anillo
+
+Uso (tres redis-server locales):
+    for port in 7001 7002 7003 7004; do redis-server --port $port --save '' --daemonize yes; done
+    REDIS_NODES=localhost:7001,localhost:7002,localhost:7003 python3 benchmark_sharding.py \\
+        --entries 5000 --add-node localhost:7004
+"""
+
+import os
+import sys
+import io
+import time
+import argparse
+import contextlib
+
+# Base de datos de Redis separada para no interferir con el cache real
+os.environ.setdefault('REDIS_DB', '15')
+os.environ.setdefault('REDIS_NODES', 'localhost:7001,localhost:7002,localhost:7003')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services', 'cache'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services'))
+
+from app import CacheManager  # noqa: E402
+from sharding import HashRing  # noqa: E402
+
+SAMPLE_RESPONSE = {
+    'question_title': 'Sample Question',
+    'llm_response': 'Respuesta de ejemplo generada por el LLM. ' * 20,
+    'llm_model': 'gemini-pro',
+    'composite_score': 0.42,
+}
+
+def report(manager):
+    """Imprime el reparto de entradas por shard"""
+    stats = manager.get_cache_stats()
+    print(f"{'shard':<22} {'entradas':>9} {'máximo':>8} {'arco':>7}")
+    for name, shard_stats in stats['shards'].items():
+        print(f"{name:<22} {shard_stats['current_size']:>9} {shard_stats['max_size']:>8} "
+              f"{shard_stats['ring_share']:>7.2%}")
+    print(f"{'total':<22} {stats['current_size']:>9} {stats['max_size']:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del sharding del cache")
+    parser.add_argument('--entries', type=int, default=5000)
+    parser.add_argument('--add-node', default=None, help="Nodo host:port a agregar tras la carga")
+    args = parser.parse_args()
+    os.environ.setdefault('MAX_CACHE_SIZE', str(args.entries * 2))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = CacheManager()
+        manager.clear_cache()
+        start = time.perf_counter()
+        for question_id in range(1, args.entries + 1):
+            manager.store_response(question_id, dict(SAMPLE_RESPONSE, question_id=question_id))
+        elapsed = time.perf_counter() - start
+
+    print(f"🧩 {args.entries} entradas en {len(manager.shards)} shards ({args.entries / elapsed:.0f} escrituras/s)")
+    report(manager)
+
+    if not args.add_node:
+        return
+
+    keys = [manager._generate_cache_key(question_id) for question_id in range(1, args.entries + 1)]
+    ring = HashRing(manager.ring.nodes, vnodes=manager.ring.vnodes)
+    before = {key: ring.get_node(key) for key in keys}
+    ring.add_node(args.add_node)
+    remapped = sum(1 for key in keys if ring.get_node(key) != before[key])
+    print(f"\n➕ Agregando {args.add_node}: {remapped} claves remapeadas "
+          f"({remapped / len(keys):.1%}, ideal {1 / len(ring.nodes):.1%})")
+
+    os.environ['REDIS_NODES'] = ','.join([os.environ['REDIS_NODES'], args.add_node])
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = CacheManager()
+        start = time.perf_counter()
+        while manager.redis_client.hget('config:shard_rebalance', 'status') in (None, 'running'):
+            time.sleep(0.1)
+        elapsed = time.perf_counter() - start
+        hits = sum(1 for question_id in range(1, args.entries + 1)
+                   if manager.get_cached_response(question_id) is not None)
+
+    print(f"🔀 Rebalanceo en {elapsed:.2f}s, {hits}/{args.entries} entradas accesibles tras el cambio")
+    report(manager)
+    manager.clear_cache()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark de throughput de GET /question/<id> del servicio de storage
+Compara el camino original (una conexión nueva a PostgreSQL por petición y SQL
+sin preparar) contra el actual (pool de conexiones y sentencias preparadas),
+atendiendo las peticiones desde varios hilos con el cliente de pruebas de Flask
+
+Uso (con PostgreSQL de docker-compose escuchando en localhost:5432):
+    DB_HOST=localhost python3 benchmark_storage.py --requests 5000 --concurrency 8
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import threading
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'services', 'storage'))
+
+import app as storage  # noqa: E402
+
+def legacy_get_question_by_id(question_id, response_filter=None):
+    """Camino original: conexión nueva por petición y consulta sin preparar"""
+    conn = psycopg2.connect(**storage.db_manager.db_config, cursor_factory=RealDictCursor)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT yq.id, yq.yahoo_id, yq.class_id, yq.title, yq.question, yq.best_answer
+                FROM yahoo_questions yq
+                WHERE yq.id = %(question_id)s
+            """, {'question_id': question_id})
+            result = cursor.fetchone()
+    finally:
+        conn.close()
+    return dict(result) if result else None
+
+def percentile(samples, pct):
+    """Percentil por rango más cercano sobre una lista de latencias"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def run(label, total, concurrency, max_id):
+    """Reparte `total` peticiones entre `concurrency` hilos y reporta throughput y latencias"""
+    samples = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(count):
+        client = storage.app.test_client()
+        local_samples = []
+        local_errors = 0
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.get(f"/question/{random.randint(1, max_id)}")
+            local_samples.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                local_errors += 1
+        with lock:
+            samples.extend(local_samples)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker, args=(total // concurrency,)) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"{label:<10} {len(samples) / elapsed:8.0f} req/s  "
+          f"p50={percentile(samples, 50):7.2f}ms  p99={percentile(samples, 99):7.2f}ms  "
+          f"errores={sum(errors)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de throughput de /question/<id>")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--max-id', type=int, default=100, help="Rango de IDs consultados (1..max-id)")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"🔬 Benchmark de /question/<id> ({args.requests} peticiones, {args.concurrency} hilos)")
+
+    pooled = storage.db_manager.get_question_by_id
+    storage.db_manager.get_question_by_id = legacy_get_question_by_id
+    run("antes", args.requests, args.concurrency, args.max_id)
+
+    storage.db_manager.get_question_by_id = pooled
+    run("después", args.requests, args.concurrency, args.max_id)
+    print(f"🏊 Pool: {storage.db_manager.pool.get_stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del servicio de cache en modo asíncrono (CACHE_SERVER_MODE=asgi)
+Calienta un conjunto de preguntas y mide el throughput de hits mientras un
+flujo concurrente de misses espera al LLM Service
+
+Uso:
+    python3 load_test_async.py --url http://localhost:8002 --concurrency 64 --duration 20
+"""
+
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+import httpx
+
+def percentile(values, p):
+    """Percentil p (0-100) de una lista de latencias"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def warm_up(client, url, hit_ids):
+    """Genera (y cachea) las respuestas de las preguntas que se usarán como hits"""
+    for question_id in hit_ids:
+        response = await client.get(f"{url}/question/{question_id}")
+        if response.status_code != 200 or "error" in response.json():
+            raise SystemExit(f"❌ No se pudo calentar la pregunta {question_id}: {response.text}")
+
+async def hit_worker(client, url, hit_ids, deadline, latencies, rng):
+    """Solicita preguntas cacheadas hasta el deadline y registra la latencia de cada una"""
+    while time.perf_counter() < deadline:
+        question_id = rng.choice(hit_ids)
+        start = time.perf_counter()
+        response = await client.get(f"{url}/question/{question_id}")
+        elapsed = time.perf_counter() - start
+        if response.status_code == 200 and response.json().get('cache_hit'):
+            latencies.append(elapsed)
+
+async def miss_worker(client, url, miss_ids, deadline, counters):
+    """Solicita preguntas no cacheadas (cada una pasa por Storage y LLM)"""
+    while time.perf_counter() < deadline and miss_ids:
+        question_id = miss_ids.pop()
+        try:
+            response = await client.get(f"{url}/question/{question_id}")
+            counters['misses' if response.status_code == 200 else 'errors'] += 1
+        except httpx.HTTPError:
+            counters['errors'] += 1
+
+async def run_phase(url, hit_ids, miss_ids, concurrency, miss_concurrency, duration, seed):
+    """Ejecuta una fase de carga y devuelve (latencias de hits, contadores de misses)"""
+    limits = httpx.Limits(max_connections=concurrency + miss_concurrency,
+                          max_keepalive_connections=concurrency + miss_concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120.0) as client:
+        latencies = []
+        counters = {'misses': 0, 'errors': 0}
+        deadline = time.perf_counter() + duration
+        rng = random.Random(seed)
+        tasks = [hit_worker(client, url, hit_ids, deadline, latencies, rng) for _ in range(concurrency)]
+        tasks += [miss_worker(client, url, miss_ids, deadline, counters) for _ in range(miss_concurrency)]
+        await asyncio.gather(*tasks)
+    return latencies, counters
+
+def report(label, latencies, counters, duration):
+    throughput = len(latencies) / duration
+    p50 = percentile(latencies, 50) * 1000
+    p99 = percentile(latencies, 99) * 1000
+    mean = statistics.mean(latencies) * 1000 if latencies else 0.0
+    print(f"{label:<22} {throughput:>10.0f} {p50:>9.2f} {p99:>9.2f} {mean:>9.2f} "
+          f"{counters['misses']:>7} {counters['errors']:>7}")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del cache asíncrono")
+    parser.add_argument('--url', default='http://localhost:8002')
+    parser.add_argument('--hit-ids', type=int, default=20, help="Preguntas cacheadas antes de medir")
+    parser.add_argument('--concurrency', type=int, default=64, help="Clientes concurrentes solicitando hits")
+    parser.add_argument('--miss-concurrency', type=int, default=16, help="Clientes concurrentes solicitando misses")
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--first-miss-id', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    hit_ids = list(range(1, args.hit_ids + 1))
+    miss_ids = list(range(args.first_miss_id, args.first_miss_id + 100000))
+    random.Random(args.seed).shuffle(miss_ids)
+
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        stats = (await client.get(f"{args.url}/cache/stats")).json()
+        if stats.get('max_size', 0) < args.hit_ids:
+            print(f"⚠️  MAX_CACHE_SIZE={stats.get('max_size')} es menor que --hit-ids, parte de los hits serán misses")
+        print(f"🔥 Calentando {len(hit_ids)} preguntas...")
+        await warm_up(client, args.url, hit_ids)
+
+    print(f"🚀 {args.concurrency} clientes de hits, {args.miss_concurrency} de misses, {args.duration:.0f}s por fase")
+    print(f"{'fase':<22} {'hits/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'media ms':>9} {'misses':>7} {'errores':>7}")
+
+    latencies, counters = await run_phase(args.url, hit_ids, [], args.concurrency, 0,
+                                          args.duration, args.seed)
+    report("solo hits", latencies, counters, args.duration)
+
+    latencies, counters = await run_phase(args.url, hit_ids, miss_ids, args.concurrency, args.miss_concurrency,
+                                          args.duration, args.seed)
+    report("hits + misses", latencies, counters, args.duration)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,109 +3,984 @@
 
 import os
 import json
+import math
 import time
+import random
 import logging
+import queue
+import threading
+import uuid
+import atexit
+import socket
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import redis
-import requests
-from flask import Flask, jsonify, request
-from typing import Dict, Optional, Any
-from enum import Enum
+from flask import Flask, Response, jsonify, request, stream_with_context
+from typing import Dict, Iterator, List, Optional, Any
+from collections import OrderedDict
+from policies import CachePolicy, POLICIES, SIZES_KEY, BYTES_KEY, create_policy
+from codec import ValueCodec
+from sharding import CacheShard, HashRing, split_capacity
+from hotkeys import HotKeyTracker
+from metrics import MetricsRegistry
+from common.service_client import ServiceClient, get_client_stats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-class CachePolicy(Enum):
-    LRU = "lru"
-    LFU = "lfu" 
-    FIFO = "fifo"
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+INVALIDATION_CHANNEL = "cache:invalidations"
+CONFIG_CHANNEL = "cache:config"
+ENTRIES_INDEX_KEY = "cache:entries"
+POLICY_CONFIG_KEY = "config:cache_policy"
+POLICY_MIGRATION_KEY = "config:policy_migration"
+POLICY_MIGRATION_LOCK = "lock:policy_migration"
+NEGATIVE_INDEX_KEY = "cache:negative"
+WARMUP_STATUS_KEY = "cache:warmup"
+WARMUP_LOCK = "lock:warmup"
+SHARD_NODES_KEY = "config:shard_nodes"
+SHARD_REBALANCE_KEY = "config:shard_rebalance"
+SHARD_REBALANCE_LOCK = "lock:shard_rebalance"
+SETTINGS_KEY = "config:cache_settings"
+SETTINGS_CHANNEL = "cache:settings"
+SETTINGS_ENV_KEY = "config:cache_settings_env"
+REPLICAS_KEY = "cache:replicas"
+REPLICA_KEY_PREFIX = "cache:replica:"
+
+REQUEST_METRIC = "cache_request_duration_seconds"
+PHASE_METRIC = "cache_phase_duration_seconds"
+BATCH_METRIC = "cache_batch_duration_seconds"
+EVICTIONS_METRIC = "cache_evictions_total"
+ACCESS_DROPPED_METRIC = "cache_access_notifications_dropped_total"
+
+# Parámetros que todas las réplicas comparten a través de Redis (nombre → tipo)
+SHARED_SETTINGS = {
+    'cache_ttl': int,
+    'soft_ttl': int,
+    'xfetch_beta': float,
+    'max_cache_size': int,
+    'negative_ttl': float,
+    'negative_failure_ttl': float,
+    'negative_max_ttl': float,
+}
+
+# Variable de entorno de la que sale cada parámetro compartido (y la política)
+SETTINGS_ENV = {
+    'cache_ttl': 'CACHE_TTL',
+    'soft_ttl': 'CACHE_SOFT_TTL',
+    'xfetch_beta': 'CACHE_XFETCH_BETA',
+    'max_cache_size': 'MAX_CACHE_SIZE',
+    'negative_ttl': 'NEGATIVE_CACHE_TTL',
+    'negative_failure_ttl': 'NEGATIVE_FAILURE_TTL',
+    'negative_max_ttl': 'NEGATIVE_MAX_TTL',
+    'cache_policy': 'CACHE_POLICY',
+}
+
+STATS_COUNTERS = (
+    "stats:cache_hits",
+    "stats:cache_misses",
+    "stats:total_requests",
+    "stats:coalesced_requests",
+    "stats:stale_hits",
+    "stats:early_refreshes",
+    "stats:background_refreshes",
+    "stats:negative_hits",
+    "stats:negative_stores",
+    "stats:stored_response_hits",
+)
+
+# Métricas que el score service agrega a cada respuesta de /generate-response
+SCORE_FIELDS = (
+    'composite_score',
+    'cosine_similarity',
+    'bleu_score',
+    'length_similarity',
+    'keyword_overlap',
+    'weights',
+    'evaluation_time_ms',
+    'original_length',
+    'llm_length',
+)
+
+def queue_commands(pipe, commands: List[tuple]):
+
+    # Los planes de comandos (método, args, kwargs) se arman sin I/O y sirven igual
+    # para pipelines de redis síncrono y de redis.asyncio
+    for method, args, kwargs in commands:
+        getattr(pipe, method)(*args, **kwargs)
+    return pipe
+
+class InFlightRequest:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+class L1Cache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.pinned = frozenset()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] < time.time():
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, key: str, value: Dict):
+        
+        with self.lock:
+            self.entries[key] = (value, time.time() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                # Las claves calientes fijadas no se desalojan por tamaño, solo por TTL o invalidación
+                victim = next((entry_key for entry_key in self.entries if entry_key not in self.pinned), None)
+                if victim is None:
+                    break
+                del self.entries[victim]
+
+    def pin(self, keys):
+        
+        self.pinned = frozenset(keys)
+
+    def invalidate(self, key: str):
+        
+        with self.lock:
+            if self.entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        
+        with self.lock:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+
+    def get_stats(self) -> Dict:
+        
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'l1_enabled': True,
+                'l1_hits': self.hits,
+                'l1_misses': self.misses,
+                'l1_hit_rate': round(self.hits / lookups, 4) if lookups > 0 else 0,
+                'l1_size': len(self.entries),
+                'l1_max_size': self.max_entries,
+                'l1_ttl': self.ttl,
+                'l1_invalidations': self.invalidations,
+                'l1_pinned': len(self.pinned)
+            }
 
 class CacheManager:
     def __init__(self):
-        self.redis_client = redis.Redis(
-            host=os.getenv('REDIS_HOST', 'localhost'),
-            port=int(os.getenv('REDIS_PORT', 6379)),
-            db=0,
-            decode_responses=True
-        )
+        nodes = os.getenv('REDIS_NODES') or f"{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', 6379)}"
+        addresses = dict.fromkeys(address.strip() for address in nodes.split(',') if address.strip())
+        self.shards = [CacheShard.from_address(address, int(os.getenv('REDIS_DB', 0))) for address in addresses]
+        self.shards_by_name = {shard.name: shard for shard in self.shards}
+        self.ring = HashRing(self.shards_by_name, vnodes=int(os.getenv('REDIS_VIRTUAL_NODES', 160)))
+        # El primer nodo aloja además las claves de coordinación (política, precarga, canales)
+        self.redis_client = self.shards[0].client
+        self.metrics = MetricsRegistry()
+        self.metrics.describe(REQUEST_METRIC, "Latencia de GET /question por resultado (hit, miss, error)")
+        self.metrics.describe(PHASE_METRIC, "Latencia de cada fase de una consulta al cache")
+        self.metrics.describe(BATCH_METRIC, "Latencia de POST /questions/batch completo")
+        self.metrics.describe(EVICTIONS_METRIC, "Entradas desalojadas por la política de evicción")
+        self.metrics.describe('cache_inflight_requests', "Generaciones en curso en esta réplica")
+        self.metrics.describe('cache_access_queue_depth', "Notificaciones de acceso pendientes hacia storage")
+        self.metrics.describe(ACCESS_DROPPED_METRIC, "Notificaciones de acceso descartadas (cola llena o error de storage)")
+        self.metrics.describe('cache_l1_entries', "Entradas en el cache L1 en memoria")
+        self.metrics.describe('cache_hot_keys', "Claves calientes detectadas")
+        self.metrics.describe('cache_entries', "Entradas vigentes por shard")
+        self.metrics.describe('cache_bytes', "Bytes ocupados por shard")
+        self.metrics.describe('cache_negative_entries', "Entradas del cache negativo por shard")
+
         self.storage_url = os.getenv('STORAGE_URL', 'http://storage:8000')
         self.llm_url = os.getenv('LLM_URL', 'http://llm:8000')
+        self.storage_client = ServiceClient.from_env('storage', self.storage_url, pool_size=20, read_timeout=5.0)
+        self.llm_client = ServiceClient.from_env('llm', self.llm_url, pool_size=20, read_timeout=60.0, retries=1)
 
         self.cache_ttl = int(os.getenv('CACHE_TTL', 3600))
+        self.soft_ttl = int(os.getenv('CACHE_SOFT_TTL', 0))
+        self.xfetch_beta = float(os.getenv('CACHE_XFETCH_BETA', 1.0))
+        self.negative_ttl = float(os.getenv('NEGATIVE_CACHE_TTL', 60))
+        self.negative_failure_ttl = float(os.getenv('NEGATIVE_FAILURE_TTL', 5))
+        self.negative_max_ttl = float(os.getenv('NEGATIVE_MAX_TTL', 120))
+        self.negative_jitter = float(os.getenv('NEGATIVE_TTL_JITTER', 0.2))
+        self.stored_responses_enabled = os.getenv('STORED_RESPONSES_ENABLED', 'true').lower() == 'true'
+        self.stored_response_filter = {'include_response': 'true'}
+        if os.getenv('STORED_RESPONSE_MIN_QUALITY'):
+            self.stored_response_filter['min_quality'] = float(os.getenv('STORED_RESPONSE_MIN_QUALITY'))
+        if os.getenv('STORED_RESPONSE_MAX_AGE'):
+            self.stored_response_filter['max_age'] = float(os.getenv('STORED_RESPONSE_MAX_AGE'))
         self.max_cache_size = int(os.getenv('MAX_CACHE_SIZE', 1000))
+        self.max_cache_bytes = int(os.getenv('MAX_CACHE_BYTES', 0))
         self.cache_policy = CachePolicy(os.getenv('CACHE_POLICY', 'lru'))
+        self.migration_batch_size = int(os.getenv('POLICY_MIGRATION_BATCH', 100))
+        self.migration_rate = float(os.getenv('POLICY_MIGRATION_RATE', 1000))
+        self.codec = ValueCodec(
+            serializer=os.getenv('CACHE_CODEC', 'json'),
+            compression=os.getenv('CACHE_COMPRESSION', 'none'),
+            compression_min_bytes=int(os.getenv('CACHE_COMPRESSION_MIN_BYTES', 512)),
+            compact_schema=os.getenv('CACHE_COMPACT_SCHEMA', 'false').lower() == 'true'
+        )
+
+        self.replica_id = os.getenv('CACHE_REPLICA_ID') or f"{socket.gethostname()}:{os.getpid()}"
+        self.started_at = time.time()
+        self.heartbeat_interval = float(os.getenv('REPLICA_HEARTBEAT_INTERVAL', 5))
 
         self._init_stats_counters()
+        migrate_policy = self._init_shared_policy()
+        self._init_shared_settings()
+        self._resize_shards()
+
+        self.set_policy(self.cache_policy)
+        self._release_lock_script = self.redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        if migrate_policy:
+            threading.Thread(target=self._migrate_policy_metadata, daemon=True).start()
+
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
+        self.single_flight_lock_ttl_ms = int(float(os.getenv('SINGLE_FLIGHT_LOCK_TTL', 30)) * 1000)
+        self.single_flight_wait_timeout = float(os.getenv('SINGLE_FLIGHT_WAIT_TIMEOUT', 30))
+
+        self.refreshing = set()
+        self.refresh_executor = ThreadPoolExecutor(max_workers=int(os.getenv('CACHE_REFRESH_WORKERS', 4)))
+
+        self.warmup_batch_size = int(os.getenv('WARMUP_BATCH_SIZE', 50))
+        self.warmup_rate = float(os.getenv('WARMUP_RATE', 500))
+
+        self.batch_max_ids = int(os.getenv('BATCH_MAX_IDS', 100))
+        self.batch_executor = ThreadPoolExecutor(max_workers=int(os.getenv('BATCH_LLM_CONCURRENCY', 8)))
+
+        self.access_queue = queue.Queue(maxsize=int(os.getenv('ACCESS_QUEUE_SIZE', 10000)))
+        # Storage acepta hasta MAX_BULK_IDS accesos por lote (1000 por defecto)
+        self.access_batch_size = int(os.getenv('ACCESS_BATCH_SIZE', 500))
+        threading.Thread(target=self._access_notifier_loop, daemon=True).start()
+
+        self.hot_keys = None
+        if os.getenv('HOT_KEYS_ENABLED', 'true').lower() == 'true':
+            self.hot_keys = HotKeyTracker(
+                capacity=int(os.getenv('HOT_KEY_CAPACITY', 128)),
+                threshold=float(os.getenv('HOT_KEY_THRESHOLD', 0.02)),
+                max_hot=int(os.getenv('HOT_KEY_MAX', 16)),
+                min_requests=float(os.getenv('HOT_KEY_MIN_REQUESTS', 200)),
+                decay=float(os.getenv('HOT_KEY_DECAY', 0.5))
+            )
+        self.hot_key_interval = float(os.getenv('HOT_KEY_INTERVAL', 1.0))
+        self.hot_key_replica_ttl = float(os.getenv('HOT_KEY_REPLICA_TTL', 30))
+
+        l1_size = int(os.getenv('L1_CACHE_SIZE', 0))
+        self.l1_cache = L1Cache(l1_size, float(os.getenv('L1_CACHE_TTL', 30))) if l1_size > 0 else None
+        self.l1_flush_interval = float(os.getenv('L1_STATS_FLUSH_INTERVAL', 1.0))
+        self.l1_pending_hits = {}
+        self.l1_pending_lock = threading.Lock()
+        for shard in self.shards:
+            threading.Thread(target=self._pubsub_listener_loop, args=(shard,), daemon=True).start()
+        if self.l1_cache or self.hot_keys:
+            threading.Thread(target=self._l1_flush_loop, daemon=True).start()
+        if self.hot_keys:
+            threading.Thread(target=self._hot_key_loop, daemon=True).start()
+        if os.getenv('CACHE_WARMUP_ON_START', 'false').lower() == 'true':
+            threading.Thread(target=self._startup_warmup, daemon=True).start()
+        self._check_shard_membership()
+        threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+        atexit.register(self._deregister_replica)
         
-        logger.info(f"Cache configurado: TTL={self.cache_ttl}s, Max={self.max_cache_size}, Policy={self.cache_policy.value}")
+        logger.info(f"Cache configurado: TTL={self.cache_ttl}s, Soft TTL={self.soft_ttl or '-'}s, "
+                    f"Max={self.max_cache_size}, Policy={self.cache_policy.value}, "
+                    f"Shards={','.join(self.shards_by_name)}, Réplica={self.replica_id}")
 
     def _init_stats_counters(self):
         
-        if not self.redis_client.exists("stats:cache_hits"):
-            self.redis_client.set("stats:cache_hits", 0)
-        if not self.redis_client.exists("stats:cache_misses"):
-            self.redis_client.set("stats:cache_misses", 0)
-        if not self.redis_client.exists("stats:total_requests"):
-            self.redis_client.set("stats:total_requests", 0)
+        for shard in self.shards:
+            for counter in STATS_COUNTERS:
+                shard.client.set(counter, 0, nx=True)
+
+    def _explicit_env(self, names) -> Dict[str, str]:
+        
+        return {name: os.environ[SETTINGS_ENV[name]] for name in names if SETTINGS_ENV[name] in os.environ}
+
+    def _init_shared_policy(self) -> bool:
+        
+        # Redis persiste la configuración entre reinicios: una CACHE_POLICY fijada explícitamente
+        # se impone cuando cambia respecto de la última aplicada (config:cache_settings_env);
+        # si no cambió, se respeta la política cambiada en caliente vía /cache/policy
+        env_policy = self._explicit_env(['cache_policy']).get('cache_policy')
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.get(POLICY_CONFIG_KEY)
+        pipe.hget(SETTINGS_ENV_KEY, 'cache_policy')
+        stored_policy, applied_env = pipe.execute()
+        if env_policy is not None and env_policy != applied_env:
+            self.redis_client.hset(SETTINGS_ENV_KEY, 'cache_policy', env_policy)
+
+        if stored_policy is None:
+            self.redis_client.set(POLICY_CONFIG_KEY, self.cache_policy.value, nx=True)
+            return False
+        if env_policy is not None and env_policy != applied_env:
+            if stored_policy == self.cache_policy.value:
+                return False
+            logger.warning(f"CACHE_POLICY={env_policy} reemplaza la política compartida {stored_policy}")
+            self._mark_migration_pending(self.cache_policy)
+            self.redis_client.set(POLICY_CONFIG_KEY, self.cache_policy.value)
+            self.redis_client.publish(CONFIG_CHANNEL, self.cache_policy.value)
+            return True
+        try:
+            if CachePolicy(stored_policy) != self.cache_policy:
+                message = f"Usando política compartida {stored_policy} en lugar de {self.cache_policy.value}"
+                if env_policy is not None:
+                    logger.warning(f"{message} (CACHE_POLICY={env_policy} ya aplicada, cambiada luego en caliente)")
+                else:
+                    logger.info(message)
+            self.cache_policy = CachePolicy(stored_policy)
+        except ValueError:
+            logger.warning(f"Política compartida inválida en Redis: {stored_policy}")
+        return False
+
+    def _init_shared_settings(self):
+        
+        explicit = self._explicit_env(SHARED_SETTINGS)
+        pipe = self.redis_client.pipeline(transaction=False)
+        for name in SHARED_SETTINGS:
+            pipe.hsetnx(SETTINGS_KEY, name, getattr(self, name))
+        pipe.hgetall(SETTINGS_KEY)
+        pipe.hgetall(SETTINGS_ENV_KEY)
+        stored_settings, applied_env = pipe.execute()[-2:]
+
+        # Igual que con la política: el entorno explícito gana si cambió desde la última vez que se aplicó
+        fingerprint = {}
+        overrides = {}
+        for name, raw in explicit.items():
+            value = getattr(self, name)
+            try:
+                differs = SHARED_SETTINGS[name](stored_settings.get(name)) != value
+            except (TypeError, ValueError):
+                differs = True
+            if applied_env.get(name) == raw:
+                if differs:
+                    logger.warning(f"{SETTINGS_ENV[name]}={raw} difiere del valor compartido "
+                                   f"{name}={stored_settings.get(name)} (cambiado en caliente), se usa el compartido")
+                continue
+            fingerprint[name] = raw
+            if differs:
+                overrides[name] = value
+
+        if fingerprint:
+            self.redis_client.hset(SETTINGS_ENV_KEY, mapping=fingerprint)
+        if overrides:
+            logger.warning(f"Configuración de entorno aplicada sobre la compartida: {overrides}")
+            self.redis_client.hset(SETTINGS_KEY, mapping=overrides)
+            self.redis_client.publish(SETTINGS_CHANNEL, self.replica_id)
+            stored_settings.update({name: str(value) for name, value in overrides.items()})
+
+        changed = self._apply_shared_settings(stored_settings)
+        if changed:
+            logger.info(f"Usando configuración compartida en lugar de la local: {changed}")
+
+    def _apply_shared_settings(self, settings: Dict[str, str]) -> Dict[str, Any]:
+        
+        changed = {}
+        for name, value in settings.items():
+            cast = SHARED_SETTINGS.get(name)
+            if cast is None:
+                continue
+            try:
+                value = cast(value)
+            except ValueError:
+                logger.warning(f"Valor compartido inválido en Redis para {name}: {value}")
+                continue
+            if value != getattr(self, name):
+                setattr(self, name, value)
+                changed[name] = value
+        if 'max_cache_size' in changed:
+            self._resize_shards()
+        return changed
+
+    def update_settings(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        
+        self.redis_client.hset(SETTINGS_KEY, mapping=settings)
+        self.redis_client.publish(SETTINGS_CHANNEL, self.replica_id)
+        changed = self._apply_shared_settings({name: str(value) for name, value in settings.items()})
+        print(f"⚙️  Configuración compartida actualizada: {changed or 'sin cambios'}")
+        return changed
+
+    def get_settings(self) -> Dict[str, Any]:
+        
+        return {name: getattr(self, name) for name in SHARED_SETTINGS}
+
+    def _resize_shards(self):
+        
+        # Con límites redondeados hacia arriba N shards podían superar MAX_CACHE_SIZE en total
+        sizes = split_capacity(self.max_cache_size, len(self.shards))
+        budgets = split_capacity(self.max_cache_bytes, len(self.shards))
+        for shard, max_size, max_bytes in zip(self.shards, sizes, budgets):
+            shard.max_size = max_size
+            shard.max_bytes = max_bytes
+
+    def _replica_info(self) -> Dict:
+        
+        with self.inflight_lock:
+            inflight = len(self.inflight)
+            refreshing = len(self.refreshing)
+        return {
+            'replica_id': self.replica_id,
+            'hostname': socket.gethostname(),
+            'pid': os.getpid(),
+            'mode': os.getenv('CACHE_SERVER_MODE', 'wsgi'),
+            'started_at': self.started_at,
+            'heartbeat_at': time.time(),
+            'policy': self.cache_policy.value,
+            'settings': self.get_settings(),
+            'inflight': inflight,
+            'refreshing': refreshing,
+            'access_queue': self.access_queue.qsize(),
+            'l1': self.l1_cache.get_stats() if self.l1_cache else {'l1_enabled': False},
+            'http_clients': get_client_stats()
+        }
+
+    def _heartbeat(self):
+        
+        now = time.time()
+        expiry = self.heartbeat_interval * 3
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.set(REPLICA_KEY_PREFIX + self.replica_id, json.dumps(self._replica_info()), px=int(expiry * 1000))
+        pipe.zadd(REPLICAS_KEY, {self.replica_id: now})
+        pipe.zremrangebyscore(REPLICAS_KEY, '-inf', now - expiry)
+        pipe.execute()
+
+    def _heartbeat_loop(self):
+        
+        while True:
+            try:
+                self._heartbeat()
+            except Exception as e:
+                logger.warning(f"Error publicando heartbeat de la réplica {self.replica_id}: {e}")
+            try:
+                self._resume_pending_migration()
+            except Exception as e:
+                logger.warning(f"Error revisando la migración de política pendiente: {e}")
+            time.sleep(self.heartbeat_interval)
+
+    def _deregister_replica(self):
+        
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.zrem(REPLICAS_KEY, self.replica_id)
+            pipe.delete(REPLICA_KEY_PREFIX + self.replica_id)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Error dando de baja la réplica {self.replica_id}: {e}")
+
+    def get_replicas(self) -> Dict[str, Dict]:
+        
+        now = time.time()
+        replica_ids = self.redis_client.zrangebyscore(REPLICAS_KEY, now - self.heartbeat_interval * 3, '+inf')
+        if not replica_ids:
+            return {}
+        values = self.redis_client.mget([REPLICA_KEY_PREFIX + replica_id for replica_id in replica_ids])
+        return {replica_id: json.loads(value) for replica_id, value in zip(replica_ids, values) if value}
+
+    def _aggregate_replicas(self, replicas: Dict[str, Dict]) -> Dict:
+        
+        l1_hits = sum(info['l1'].get('l1_hits', 0) for info in replicas.values())
+        l1_misses = sum(info['l1'].get('l1_misses', 0) for info in replicas.values())
+        upstream = {}
+        for info in replicas.values():
+            for name, client_stats in info['http_clients'].items():
+                totals = upstream.setdefault(name, {'requests': 0, 'errors': 0, 'retries': 0})
+                for counter in totals:
+                    totals[counter] += client_stats.get(counter, 0)
+
+        now = time.time()
+        return {
+            'replica_count': len(replicas),
+            'policy_consistent': len({info['policy'] for info in replicas.values()}) <= 1,
+            'settings_consistent': len({json.dumps(info['settings'], sort_keys=True)
+                                        for info in replicas.values()}) <= 1,
+            'inflight': sum(info['inflight'] for info in replicas.values()),
+            'refreshing': sum(info['refreshing'] for info in replicas.values()),
+            'access_queue': sum(info['access_queue'] for info in replicas.values()),
+            'l1_hits': l1_hits,
+            'l1_misses': l1_misses,
+            'l1_hit_rate': round(l1_hits / (l1_hits + l1_misses), 4) if l1_hits + l1_misses > 0 else 0,
+            'upstream': upstream,
+            'replicas': {
+                replica_id: {
+                    'mode': info['mode'],
+                    'policy': info['policy'],
+                    'inflight': info['inflight'],
+                    'uptime_s': round(now - info['started_at'], 1),
+                    'heartbeat_age_s': round(now - info['heartbeat_at'], 1)
+                }
+                for replica_id, info in replicas.items()
+            }
+        }
 
     def _generate_cache_key(self, question_id: int) -> str:
         
         return f"question:{question_id}"
 
-    def _update_access_metadata(self, cache_key: str):
+    def _negative_key(self, question_id: int) -> str:
+        
+        return f"negative:question:{question_id}"
+
+    def _failures_key(self, question_id: int) -> str:
+        
+        return f"negative:failures:{question_id}"
+
+    def _shard_for_key(self, cache_key: str) -> CacheShard:
+        
+        return self.shards_by_name[self.ring.get_node(cache_key)]
+
+    def _shard(self, question_id: int) -> CacheShard:
         
-        if self.cache_policy == CachePolicy.LRU:
+        # Todas las claves de una pregunta (entrada, negativo, lock) viven en el shard de question:<id>
+        return self._shard_for_key(self._generate_cache_key(question_id))
 
-            self.redis_client.zadd("cache:lru", {cache_key: time.time()})
-        elif self.cache_policy == CachePolicy.LFU:
+    def _group_by_shard(self, question_ids: List[int]) -> Dict[CacheShard, List[int]]:
+        
+        groups = {}
+        for question_id in question_ids:
+            groups.setdefault(self._shard(question_id), []).append(question_id)
+        return groups
+
+    def _notify_access(self, question_id: int, cache_hit: bool):
+        
+        try:
+            self.access_queue.put_nowait((question_id, cache_hit))
+        except queue.Full:
+            self.metrics.inc(ACCESS_DROPPED_METRIC, reason='queue_full')
+            logger.warning(f"Cola de notificaciones llena, descartando acceso a pregunta {question_id}")
 
-            self.redis_client.zincrby("cache:lfu", 1, cache_key)
+    def _drain_access_queue(self) -> Dict[int, List[int]]:
+        
+        # Espera la primera notificación y se lleva las que se acumularon mientras tanto,
+        # agregadas por pregunta: [accesos, cache hits]
+        question_id, cache_hit = self.access_queue.get()
+        counts = {question_id: [1, int(cache_hit)]}
+        drained = 1
+        while drained < self.access_batch_size:
+            try:
+                question_id, cache_hit = self.access_queue.get_nowait()
+            except queue.Empty:
+                break
+            entry = counts.setdefault(question_id, [0, 0])
+            entry[0] += 1
+            entry[1] += int(cache_hit)
+            drained += 1
+        return counts
 
-    def _enforce_cache_limit(self):
+    def _access_notifier_loop(self):
         
-        current_size = self.redis_client.dbsize()
+        # Un POST por lote en vez de uno por hit: el ritmo de notificaciones ya no queda
+        # atado a 1/RTT contra storage, que además agrega los contadores de su lado
+        while True:
+            counts = self._drain_access_queue()
+            accesses = [{'question_id': question_id, 'count': count, 'cache_hits': hits}
+                        for question_id, (count, hits) in counts.items()]
+            try:
+                self.storage_client.post("/questions/access", json={'accesses': accesses}).raise_for_status()
+            except Exception as e:
+                dropped = sum(count for count, _ in counts.values())
+                self.metrics.inc(ACCESS_DROPPED_METRIC, dropped, reason='error')
+                logger.warning(f"Error actualizando stats de acceso de {len(counts)} preguntas ({dropped} accesos): {e}")
+
+    def _apply_shared_policy(self, policy_name: Optional[str]):
         
-        if current_size <= self.max_cache_size:
+        try:
+            policy = CachePolicy(policy_name)
+        except ValueError:
+            logger.warning(f"Política recibida inválida: {policy_name}")
             return
+        if policy != self.cache_policy:
+            print(f"🔀 Política de cache cambiada a {policy.value} por otra réplica")
+            logger.info(f"Política de cache sincronizada: {policy.value}")
+            self.set_policy(policy)
 
-        to_remove = current_size - self.max_cache_size + 10
+    def _pubsub_listener_loop(self, shard: CacheShard):
         
-        if self.cache_policy == CachePolicy.LRU:
+        is_primary = shard is self.shards[0]
+        if not is_primary and not self.l1_cache:
+            return
+        expired_channel = f"__keyevent@{shard.db}__:expired"
+        while True:
+            try:
+                channels = [CONFIG_CHANNEL, SETTINGS_CHANNEL] if is_primary else []
+                if self.l1_cache:
+                    try:
+                        shard.client.config_set('notify-keyspace-events', 'Ex')
+                    except Exception as e:
+                        logger.warning(f"No se pudieron activar keyspace notifications en {shard.name}, "
+                                       f"L1 depende de su TTL: {e}")
+                    channels += [INVALIDATION_CHANNEL, expired_channel]
 
-            old_keys = self.redis_client.zrange("cache:lru", 0, to_remove - 1)
-            for key in old_keys:
-                self.redis_client.delete(key)
-                self.redis_client.zrem("cache:lru", key)
-                logger.debug(f"Removido por LRU: {key}")
-                
-        elif self.cache_policy == CachePolicy.LFU:
+                pubsub = shard.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(*channels)
+                if self.l1_cache:
+                    self.l1_cache.clear()
+                if is_primary:
+                    stored_policy = self.redis_client.get(POLICY_CONFIG_KEY)
+                    if stored_policy:
+                        self._apply_shared_policy(stored_policy)
+                    self._apply_shared_settings(self.redis_client.hgetall(SETTINGS_KEY))
 
-            old_keys = self.redis_client.zrange("cache:lfu", 0, to_remove - 1)
-            for key in old_keys:
-                self.redis_client.delete(key)
-                self.redis_client.zrem("cache:lfu", key)
-                logger.debug(f"Removido por LFU: {key}")
-                
-        elif self.cache_policy == CachePolicy.FIFO:
+                for message in pubsub.listen():
+                    data = message.get('data')
+                    if message.get('channel') == CONFIG_CHANNEL:
+                        self._apply_shared_policy(data)
+                    elif message.get('channel') == SETTINGS_CHANNEL:
+                        if data != self.replica_id:
+                            changed = self._apply_shared_settings(self.redis_client.hgetall(SETTINGS_KEY))
+                            if changed:
+                                print(f"⚙️  Configuración cambiada por otra réplica: {changed}")
+                    elif data == '*':
+                        self.l1_cache.clear()
+                    elif isinstance(data, str):
+                        self.l1_cache.invalidate(data)
+            except Exception as e:
+                logger.error(f"Error en listener pub/sub de {shard.name}: {e}")
+                if self.l1_cache:
+                    self.l1_cache.clear()
+                time.sleep(1)
+
+    def _record_deferred_hit(self, cache_key: str):
+        
+        # Hits servidos sin pasar por el shard dueño (L1 o réplica caliente); se aplican en lote
+        # a su política para que la recencia/frecuencia de la clave no se pierda
+        with self.l1_pending_lock:
+            self.l1_pending_hits[cache_key] = self.l1_pending_hits.get(cache_key, 0) + 1
+
+    def _l1_flush_loop(self):
+        
+        while True:
+            time.sleep(self.l1_flush_interval)
+            with self.l1_pending_lock:
+                pending, self.l1_pending_hits = self.l1_pending_hits, {}
+            if not pending:
+                continue
 
-            old_keys = self.redis_client.zrange("cache:fifo", 0, to_remove - 1)
-            for key in old_keys:
-                self.redis_client.delete(key)
-                self.redis_client.zrem("cache:fifo", key)
-                logger.debug(f"Removido por FIFO: {key}")
+            by_shard = {}
+            for cache_key, hits in pending.items():
+                by_shard.setdefault(self._shard_for_key(cache_key), {})[cache_key] = hits
+            for shard, hits in by_shard.items():
+                try:
+                    shard.policy.touch_many(hits, shard.max_size, time.time(), ENTRIES_INDEX_KEY)
+                except Exception as e:
+                    logger.warning(f"Error sincronizando hits de L1 con {shard.name}: {e}")
+
+    def _hot_replica_key(self, question_id: int) -> str:
+        
+        return f"hot:{self._generate_cache_key(question_id)}"
+
+    def _hot_replica_drops(self, owner: CacheShard, cache_keys: List) -> List[tuple]:
+        
+        # Las copias calientes no cuentan en cache:bytes ni las ve la política: al desalojar
+        # la entrada principal hay que borrarlas, o se seguirían sirviendo hasta su TTL
+        if len(self.shards) == 1 or not cache_keys:
+            return []
+        replica_keys = [f"hot:{key.decode() if isinstance(key, bytes) else key}" for key in cache_keys]
+        return [(shard, replica_keys) for shard in self.shards if shard is not owner]
+
+    def _drop_hot_replicas(self, owner: CacheShard, cache_keys: List):
+        
+        for shard, replica_keys in self._hot_replica_drops(owner, cache_keys):
+            shard.raw.unlink(*replica_keys)
+
+    def _is_replicated(self, question_id: int) -> bool:
+        
+        return bool(self.hot_keys) and len(self.shards) > 1 and self.hot_keys.is_hot(question_id)
+
+    def _hot_replica_shards(self, question_id: int) -> List[CacheShard]:
+        
+        owner = self._shard(question_id)
+        return [shard for shard in self.shards if shard is not owner]
+
+    def _pick_hot_replica(self, question_id: int) -> Optional[CacheShard]:
+        
+        if not self._is_replicated(question_id):
+            return None
+        # Reparte las lecturas de la clave caliente entre todos los shards (el dueño incluido)
+        shard = random.choice(self.shards)
+        return None if shard is self._shard(question_id) else shard
+
+    def _replicate_hot_key(self, question_id: int, encoded: Optional[bytes] = None, ttl_ms: Optional[int] = None):
+        
+        owner = self._shard(question_id)
+        if encoded is None:
+            pipe = owner.raw.pipeline(transaction=False)
+            pipe.get(self._generate_cache_key(question_id))
+            pipe.pttl(self._generate_cache_key(question_id))
+            encoded, ttl_ms = pipe.execute()
+            if encoded is None or ttl_ms <= 0:
+                return
+        ttl_ms = min(ttl_ms, int(self.hot_key_replica_ttl * 1000))
+        for shard in self._hot_replica_shards(question_id):
+            shard.raw.set(self._hot_replica_key(question_id), encoded, px=ttl_ms)
+
+    def _hot_key_loop(self):
+        
+        while True:
+            time.sleep(self.hot_key_interval)
+            try:
+                heated, cooled = self.hot_keys.refresh()
+                hot = self.hot_keys.hot
+                if heated:
+                    print(f"🔥 Claves calientes detectadas: {sorted(heated)}")
+                    logger.info(f"Claves calientes: {sorted(hot)}")
+                if self.l1_cache and (heated or cooled):
+                    self.l1_cache.pin(self._generate_cache_key(question_id) for question_id in hot)
+                if len(self.shards) > 1:
+                    # Se re-replican en cada ciclo para que la copia no caduque mientras siga caliente
+                    for question_id in hot:
+                        self._replicate_hot_key(question_id)
+            except Exception as e:
+                logger.warning(f"Error actualizando claves calientes: {e}")
+
+    def set_policy(self, policy: CachePolicy):
+        
+        for shard in self.shards:
+            shard.policy = create_policy(policy, shard.raw)
+        self.cache_policy = policy
+
+    def change_policy(self, policy: CachePolicy):
+        
+        previous_policy = self.cache_policy
+        self.set_policy(policy)
+        if previous_policy != policy:
+            self._mark_migration_pending(policy)
+        self.redis_client.set(POLICY_CONFIG_KEY, policy.value)
+        self.redis_client.publish(CONFIG_CHANNEL, policy.value)
+
+        if previous_policy != policy:
+            print(f"🔀 Política de cache cambiada: {previous_policy.value} → {policy.value}, migrando metadata...")
+            threading.Thread(target=self._migrate_policy_metadata, daemon=True).start()
+
+    def _mark_migration_pending(self, policy: CachePolicy):
+        
+        # Marca persistente: si nadie llega a completar la migración, cualquier réplica la retoma
+        self.redis_client.hset(POLICY_MIGRATION_KEY, mapping={'status': 'pending', 'policy': policy.value})
+
+    def _resume_pending_migration(self):
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hget(POLICY_MIGRATION_KEY, 'status')
+        pipe.exists(POLICY_MIGRATION_LOCK)
+        status, locked = pipe.execute()
+        if status in ('pending', 'running', 'failed') and not locked:
+            logger.warning(f"Migración de política {status} sin réplica a cargo, retomándola")
+            threading.Thread(target=self._migrate_policy_metadata, daemon=True).start()
+
+    def _migrate_policy_metadata(self):
+        
+        token = uuid.uuid4().hex
+        if not self.redis_client.set(POLICY_MIGRATION_LOCK, token, nx=True, ex=60):
+            logger.info("Migración de política ya en curso en otra réplica")
+            return
+
+        try:
+            # Si la réplica que migraba murió, su shard y cursor quedaron guardados: se retoma desde ahí
+            saved = self.redis_client.hgetall(POLICY_MIGRATION_KEY)
+            target = None
+            shard_index = 0
+            cursor = 0
+            migrated = 0
+            while True:
+                stored_policy = CachePolicy(self.redis_client.get(POLICY_CONFIG_KEY) or self.cache_policy.value)
+                if stored_policy != target:
+                    target = stored_policy
+                    policies = {shard: create_policy(target, shard.raw) for shard in self.shards}
+                    shard_index = 0
+                    cursor = 0
+                    migrated = 0
+                    if (saved.get('status') in ('running', 'failed') and saved.get('policy') == target.value
+                            and saved.get('shard') in self.shards_by_name):
+                        shard_index = self.shards.index(self.shards_by_name[saved['shard']])
+                        cursor = int(saved.get('cursor', 0))
+                        migrated = int(saved.get('migrated', 0))
+                        print(f"🔀 Retomando migración de política a {target.value} en {saved['shard']}")
+                        self.redis_client.hset(POLICY_MIGRATION_KEY, 'status', 'running')
+                    else:
+                        self.redis_client.hset(POLICY_MIGRATION_KEY, mapping={
+                            'status': 'running', 'policy': target.value, 'migrated': 0,
+                            'shard': self.shards[0].name, 'cursor': 0,
+                            'started_at': time.time(), 'finished_at': ''
+                        })
+                    saved = {}
+
+                shard = self.shards[shard_index]
+                cursor, entries = shard.client.zscan(ENTRIES_INDEX_KEY, cursor, count=self.migration_batch_size)
+                if entries:
+                    migrated += policies[shard].adopt_many([key for key, _ in entries], self.cache_ttl,
+                                                           shard.max_size, time.time(), ENTRIES_INDEX_KEY)
+
+                if cursor == 0:
+                    shard_index += 1
+                    if (shard_index == len(self.shards) and
+                            self.redis_client.get(POLICY_CONFIG_KEY) in (None, target.value)):
+                        break
+                    shard_index %= len(self.shards)
+                self.redis_client.hset(POLICY_MIGRATION_KEY, mapping={
+                    'migrated': migrated, 'shard': self.shards[shard_index].name, 'cursor': cursor
+                })
+                self.redis_client.expire(POLICY_MIGRATION_LOCK, 60)
+                time.sleep(max(len(entries), 1) / self.migration_rate)
+
+            stale_keys = [key for p, policy_class in POLICIES.items() if p != target
+                          for key in policy_class.metadata_keys()]
+            for shard in self.shards:
+                shard.client.unlink(*stale_keys)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(POLICY_MIGRATION_KEY, mapping={'status': 'completed', 'migrated': migrated,
+                                                     'finished_at': time.time()})
+            pipe.hdel(POLICY_MIGRATION_KEY, 'shard', 'cursor')
+            pipe.execute()
+            print(f"✅ Migración de política a {target.value} completada: {migrated} entradas")
+            logger.info(f"Migración de política a {target.value} completada: {migrated} entradas")
+        except Exception as e:
+            logger.error(f"Error migrando metadata de política: {e}")
+            self.redis_client.hset(POLICY_MIGRATION_KEY, 'status', 'failed')
+        finally:
+            self._release_lock(POLICY_MIGRATION_LOCK, token)
+
+        if target and self.redis_client.get(POLICY_CONFIG_KEY) not in (None, target.value):
+            self._migrate_policy_metadata()
+
+    def _check_shard_membership(self):
+        
+        try:
+            stored_nodes = self.redis_client.get(SHARD_NODES_KEY)
+        except Exception as e:
+            logger.warning(f"No se pudo leer la topología de shards: {e}")
+            return
+        if stored_nodes is None:
+            self.redis_client.set(SHARD_NODES_KEY, json.dumps(self.ring.nodes), nx=True)
+        elif json.loads(stored_nodes) != self.ring.nodes:
+            print(f"🧩 Topología de shards cambiada: {json.loads(stored_nodes)} → {self.ring.nodes}, rebalanceando...")
+            self.start_rebalance()
+
+    def start_rebalance(self):
+        
+        threading.Thread(target=self.rebalance_shards, daemon=True).start()
+
+    def rebalance_shards(self) -> bool:
+        
+        token = uuid.uuid4().hex
+        if not self.redis_client.set(SHARD_REBALANCE_LOCK, token, nx=True, ex=60):
+            logger.info("Rebalanceo de shards ya en curso en otra réplica")
+            return False
+
+        try:
+            moved = 0
+            self.redis_client.delete(SHARD_REBALANCE_KEY)
+            self.redis_client.hset(SHARD_REBALANCE_KEY, mapping={
+                'status': 'running', 'nodes': ','.join(self.ring.nodes), 'moved': 0, 'started_at': time.time()
+            })
+            # Con hashing consistente solo cambian de dueño las claves del arco que tomó el
+            # nodo nuevo; el resto se queda donde está y no se toca
+            for shard in self.shards:
+                cursor = 0
+                while True:
+                    cursor, entries = shard.client.zscan(ENTRIES_INDEX_KEY, cursor, count=self.migration_batch_size)
+                    misplaced = {}
+                    for cache_key, _ in entries:
+                        owner = self._shard_for_key(cache_key)
+                        if owner is not shard:
+                            misplaced.setdefault(owner, []).append(cache_key)
+                    for owner, cache_keys in misplaced.items():
+                        moved += self._move_entries(shard, owner, cache_keys)
+
+                    self.redis_client.hset(SHARD_REBALANCE_KEY, 'moved', moved)
+                    self.redis_client.expire(SHARD_REBALANCE_LOCK, 60)
+                    if cursor == 0:
+                        break
+                    time.sleep(max(len(entries), 1) / self.migration_rate)
+
+            self.redis_client.set(SHARD_NODES_KEY, json.dumps(self.ring.nodes))
+            self.redis_client.hset(SHARD_REBALANCE_KEY, mapping={'status': 'completed', 'finished_at': time.time()})
+            print(f"✅ Rebalanceo de shards completado: {moved} entradas movidas")
+            logger.info(f"Rebalanceo de shards completado: {moved} entradas movidas")
+            return True
+        except Exception as e:
+            logger.error(f"Error rebalanceando shards: {e}")
+            self.redis_client.hset(SHARD_REBALANCE_KEY, 'status', 'failed')
+            return False
+        finally:
+            self._release_lock(SHARD_REBALANCE_LOCK, token)
+
+    def _move_entries(self, source: CacheShard, target: CacheShard, cache_keys: List[str]) -> int:
+        
+        pipe = source.raw.pipeline(transaction=False)
+        for cache_key in cache_keys:
+            pipe.get(cache_key)
+            pipe.pttl(cache_key)
+        results = pipe.execute()
+
+        now = time.time()
+        entries = [(cache_key, value, math.ceil(pttl / 1000))
+                   for cache_key, value, pttl in zip(cache_keys, results[0::2], results[1::2])
+                   if value is not None and pttl > 0]
+        if entries:
+            evicted = target.policy.store_many(entries, self.cache_ttl, target.max_size, now,
+                                               ENTRIES_INDEX_KEY, target.max_bytes)
+            self._drop_hot_replicas(target, [key for keys in evicted for key in keys])
+        source.policy.remove_many(cache_keys, source.max_size, now, ENTRIES_INDEX_KEY)
+        return len(entries)
 
     def get_cached_response(self, question_id: int) -> Optional[Dict]:
         
         cache_key = self._generate_cache_key(question_id)
+        if self.hot_keys:
+            self.hot_keys.record(question_id)
+
+        if self.l1_cache:
+            cached_response = self.l1_cache.get(cache_key)
+            if cached_response is not None:
+                self._record_deferred_hit(cache_key)
+                if self.hot_keys:
+                    self.hot_keys.record_result(question_id, 'l1')
+                print(f"⚡ CACHE HIT (L1) - Pregunta {question_id} encontrada en memoria")
+                logger.info(f"Cache HIT L1 para pregunta {question_id}")
+                return self._check_freshness(question_id, cached_response)
         
         try:
-            cached_data = self.redis_client.get(cache_key)
+            replica = self._pick_hot_replica(question_id)
+            if replica is not None:
+                with self.metrics.time(PHASE_METRIC, phase='redis_lookup'):
+                    cached_data = replica.raw.get(self._hot_replica_key(question_id))
+                if cached_data:
+                    self._record_deferred_hit(cache_key)
+                    self.hot_keys.record_result(question_id, 'replica')
+                    print(f"🔥 CACHE HIT (réplica caliente) - Pregunta {question_id} servida desde {replica.name}")
+                    return self._cache_hit(question_id, cache_key, cached_data)
+
+            shard = self._shard_for_key(cache_key)
+            with self.metrics.time(PHASE_METRIC, phase='redis_lookup'):
+                cached_data = shard.policy.lookup(cache_key, shard.max_size, time.time())
+            if self.hot_keys:
+                self.hot_keys.record_result(question_id, 'shard' if cached_data else 'miss')
             if cached_data:
-                self._update_access_metadata(cache_key)
                 print(f"🎯 CACHE HIT - Pregunta {question_id} encontrada en cache")
                 logger.info(f"Cache HIT para pregunta {question_id}")
-                return json.loads(cached_data)
+                return self._cache_hit(question_id, cache_key, cached_data)
             else:
                 print(f"💾 CACHE MISS - Pregunta {question_id} no está en cache, procesando...")
                 logger.info(f"Cache MISS para pregunta {question_id}")
@@ -114,141 +989,883 @@ class CacheManager:
             logger.error(f"Error accediendo cache: {e}")
             return None
 
-    def store_response(self, question_id: int, response_data: Dict):
+    def _decode_hit(self, cache_key: str, cached_data: bytes) -> Dict:
         
-        cache_key = self._generate_cache_key(question_id)
+        cached_response = self.codec.decode(cached_data)
+        if self.l1_cache:
+            self.l1_cache.put(cache_key, cached_response)
+            cached_response = dict(cached_response)
+        return cached_response
+
+    def _cache_hit(self, question_id: int, cache_key: str, cached_data: bytes) -> Dict:
+        
+        return self._check_freshness(question_id, self._decode_hit(cache_key, cached_data))
+
+    def _freshness_counter(self, question_id: int, cached_response: Dict) -> Optional[str]:
+        
+        # Solo decide (sin I/O): marca la entrada vencida, agenda el refresco y devuelve
+        # el contador a incrementar, que cada servidor aplica con su propio cliente Redis
+        cached_at = cached_response.pop('_cached_at', None)
+        compute_seconds = cached_response.pop('_compute_ms', 0) / 1000
+        if cached_at is None:
+            return None
+
+        now = time.time()
+        if self.soft_ttl and now >= cached_at + self.soft_ttl:
+            cached_response['stale'] = True
+            self._schedule_refresh(question_id)
+            return "stats:stale_hits"
+        if self.xfetch_beta > 0:
+            # XFetch: refresca antes del vencimiento con probabilidad creciente a medida
+            # que la entrada envejece, escalada por lo que cuesta regenerarla
+            deadline = cached_at + (self.soft_ttl or self.cache_ttl)
+            if now - compute_seconds * self.xfetch_beta * math.log(1.0 - random.random()) >= deadline:
+                if self._schedule_refresh(question_id):
+                    return "stats:early_refreshes"
+        return None
+
+    def _check_freshness(self, question_id: int, cached_response: Dict) -> Dict:
+        
+        counter = self._freshness_counter(question_id, cached_response)
+        if counter:
+            self._shard(question_id).client.incr(counter)
+        return cached_response
+
+    def _schedule_refresh(self, question_id: int) -> bool:
+        
+        with self.inflight_lock:
+            if question_id in self.refreshing or question_id in self.inflight:
+                return False
+            self.refreshing.add(question_id)
+        print(f"🔄 Refrescando en segundo plano la pregunta {question_id}")
+        self.refresh_executor.submit(self._refresh_entry, question_id)
+        return True
+
+    def _refresh_entry(self, question_id: int):
         
+        shard = self._shard(question_id)
+        lock_key = f"lock:question:{question_id}"
+        token = uuid.uuid4().hex
+        acquired = False
         try:
+            acquired = shard.client.set(lock_key, token, nx=True, px=self.single_flight_lock_ttl_ms)
+            if not acquired:
+                return
 
-            self.redis_client.setex(
-                cache_key, 
-                self.cache_ttl, 
-                json.dumps(response_data)
-            )
+            # El refresco regenera con el LLM: la respuesta persistida es justamente la que se está
+            # renovando, releerla solo reescribiría la misma entrada con un _cached_at nuevo
+            start_time = time.time()
+            response_data = self._request_generation(question_id, skip_stored=True)
+            if "error" in response_data:
+                logger.warning(f"Refresco de pregunta {question_id} fallido: {response_data['error']}")
+                return
 
-            current_time = time.time()
-            if self.cache_policy == CachePolicy.LRU:
-                self.redis_client.zadd("cache:lru", {cache_key: current_time})
-            elif self.cache_policy == CachePolicy.LFU:
-                self.redis_client.zadd("cache:lfu", {cache_key: 1})
-            elif self.cache_policy == CachePolicy.FIFO:
-                self.redis_client.zadd("cache:fifo", {cache_key: current_time})
+            self.store_response(question_id, response_data, time.time() - start_time)
+            shard.client.incr("stats:background_refreshes")
+        except Exception as e:
+            logger.warning(f"Error refrescando pregunta {question_id}: {e}")
+        finally:
+            if acquired:
+                self._release_lock(lock_key, token, shard.client)
+            with self.inflight_lock:
+                self.refreshing.discard(question_id)
+
+    def _encode_entry(self, question_id: int, response_data: Dict, compute_seconds: float) -> Optional[bytes]:
+        
+        entry = dict(response_data, _cached_at=time.time(), _compute_ms=int(compute_seconds * 1000))
+        encoded = self.codec.encode(entry)
+        if self.max_cache_bytes and len(encoded) > self.max_cache_bytes:
+            logger.warning(f"Respuesta de pregunta {question_id} ({len(encoded)} bytes) excede MAX_CACHE_BYTES, no se almacena")
+            return None
+        return encoded
+
+    def _record_evictions(self, evicted: List[bytes]):
+        
+        if evicted:
+            self.metrics.inc(EVICTIONS_METRIC, len(evicted), policy=self.cache_policy.value)
+        for key in evicted:
+            logger.debug(f"Removido por {self.cache_policy.value.upper()}: {key.decode()}")
+
+    def store_response(self, question_id: int, response_data: Dict, compute_seconds: float = 0):
+        
+        cache_key = self._generate_cache_key(question_id)
+
+        try:
+
+            encoded = self._encode_entry(question_id, response_data, compute_seconds)
+            if encoded is None:
+                return
+
+            shard = self._shard_for_key(cache_key)
+            with self.metrics.time(PHASE_METRIC, phase='store'):
+                evicted = shard.policy.store(cache_key, encoded, self.cache_ttl, shard.max_size,
+                                             time.time(), ENTRIES_INDEX_KEY, shard.max_bytes)
+            self._record_evictions(evicted)
+            self._drop_hot_replicas(shard, evicted)
+            if self._is_replicated(question_id):
+                self._replicate_hot_key(question_id, encoded, self.cache_ttl * 1000)
 
-            self._enforce_cache_limit()
-            
             print(f"💾 Respuesta almacenada en cache para pregunta {question_id} (TTL: {self.cache_ttl}s)")
             logger.info(f"Respuesta almacenada en cache para pregunta {question_id}")
-            
+
         except Exception as e:
             logger.error(f"Error almacenando en cache: {e}")
 
+    def get_negative_response(self, question_id: int) -> Optional[Dict]:
+        
+        try:
+            shard = self._shard(question_id)
+            with self.metrics.time(PHASE_METRIC, phase='negative_lookup'):
+                cached_error = shard.client.get(self._negative_key(question_id))
+            if cached_error is None:
+                return None
+            shard.client.incr("stats:negative_hits")
+        except Exception as e:
+            logger.error(f"Error accediendo cache negativo: {e}")
+            return None
+
+        return self._negative_hit(question_id, cached_error)
+
+    def _negative_hit(self, question_id: int, cached_error: bytes) -> Dict:
+        
+        print(f"🚫 CACHE NEGATIVO - Pregunta {question_id} falló recientemente, no se consulta upstream")
+        response_data = json.loads(cached_error)
+        response_data['negative_cache_hit'] = True
+        return response_data
+
+    def _negative_ttl(self, error_type: Optional[str], failures: int) -> float:
+        
+        if error_type == 'not_found':
+            ttl = self.negative_ttl
+        else:
+            ttl = min(self.negative_max_ttl, self.negative_failure_ttl * 2 ** max(0, failures - 1))
+        return ttl * random.uniform(1 - self.negative_jitter, 1 + self.negative_jitter)
+
+    def _negative_cache_enabled(self, error_type: Optional[str]) -> bool:
+        
+        return (self.negative_ttl if error_type == 'not_found' else self.negative_failure_ttl) > 0
+
+    def _failure_commands(self, question_id: int) -> List[tuple]:
+        
+        failures_key = self._failures_key(question_id)
+        return [('incr', (failures_key,), {}),
+                ('expire', (failures_key, int(self.negative_max_ttl * 4)), {})]
+
+    def _negative_store_commands(self, question_id: int, response_data: Dict, ttl: float) -> List[tuple]:
+        
+        negative_key = self._negative_key(question_id)
+        now = time.time()
+        return [('set', (negative_key, json.dumps(response_data)), {'px': max(1, int(ttl * 1000))}),
+                ('zadd', (NEGATIVE_INDEX_KEY, {negative_key: now + ttl}), {}),
+                ('zremrangebyscore', (NEGATIVE_INDEX_KEY, '-inf', now), {}),
+                ('incr', ("stats:negative_stores",), {})]
+
+    def store_negative_response(self, question_id: int, response_data: Dict):
+        
+        error_type = response_data.get('error_type')
+        if not self._negative_cache_enabled(error_type):
+            return
+
+        try:
+            shard = self._shard(question_id)
+            failures = 0
+            if error_type != 'not_found':
+                pipe = shard.client.pipeline(transaction=False)
+                failures = queue_commands(pipe, self._failure_commands(question_id)).execute()[0]
+
+            ttl = self._negative_ttl(error_type, failures)
+            pipe = shard.client.pipeline(transaction=False)
+            queue_commands(pipe, self._negative_store_commands(question_id, response_data, ttl)).execute()
+            logger.info(f"Error de pregunta {question_id} ({error_type}) en cache negativo por {ttl:.1f}s")
+        except Exception as e:
+            logger.error(f"Error almacenando en cache negativo: {e}")
+
+    def _response_from_stored(self, question: Dict, stored_response: Dict) -> Dict:
+        
+        # Misma forma que la respuesta de /generate-response: las métricas que no se persistieron
+        # (respuestas guardadas antes de score_details) quedan en None
+        details = stored_response.get('score_details') or {}
+        response = {
+            "question_id": question['id'],
+            "question_title": question.get('title'),
+            "question_text": question.get('question'),
+            "original_answer": question.get('best_answer'),
+            "llm_response": stored_response['llm_response'],
+            "response_time_ms": stored_response.get('response_time_ms'),
+            "llm_model": stored_response.get('llm_model')
+        }
+        response.update({field: details.get(field) for field in SCORE_FIELDS})
+        response.update({
+            "composite_score": stored_response.get('quality_score'),
+            "original_length": details.get('original_length', len((question.get('best_answer') or '').split())),
+            "llm_length": details.get('llm_length', len(stored_response['llm_response'].split())),
+            "stored": True,
+            "stored_at": stored_response.get('created_at'),
+            "source": "storage"
+        })
+        return response
+
+    def _startup_warmup(self):
+        
+        for attempt in range(5):
+            if self.warm_cache():
+                return
+            time.sleep(5 * (attempt + 1))
+        logger.warning("No se pudo precargar el cache al iniciar")
+
+    def start_warmup(self, limit: Optional[int] = None, regenerate: bool = False):
+        
+        threading.Thread(target=self.warm_cache, args=(limit, regenerate), daemon=True).start()
+
+    def warm_cache(self, limit: Optional[int] = None, regenerate: bool = False) -> bool:
+        
+        limit = limit or self.max_cache_size
+        token = uuid.uuid4().hex
+        if not self.redis_client.set(WARMUP_LOCK, token, nx=True, px=600000):
+            logger.info("Precarga ya en curso en otra réplica, omitiendo")
+            return True
+
+        status = {'status': 'running', 'requested': limit, 'loaded': 0, 'regenerating': 0, 'skipped': 0,
+                  'started_at': time.time()}
+        try:
+            self.redis_client.delete(WARMUP_STATUS_KEY)
+            self.redis_client.hset(WARMUP_STATUS_KEY, mapping=status)
+            print(f"🔥 Precargando cache con las {limit} preguntas más accedidas...")
+
+            try:
+                top_response = self.storage_client.get("/questions/top",
+                                                       params=dict(self.stored_response_filter, limit=limit),
+                                                       timeout=(2.0, 60.0))
+                if top_response.status_code != 200:
+                    raise RuntimeError(f"HTTP {top_response.status_code}")
+                questions = top_response.json()['questions']
+            except Exception as e:
+                logger.error(f"Error obteniendo preguntas para precarga: {e}")
+                self.redis_client.hset(WARMUP_STATUS_KEY, mapping={'status': 'failed', 'error': str(e)})
+                return False
+
+            for i in range(0, len(questions), self.warmup_batch_size):
+                batch_start = time.time()
+                batch = questions[i:i + self.warmup_batch_size]
+                questions_by_id = {question['id']: question for question in batch}
+
+                now = time.time()
+                for shard, question_ids in self._group_by_shard(list(questions_by_id)).items():
+                    cache_keys = [self._generate_cache_key(question_id) for question_id in question_ids]
+
+                    pipe = shard.client.pipeline(transaction=False)
+                    for cache_key in cache_keys:
+                        pipe.exists(cache_key)
+                    present = pipe.execute()
+
+                    entries = []
+                    for question_id, cache_key, is_present in zip(question_ids, cache_keys, present):
+                        question = questions_by_id[question_id]
+                        if is_present:
+                            status['skipped'] += 1
+                        elif question.get('stored_response'):
+                            stored_response = question['stored_response']
+                            entry = dict(self._response_from_stored(question, stored_response), _cached_at=now,
+                                         _compute_ms=stored_response.get('response_time_ms') or 0)
+                            encoded = self.codec.encode(entry)
+                            if self.max_cache_bytes and len(encoded) > self.max_cache_bytes:
+                                status['skipped'] += 1
+                                continue
+                            entries.append((cache_key, encoded))
+                        elif regenerate and self._schedule_refresh(question_id):
+                            status['regenerating'] += 1
+                        else:
+                            status['skipped'] += 1
+
+                    if entries:
+                        evicted = shard.policy.store_many(entries, self.cache_ttl, shard.max_size, now,
+                                                          ENTRIES_INDEX_KEY, shard.max_bytes)
+                        self._drop_hot_replicas(shard, [key for keys in evicted for key in keys])
+                        status['loaded'] += len(entries)
+                self.redis_client.hset(WARMUP_STATUS_KEY, mapping=status)
+
+                if self.warmup_rate > 0:
+                    time.sleep(max(0, len(batch) / self.warmup_rate - (time.time() - batch_start)))
+
+            status.update({'status': 'completed', 'finished_at': time.time()})
+            self.redis_client.hset(WARMUP_STATUS_KEY, mapping=status)
+            print(f"✅ Precarga completada: {status['loaded']} cargadas, {status['regenerating']} regenerando, "
+                  f"{status['skipped']} omitidas")
+            logger.info(f"Precarga completada: {status}")
+            return True
+        finally:
+            self._release_lock(WARMUP_LOCK, token)
+
+    def get_latency_stats(self) -> Dict:
+        
+        return {
+            'requests': self.metrics.summary(REQUEST_METRIC),
+            'phases': self.metrics.summary(PHASE_METRIC),
+            'batches': self.metrics.summary(BATCH_METRIC)
+        }
+
+    def render_metrics(self) -> str:
+        
+        with self.inflight_lock:
+            inflight = len(self.inflight)
+        gauges = {
+            'cache_inflight_requests': {(): inflight},
+            'cache_access_queue_depth': {(): self.access_queue.qsize()},
+            'cache_l1_entries': {(): len(self.l1_cache.entries) if self.l1_cache else 0},
+            'cache_hot_keys': {(): len(self.hot_keys.hot) if self.hot_keys else 0},
+        }
+        for shard in self.shards:
+            try:
+                shard_stats = self._get_shard_stats(shard)
+            except Exception as e:
+                logger.warning(f"Error obteniendo métricas de {shard.name}: {e}")
+                continue
+            labels = (('shard', shard.name),)
+            gauges.setdefault('cache_entries', {})[labels] = shard_stats['current_size']
+            gauges.setdefault('cache_bytes', {})[labels] = shard_stats['bytes_used']
+            gauges.setdefault('cache_negative_entries', {})[labels] = shard_stats['negative_entries']
+        return self.metrics.render(gauges)
+
+    def _get_shard_stats(self, shard: CacheShard) -> Dict:
+        
+        now = time.time()
+        pipe = shard.client.pipeline(transaction=False)
+        pipe.mget(*STATS_COUNTERS)
+        pipe.zcard(ENTRIES_INDEX_KEY)
+        pipe.zcount(ENTRIES_INDEX_KEY, '-inf', now)
+        pipe.dbsize()
+        pipe.get(BYTES_KEY)
+        pipe.hlen(SIZES_KEY)
+        pipe.zcount(NEGATIVE_INDEX_KEY, now, '+inf')
+        (counters, indexed_entries, expired_entries, total_keys, used_bytes, sized_entries,
+         negative_entries) = pipe.execute()
+
+        stats = {counter.split(':', 1)[1]: int(value or 0) for counter, value in zip(STATS_COUNTERS, counters)}
+        stats.update({
+            'total_keys': total_keys,
+            'current_size': indexed_entries - expired_entries,
+            'bytes_used': int(used_bytes or 0),
+            'sized_entries': sized_entries,
+            'negative_entries': negative_entries
+        })
+        return stats
+
     def get_cache_stats(self) -> Dict:
         
         try:
 
-            cache_hits = int(self.redis_client.get("stats:cache_hits") or 0)
-            cache_misses = int(self.redis_client.get("stats:cache_misses") or 0)
-            total_requests = int(self.redis_client.get("stats:total_requests") or 0)
+            shards = {}
+            totals = {}
+            policy_stats = {}
+            ring_shares = self.ring.distribution()
+            for shard in self.shards:
+                shard_stats = self._get_shard_stats(shard)
+                for key, value in shard_stats.items():
+                    totals[key] = totals.get(key, 0) + value
+                shard_policy_stats = shard.policy.get_stats()
+                for key, value in shard_policy_stats.items():
+                    policy_stats[key] = policy_stats.get(key, 0) + value
+
+                shard_requests = shard_stats['total_requests']
+                shards[shard.name] = dict(
+                    shard_stats, **shard_policy_stats,
+                    max_size=shard.max_size,
+                    hit_rate=round(shard_stats['cache_hits'] / shard_requests, 4) if shard_requests > 0 else 0,
+                    ring_share=ring_shares.get(shard.name, 0)
+                )
+
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hgetall(POLICY_MIGRATION_KEY)
+            pipe.hgetall(WARMUP_STATUS_KEY)
+            pipe.hgetall(SHARD_REBALANCE_KEY)
+            migration, warmup, rebalance = pipe.execute()
 
+            cache_hits = totals['cache_hits']
+            cache_misses = totals['cache_misses']
+            total_requests = totals['total_requests']
             hit_rate = cache_hits / total_requests if total_requests > 0 else 0
             miss_rate = cache_misses / total_requests if total_requests > 0 else 0
             
-            current_cache_size = len([k for k in self.redis_client.keys("question:*")])
+            current_cache_size = totals['current_size']
+            used_bytes = totals['bytes_used']
+            sized_entries = totals['sized_entries']
             
             stats = {
-                'total_keys': self.redis_client.dbsize(),
+                'total_keys': totals['total_keys'],
                 'policy': self.cache_policy.value,
                 'ttl': self.cache_ttl,
                 'max_size': self.max_cache_size,
                 'cache_hits': cache_hits,
                 'cache_misses': cache_misses,
                 'total_requests': total_requests,
+                'coalesced_requests': totals['coalesced_requests'],
+                'soft_ttl': self.soft_ttl,
+                'xfetch_beta': self.xfetch_beta,
+                'stale_hits': totals['stale_hits'],
+                'early_refreshes': totals['early_refreshes'],
+                'background_refreshes': totals['background_refreshes'],
+                'negative_hits': totals['negative_hits'],
+                'negative_stores': totals['negative_stores'],
+                'negative_entries': totals['negative_entries'],
+                'stored_response_hits': totals['stored_response_hits'],
                 'hit_rate': round(hit_rate, 4),
                 'miss_rate': round(miss_rate, 4),
                 'current_size': current_cache_size,
-                'utilization': round(current_cache_size / self.max_cache_size, 4) if self.max_cache_size > 0 else 0
+                'utilization': round(current_cache_size / self.max_cache_size, 4) if self.max_cache_size > 0 else 0,
+                'bytes_used': used_bytes,
+                'max_bytes': self.max_cache_bytes,
+                'avg_entry_size': round(used_bytes / sized_entries, 1) if sized_entries > 0 else 0,
+                'byte_utilization': round(used_bytes / self.max_cache_bytes, 4) if self.max_cache_bytes > 0 else 0
             }
 
-            if self.cache_policy == CachePolicy.LRU:
-                stats['lru_entries'] = self.redis_client.zcard("cache:lru")
-            elif self.cache_policy == CachePolicy.LFU:
-                stats['lfu_entries'] = self.redis_client.zcard("cache:lfu")
-            elif self.cache_policy == CachePolicy.FIFO:
-                stats['fifo_entries'] = self.redis_client.zcard("cache:fifo")
+            stats.update(policy_stats)
+            if migration:
+                stats['policy_migration'] = migration
+            if warmup:
+                stats['warmup'] = warmup
+            stats['shard_count'] = len(self.shards)
+            stats['shards'] = shards
+            if rebalance:
+                stats['shard_rebalance'] = rebalance
+            if self.hot_keys:
+                stats['hot_keys'] = {
+                    'threshold': self.hot_keys.threshold,
+                    'detections': self.hot_keys.detections,
+                    'replicated': len(self.shards) > 1,
+                    'keys': self.hot_keys.get_stats()
+                }
+            stats['latency'] = self.get_latency_stats()
+            stats['replica_id'] = self.replica_id
+            stats['cluster'] = self._aggregate_replicas(self.get_replicas())
+
+            stats.update(self.l1_cache.get_stats() if self.l1_cache else {'l1_enabled': False})
+            stats['http_clients'] = get_client_stats()
                 
             return stats
         except Exception as e:
             logger.error(f"Error obteniendo estadísticas: {e}")
             return {}
 
-    def process_question_request(self, question_id: int) -> Dict:
+    def _error_response(self, question_id: int, error: str, error_type: str = 'upstream') -> Dict:
         
-        start_time = time.time()
-        print(f"\n🔄 PROCESANDO CONSULTA - Pregunta ID: {question_id}")
-
-        self.redis_client.incr("stats:total_requests")
+        return {"error": error, "error_type": error_type, "question_id": question_id}
 
-        cached_response = self.get_cached_response(question_id)
-        if cached_response:
+    def _question_status_error(self, question_id: int, status_code: int) -> Optional[Dict]:
+        
+        if status_code == 404:
+            return self._error_response(question_id, "Pregunta no encontrada", 'not_found')
+        if status_code != 200:
+            return self._error_response(question_id, "Error obteniendo pregunta")
+        return None
 
-            self.redis_client.incr("stats:cache_hits")
+    def _llm_status_error(self, question_id: int, status_code: int) -> Optional[Dict]:
+        
+        if status_code != 200:
+            print(f"❌ Error en LLM Service: HTTP {status_code}")
+            return self._error_response(question_id, "Error generando respuesta LLM")
+        return None
 
-            try:
-                requests.post(f"{self.storage_url}/question/{question_id}/access",
-                            json={"cache_hit": True})
-            except Exception as e:
-                logger.warning(f"Error actualizando stats de cache hit: {e}")
-            
-            cached_response['cache_hit'] = True
-            cached_response['response_time_ms'] = int((time.time() - start_time) * 1000)
-            return cached_response
+    def _take_stored_response(self, question_id: int, question_data: Dict) -> Optional[Dict]:
+        
+        stored_response = question_data.pop('stored_response', None)
+        if not stored_response:
+            return None
+        print(f"📚 Respuesta persistida encontrada para pregunta {question_id}, se omite el LLM")
+        return self._response_from_stored(question_data, stored_response)
 
+    def _fetch_question(self, question_id: int, skip_stored: bool = False) -> Dict:
+        
         try:
-            question_response = requests.get(f"{self.storage_url}/question/{question_id}")
-            if question_response.status_code != 200:
-                return {"error": "Pregunta no encontrada", "question_id": question_id}
-            
-            question_data = question_response.json()
+            params = self.stored_response_filter if self.stored_responses_enabled and not skip_stored else None
+            with self.metrics.time(PHASE_METRIC, phase='storage_fetch'):
+                question_response = self.storage_client.get(f"/question/{question_id}", params=params)
+            return (self._question_status_error(question_id, question_response.status_code)
+                    or question_response.json())
         except Exception as e:
             logger.error(f"Error obteniendo pregunta {question_id}: {e}")
-            return {"error": "Error obteniendo pregunta"}
+            return self._error_response(question_id, "Error obteniendo pregunta")
+
+    def _request_generation(self, question_id: int, question_data: Optional[Dict] = None,
+                            skip_stored: bool = False) -> Dict:
+        
+        if question_data is None:
+            question_data = self._fetch_question(question_id, skip_stored)
+            if "error" in question_data:
+                return question_data
 
-        print(f"🤖 Enviando pregunta al LLM Service para generar respuesta...")
+        stored = self._take_stored_response(question_id, question_data) if not skip_stored else None
+        if stored:
+            self._shard(question_id).client.incr("stats:stored_response_hits")
+            return stored
+
+        print("🤖 Enviando pregunta al LLM Service para generar respuesta...")
         try:
-            llm_response = requests.post(f"{self.llm_url}/generate-response", 
-                                       json=question_data)
-            if llm_response.status_code != 200:
-                print(f"❌ Error en LLM Service: HTTP {llm_response.status_code}")
-                return {"error": "Error generando respuesta LLM"}
-            
+            with self.metrics.time(PHASE_METRIC, phase='llm_call'):
+                llm_response = self.llm_client.post("/generate-response", json=question_data)
+            error = self._llm_status_error(question_id, llm_response.status_code)
+            if error:
+                return error
+
             response_data = llm_response.json()
-            print(f"✅ Respuesta generada por LLM y evaluada")
+            print("✅ Respuesta generada por LLM y evaluada")
         except Exception as e:
             print(f"❌ Error llamando LLM service: {e}")
             logger.error(f"Error llamando LLM service: {e}")
-            return {"error": "Error en servicio LLM"}
+            return self._error_response(question_id, "Error en servicio LLM")
+
+        return response_data
+
+    def _generated_commands(self, question_id: int) -> List[tuple]:
+        
+        return [('incr', ("stats:cache_misses",), {}),
+                ('delete', (self._failures_key(question_id),), {})]
+
+    def _coalesced_commands(self) -> List[tuple]:
+        
+        return [('incr', ("stats:cache_misses",), {}),
+                ('incr', ("stats:coalesced_requests",), {})]
+
+    def _generate_response(self, question_id: int, question_data: Optional[Dict] = None) -> Dict:
+        
+        start_time = time.time()
+        response_data = self._request_generation(question_id, question_data)
+        if "error" in response_data:
+            self.store_negative_response(question_id, response_data)
+            return response_data
+
+        pipe = self._shard(question_id).client.pipeline(transaction=False)
+        queue_commands(pipe, self._generated_commands(question_id)).execute()
+
+        self.store_response(question_id, response_data, time.time() - start_time)
+
+        self._notify_access(question_id, False)
+
+        return response_data
+
+    def _release_lock(self, lock_key: str, token: str, client: Optional[redis.Redis] = None):
+        
+        try:
+            self._release_lock_script(keys=[lock_key], args=[token], client=client or self.redis_client)
+        except Exception as e:
+            logger.warning(f"Error liberando lock {lock_key}: {e}")
+
+    def _decode_flight_result(self, cached_data: bytes) -> Dict:
+        
+        response_data = self.codec.decode(cached_data)
+        response_data.pop('_cached_at', None)
+        response_data.pop('_compute_ms', None)
+        return response_data
+
+    def _wait_for_remote_flight(self, question_id: int, lock_key: str) -> Optional[Dict]:
+        
+        cache_key = self._generate_cache_key(question_id)
+        shard = self._shard_for_key(cache_key)
+        deadline = time.time() + self.single_flight_wait_timeout
+        delay = 0.05
+        while time.time() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
 
-        self.redis_client.incr("stats:cache_misses")
+            cached_data = shard.raw.get(cache_key)
+            if cached_data:
+                return self._decode_flight_result(cached_data)
+            if not shard.client.exists(lock_key):
+                return self.get_negative_response(question_id)
+        return None
 
-        self.store_response(question_id, response_data)
+    def _generate_with_distributed_lock(self, question_id: int, question_data: Optional[Dict] = None) -> Dict:
+        
+        shard = self._shard(question_id)
+        lock_key = f"lock:question:{question_id}"
+        token = uuid.uuid4().hex
 
         try:
-            requests.post(f"{self.storage_url}/question/{question_id}/access",
-                        json={"cache_hit": False})
+            acquired = shard.client.set(lock_key, token, nx=True, px=self.single_flight_lock_ttl_ms)
         except Exception as e:
-            logger.warning(f"Error actualizando stats de cache miss: {e}")
+            logger.warning(f"Error adquiriendo lock {lock_key}, generando sin coordinación: {e}")
+            return self._generate_response(question_id, question_data)
+
+        if acquired:
+            try:
+                return self._generate_response(question_id, question_data)
+            finally:
+                self._release_lock(lock_key, token, shard.client)
+
+        print(f"⏳ Pregunta {question_id} ya se está generando en otra réplica, esperando resultado...")
+        with self.metrics.time(PHASE_METRIC, phase='lock_wait'):
+            response_data = self._wait_for_remote_flight(question_id, lock_key)
+        if response_data is not None:
+            response_data['coalesced'] = True
+            return response_data
+        return self._generate_response(question_id, question_data)
+
+    def _single_flight(self, question_id: int, question_data: Optional[Dict] = None) -> Dict:
+        
+        with self.inflight_lock:
+            flight = self.inflight.get(question_id)
+            is_leader = flight is None
+            if is_leader:
+                flight = InFlightRequest()
+                self.inflight[question_id] = flight
+
+        if not is_leader:
+            print(f"⏳ Pregunta {question_id} ya se está generando, esperando resultado compartido...")
+            if flight.event.wait(self.single_flight_wait_timeout) and flight.result is not None:
+                response_data = dict(flight.result)
+                response_data['coalesced'] = True
+                return response_data
+            return self._generate_with_distributed_lock(question_id, question_data)
+
+        try:
+            flight.result = self._generate_with_distributed_lock(question_id, question_data)
+            return dict(flight.result)
+        finally:
+            with self.inflight_lock:
+                self.inflight.pop(question_id, None)
+            flight.event.set()
+
+    def clear_cache(self):
+        
+        applied_env = self.redis_client.hgetall(SETTINGS_ENV_KEY)
+        for shard in self.shards:
+            shard.client.flushdb()
+        self.redis_client.set(POLICY_CONFIG_KEY, self.cache_policy.value)
+        self.redis_client.hset(SETTINGS_KEY, mapping=self.get_settings())
+        if applied_env:
+            self.redis_client.hset(SETTINGS_ENV_KEY, mapping=applied_env)
+        self.redis_client.set(SHARD_NODES_KEY, json.dumps(self.ring.nodes))
+        self.redis_client.publish(INVALIDATION_CHANNEL, '*')
+        if self.l1_cache:
+            self.l1_cache.clear()
+        self._heartbeat()
+
+    def reset_stats(self):
+        
+        for shard in self.shards:
+            pipe = shard.client.pipeline(transaction=False)
+            for counter in STATS_COUNTERS:
+                pipe.set(counter, 0)
+            pipe.execute()
+
+    def rehydrate_response(self, question_id: int, response_data: Dict) -> Dict:
+        
+        if not response_data.pop('compact', False):
+            return response_data
+        try:
+            question_response = self.storage_client.get(f"/question/{question_id}")
+            if question_response.status_code == 200:
+                question_data = question_response.json()
+                response_data['question_title'] = question_data.get('title')
+                response_data['question_text'] = question_data.get('question')
+                response_data['original_answer'] = question_data.get('best_answer')
+        except Exception as e:
+            logger.warning(f"Error reconstruyendo campos de pregunta {question_id}: {e}")
+        return response_data
+
+    def _request_outcome(self, response_data: Dict) -> str:
+        
+        if "error" in response_data:
+            return 'error'
+        return 'hit' if response_data.get('cache_hit') else 'miss'
+
+    def process_question_request(self, question_id: int) -> Dict:
+        
+        start = time.perf_counter()
+        response_data = self._process_question_request(question_id)
+        self.metrics.observe(REQUEST_METRIC, time.perf_counter() - start, outcome=self._request_outcome(response_data))
+        return response_data
 
-        response_data['cache_hit'] = False
+    def _process_question_request(self, question_id: int) -> Dict:
+        
+        start_time = time.time()
+        print(f"\n🔄 PROCESANDO CONSULTA - Pregunta ID: {question_id}")
+
+        cached_response = self.get_cached_response(question_id)
+        if cached_response:
+
+            self._notify_access(question_id, True)
+
+            return self._finalize_response(cached_response, start_time, True)
+
+        negative_response = self.get_negative_response(question_id)
+        if negative_response:
+            return self._finalize_response(negative_response, start_time)
+
+        response_data = self._single_flight(question_id)
+        return self._finish_generated(question_id, response_data, start_time)
+
+    def _finish_generated(self, question_id: int, response_data: Dict, start_time: float) -> Dict:
+        
+        if "error" in response_data:
+            return response_data
+
+        if response_data.get('coalesced'):
+            pipe = self._shard(question_id).client.pipeline(transaction=False)
+            queue_commands(pipe, self._coalesced_commands()).execute()
+            self._notify_access(question_id, False)
+
+        return self._finalize_response(response_data, start_time, False)
+
+    def _finalize_response(self, response_data: Dict, start_time: float, cache_hit: Optional[bool] = None) -> Dict:
+        
+        if cache_hit is not None:
+            response_data['cache_hit'] = cache_hit
         response_data['response_time_ms'] = int((time.time() - start_time) * 1000)
         return response_data
 
+    def get_cached_responses(self, question_ids: List[int]) -> Dict[int, Dict]:
+        
+        found = {}
+        pending = []
+        for question_id in question_ids:
+            if self.hot_keys:
+                self.hot_keys.record(question_id)
+            cache_key = self._generate_cache_key(question_id)
+            cached_response = self.l1_cache.get(cache_key) if self.l1_cache else None
+            if cached_response is not None:
+                self._record_deferred_hit(cache_key)
+                found[question_id] = cached_response
+            else:
+                pending.append(question_id)
+
+        for shard, shard_ids in self._group_by_shard(pending).items():
+            try:
+                cache_keys = [self._generate_cache_key(question_id) for question_id in shard_ids]
+                values = shard.policy.lookup_many(cache_keys, shard.max_size, time.time())
+                for question_id, cache_key, cached_data in zip(shard_ids, cache_keys, values):
+                    if cached_data:
+                        cached_response = self.codec.decode(cached_data)
+                        if self.l1_cache:
+                            self.l1_cache.put(cache_key, cached_response)
+                            cached_response = dict(cached_response)
+                        found[question_id] = cached_response
+            except Exception as e:
+                logger.error(f"Error accediendo cache en lote en {shard.name}: {e}")
+
+        return {question_id: self._check_freshness(question_id, response)
+                for question_id, response in found.items()}
+
+    def get_negative_responses(self, question_ids: List[int]) -> Dict[int, Dict]:
+        
+        negatives = {}
+        for shard, shard_ids in self._group_by_shard(question_ids).items():
+            try:
+                cached_errors = shard.client.mget([self._negative_key(question_id) for question_id in shard_ids])
+            except Exception as e:
+                logger.error(f"Error accediendo cache negativo en {shard.name}: {e}")
+                continue
+
+            shard_hits = 0
+            for question_id, cached_error in zip(shard_ids, cached_errors):
+                if cached_error is not None:
+                    negatives[question_id] = dict(json.loads(cached_error), negative_cache_hit=True)
+                    shard_hits += 1
+            if shard_hits:
+                shard.client.incrby("stats:negative_hits", shard_hits)
+        return negatives
+
+    def _fetch_questions_bulk(self, question_ids: List[int]) -> Optional[Dict[int, Dict]]:
+        
+        try:
+            payload = {"ids": question_ids}
+            if self.stored_responses_enabled:
+                payload.update(self.stored_response_filter)
+            with self.metrics.time(PHASE_METRIC, phase='storage_bulk_fetch'):
+                bulk_response = self.storage_client.post("/questions/bulk", json=payload)
+            if bulk_response.status_code != 200:
+                logger.warning(f"Storage bulk respondió HTTP {bulk_response.status_code}, consultando por ID")
+                return None
+            return {question['id']: question for question in bulk_response.json()['questions']}
+        except Exception as e:
+            logger.warning(f"Error en consulta bulk a storage, consultando por ID: {e}")
+            return None
+
+    def iter_batch_results(self, question_ids: List[int]) -> Iterator[Dict]:
+        
+        start_time = time.time()
+        question_ids = list(dict.fromkeys(question_ids))
+        print(f"\n📦 PROCESANDO LOTE - {len(question_ids)} preguntas")
+
+        cached = self.get_cached_responses(question_ids)
+        for question_id, cached_response in cached.items():
+            self._notify_access(question_id, True)
+            yield self._finalize_response(cached_response, start_time, True)
+
+        misses = [question_id for question_id in question_ids if question_id not in cached]
+        negatives = self.get_negative_responses(misses)
+        for negative_response in negatives.values():
+            yield self._finalize_response(negative_response, start_time)
+
+        misses = [question_id for question_id in misses if question_id not in negatives]
+        if not misses:
+            return
+        print(f"💾 Lote: {len(cached)} hits, {len(negatives)} en cache negativo, {len(misses)} misses")
+
+        questions = self._fetch_questions_bulk(misses)
+        if questions is not None:
+            for question_id in misses:
+                if question_id not in questions:
+                    response_data = self._error_response(question_id, "Pregunta no encontrada", 'not_found')
+                    self.store_negative_response(question_id, response_data)
+                    yield response_data
+            misses = [question_id for question_id in misses if question_id in questions]
+
+        futures = {
+            self.batch_executor.submit(self._single_flight, question_id,
+                                       questions.get(question_id) if questions else None): question_id
+            for question_id in misses
+        }
+        for future in as_completed(futures):
+            question_id = futures[future]
+            try:
+                response_data = future.result()
+            except Exception as e:
+                logger.error(f"Error generando pregunta {question_id} del lote: {e}")
+                response_data = self._error_response(question_id, "Error generando respuesta")
+            yield self._finish_generated(question_id, response_data, start_time)
+
+    def process_batch_request(self, question_ids: List[int]) -> Dict:
+        
+        start_time = time.time()
+        with self.metrics.time(BATCH_METRIC):
+            results = {result.get('question_id'): result for result in self.iter_batch_results(question_ids)}
+
+        ordered = [results[question_id] for question_id in dict.fromkeys(question_ids) if question_id in results]
+        return {
+            "results": ordered,
+            "total": len(ordered),
+            "hits": sum(1 for r in ordered if r.get('cache_hit')),
+            "misses": sum(1 for r in ordered if r.get('cache_hit') is False),
+            "errors": sum(1 for r in ordered if "error" in r),
+            "response_time_ms": int((time.time() - start_time) * 1000)
+        }
+
+def json_body() -> Dict:
+    
+    # JSON inválido o que no es un objeto cuenta como cuerpo vacío y cada ruta responde su 400
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else {}
+
+def validate_settings(settings: Dict) -> Optional[str]:
+    
+    if not isinstance(settings, dict) or not settings or any(name not in SHARED_SETTINGS for name in settings):
+        return f"Parámetros válidos: {', '.join(SHARED_SETTINGS)}"
+    for name, value in settings.items():
+        allowed = (int,) if SHARED_SETTINGS[name] is int else (int, float)
+        if isinstance(value, bool) or not isinstance(value, allowed) or value < 0:
+            return f"{name} debe ser un {'entero' if SHARED_SETTINGS[name] is int else 'número'} no negativo"
+    if settings.get('max_cache_size', 1) <= 0:
+        return "max_cache_size debe ser mayor que 0"
+    return None
+
 cache_manager = CacheManager()
 
 @app.route('/health', methods=['GET'])
 def health_check():
     
     try:
-        cache_manager.redis_client.ping()
+        for shard in cache_manager.shards:
+            shard.client.ping()
         return jsonify({"status": "healthy", "service": "cache"})
     except:
         return jsonify({"status": "unhealthy", "service": "cache"}), 500
@@ -257,8 +1874,32 @@ def health_check():
 def process_question(question_id):
     
     result = cache_manager.process_question_request(question_id)
+    if request.args.get('full', 'false').lower() == 'true':
+        result = cache_manager.rehydrate_response(question_id, result)
     return jsonify(result)
 
+@app.route('/questions/batch', methods=['POST'])
+def process_question_batch():
+    
+    data = json_body()
+    question_ids = data.get('ids')
+
+    if not isinstance(question_ids, list) or not all(isinstance(i, int) for i in question_ids):
+        return jsonify({"error": "Se requiere una lista de IDs enteros"}), 400
+    if len(question_ids) > cache_manager.batch_max_ids:
+        return jsonify({"error": f"Máximo {cache_manager.batch_max_ids} IDs por lote"}), 400
+
+    if data.get('stream') or request.accept_mimetypes.best == 'application/x-ndjson':
+        results = (json.dumps(result) + "\n" for result in cache_manager.iter_batch_results(question_ids))
+        return Response(stream_with_context(results), mimetype='application/x-ndjson')
+
+    return jsonify(cache_manager.process_batch_request(question_ids))
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    
+    return Response(cache_manager.render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/cache/stats', methods=['GET'])
 def get_cache_stats():
     
@@ -269,33 +1910,73 @@ def get_cache_stats():
 def clear_cache():
     
     try:
-        cache_manager.redis_client.flushdb()
+        cache_manager.clear_cache()
+        if request.args.get('warm', 'false').lower() == 'true':
+            cache_manager.start_warmup()
         return jsonify({"success": True, "message": "Cache limpiado"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/cache/warm', methods=['POST'])
+def warm_cache():
+    
+    data = json_body()
+    limit = data.get('limit')
+    if limit is not None and (not isinstance(limit, int) or limit <= 0):
+        return jsonify({"error": "limit debe ser un entero positivo"}), 400
+
+    cache_manager.start_warmup(limit, bool(data.get('regenerate', False)))
+    return jsonify({"success": True, "message": "Precarga iniciada", "limit": limit or cache_manager.max_cache_size}), 202
+
+@app.route('/cache/config', methods=['GET'])
+def get_cache_config():
+    
+    return jsonify({"policy": cache_manager.cache_policy.value, "settings": cache_manager.get_settings()})
+
+@app.route('/cache/config', methods=['POST'])
+def update_cache_config():
+    
+    data = json_body()
+    error = validate_settings(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    changed = cache_manager.update_settings(data)
+    return jsonify({"success": True, "changed": changed, "settings": cache_manager.get_settings()})
+
+@app.route('/cache/replicas', methods=['GET'])
+def get_cache_replicas():
+    
+    return jsonify({"replica_id": cache_manager.replica_id, "replicas": cache_manager.get_replicas()})
+
+@app.route('/cache/rebalance', methods=['POST'])
+def rebalance_cache_shards():
+    
+    cache_manager.start_rebalance()
+    return jsonify({"success": True, "message": "Rebalanceo iniciado", "nodes": cache_manager.ring.nodes}), 202
+
 @app.route('/cache/policy', methods=['POST'])
 def change_cache_policy():
     
-    data = request.get_json()
+    data = json_body()
     policy = data.get('policy')
     
     if policy not in [p.value for p in CachePolicy]:
         return jsonify({"error": "Política inválida"}), 400
     
-    cache_manager.cache_policy = CachePolicy(policy)
+    cache_manager.change_policy(CachePolicy(policy))
     return jsonify({"success": True, "new_policy": policy})
 
 @app.route('/cache/reset-stats', methods=['POST'])
 def reset_cache_stats():
     
     try:
-        cache_manager.redis_client.set("stats:cache_hits", 0)
-        cache_manager.redis_client.set("stats:cache_misses", 0)
-        cache_manager.redis_client.set("stats:total_requests", 0)
+        cache_manager.reset_stats()
         return jsonify({"success": True, "message": "Estadísticas reseteadas"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=True)
+    # Sin reloader: el proceso padre de Werkzeug también construiría un CacheManager, con sus
+    # hilos de fondo y su latido en cache:replicas (cada contenedor contaría como dos réplicas)
+    app.run(host='0.0.0.0', port=8000, debug=True, use_reloader=False)
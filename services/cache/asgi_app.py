@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import redis.asyncio as aioredis
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from typing import Dict, Optional
+
+from app import (cache_manager, validate_settings, queue_commands, ENTRIES_INDEX_KEY, RELEASE_LOCK_SCRIPT,
+                 REQUEST_METRIC, PHASE_METRIC)
+from policies import CachePolicy, AsyncPolicyScripts
+from common.async_service_client import AsyncServiceClient
+from sharding import CacheShard
+
+logger = logging.getLogger(__name__)
+
+class AsyncCacheManager:
+    def __init__(self, manager):
+        self.manager = manager
+
+        self.redis_clients = {
+            shard.name: aioredis.Redis(
+                host=shard.host,
+                port=shard.port,
+                db=shard.db,
+                max_connections=int(os.getenv('REDIS_MAX_CONNECTIONS', 200)),
+                decode_responses=False
+            )
+            for shard in manager.shards
+        }
+        # Mismos ajustes <NAME>_HTTP_* que los clientes síncronos; con más conexiones por defecto
+        # porque el event loop atiende muchas peticiones concurrentes
+        self.storage_client = AsyncServiceClient.from_env('storage', manager.storage_url, pool_size=100,
+                                                          read_timeout=5.0)
+        self.llm_client = AsyncServiceClient.from_env('llm', manager.llm_url, pool_size=100,
+                                                      read_timeout=60.0, retries=1)
+        self._release_lock_script = self.redis_clients[manager.shards[0].name].register_script(RELEASE_LOCK_SCRIPT)
+        self.policy_scripts = {}
+        self.inflight = {}
+
+        logger.info("Cache asíncrono configurado sobre redis.asyncio + httpx")
+
+    def _redis(self, question_id: int) -> aioredis.Redis:
+
+        return self.redis_clients[self.manager._shard(question_id).name]
+
+    def _scripts(self, shard: CacheShard) -> AsyncPolicyScripts:
+
+        scripts = self.policy_scripts.get(shard.name)
+        if scripts is None or scripts.policy is not shard.policy:
+            scripts = AsyncPolicyScripts(shard.policy, self.redis_clients[shard.name])
+            self.policy_scripts[shard.name] = scripts
+        return scripts
+
+    async def get_cached_response(self, question_id: int) -> Optional[Dict]:
+
+        manager = self.manager
+        cache_key = manager._generate_cache_key(question_id)
+        if manager.hot_keys:
+            manager.hot_keys.record(question_id)
+
+        if manager.l1_cache:
+            cached_response = manager.l1_cache.get(cache_key)
+            if cached_response is not None:
+                manager._record_deferred_hit(cache_key)
+                if manager.hot_keys:
+                    manager.hot_keys.record_result(question_id, 'l1')
+                print(f"⚡ CACHE HIT (L1) - Pregunta {question_id} encontrada en memoria")
+                logger.info(f"Cache HIT L1 para pregunta {question_id}")
+                return await self._check_freshness(question_id, cached_response)
+
+        try:
+            replica = manager._pick_hot_replica(question_id)
+            if replica is not None:
+                with manager.metrics.time(PHASE_METRIC, phase='redis_lookup'):
+                    cached_data = await self.redis_clients[replica.name].get(manager._hot_replica_key(question_id))
+                if cached_data:
+                    manager._record_deferred_hit(cache_key)
+                    manager.hot_keys.record_result(question_id, 'replica')
+                    print(f"🔥 CACHE HIT (réplica caliente) - Pregunta {question_id} servida desde {replica.name}")
+                    return await self._check_freshness(question_id, manager._decode_hit(cache_key, cached_data))
+
+            shard = manager._shard_for_key(cache_key)
+            with manager.metrics.time(PHASE_METRIC, phase='redis_lookup'):
+                cached_data = await self._scripts(shard).lookup(cache_key, shard.max_size, time.time())
+            if manager.hot_keys:
+                manager.hot_keys.record_result(question_id, 'shard' if cached_data else 'miss')
+            if cached_data:
+                print(f"🎯 CACHE HIT - Pregunta {question_id} encontrada en cache")
+                logger.info(f"Cache HIT para pregunta {question_id}")
+                return await self._check_freshness(question_id, manager._decode_hit(cache_key, cached_data))
+            else:
+                print(f"💾 CACHE MISS - Pregunta {question_id} no está en cache, procesando...")
+                logger.info(f"Cache MISS para pregunta {question_id}")
+                return None
+        except Exception as e:
+            logger.error(f"Error accediendo cache: {e}")
+            return None
+
+    async def _check_freshness(self, question_id: int, cached_response: Dict) -> Dict:
+
+        counter = self.manager._freshness_counter(question_id, cached_response)
+        if counter:
+            await self._redis(question_id).incr(counter)
+        return cached_response
+
+    async def store_response(self, question_id: int, response_data: Dict, compute_seconds: float = 0):
+
+        manager = self.manager
+        cache_key = manager._generate_cache_key(question_id)
+
+        try:
+            encoded = manager._encode_entry(question_id, response_data, compute_seconds)
+            if encoded is None:
+                return
+
+            shard = manager._shard_for_key(cache_key)
+            with manager.metrics.time(PHASE_METRIC, phase='store'):
+                evicted = await self._scripts(shard).store(cache_key, encoded, manager.cache_ttl, shard.max_size,
+                                                           time.time(), ENTRIES_INDEX_KEY, shard.max_bytes)
+            manager._record_evictions(evicted)
+            for replica, replica_keys in manager._hot_replica_drops(shard, evicted):
+                await self.redis_clients[replica.name].unlink(*replica_keys)
+            if manager._is_replicated(question_id):
+                ttl_ms = int(min(manager.cache_ttl, manager.hot_key_replica_ttl) * 1000)
+                for replica in manager._hot_replica_shards(question_id):
+                    await self.redis_clients[replica.name].set(manager._hot_replica_key(question_id),
+                                                               encoded, px=ttl_ms)
+
+            print(f"💾 Respuesta almacenada en cache para pregunta {question_id} (TTL: {manager.cache_ttl}s)")
+            logger.info(f"Respuesta almacenada en cache para pregunta {question_id}")
+
+        except Exception as e:
+            logger.error(f"Error almacenando en cache: {e}")
+
+    async def get_negative_response(self, question_id: int) -> Optional[Dict]:
+
+        try:
+            redis_client = self._redis(question_id)
+            with self.manager.metrics.time(PHASE_METRIC, phase='negative_lookup'):
+                cached_error = await redis_client.get(self.manager._negative_key(question_id))
+            if cached_error is None:
+                return None
+            await redis_client.incr("stats:negative_hits")
+        except Exception as e:
+            logger.error(f"Error accediendo cache negativo: {e}")
+            return None
+
+        return self.manager._negative_hit(question_id, cached_error)
+
+    async def store_negative_response(self, question_id: int, response_data: Dict) -> Dict:
+
+        manager = self.manager
+        error_type = response_data.get('error_type')
+        if not manager._negative_cache_enabled(error_type):
+            return response_data
+
+        try:
+            redis_client = self._redis(question_id)
+            failures = 0
+            if error_type != 'not_found':
+                pipe = redis_client.pipeline(transaction=False)
+                failures = (await queue_commands(pipe, manager._failure_commands(question_id)).execute())[0]
+
+            ttl = manager._negative_ttl(error_type, failures)
+            pipe = redis_client.pipeline(transaction=False)
+            await queue_commands(pipe, manager._negative_store_commands(question_id, response_data, ttl)).execute()
+            logger.info(f"Error de pregunta {question_id} ({error_type}) en cache negativo por {ttl:.1f}s")
+        except Exception as e:
+            logger.error(f"Error almacenando en cache negativo: {e}")
+        return response_data
+
+    async def _generate_response(self, question_id: int) -> Dict:
+
+        manager = self.manager
+        start_time = time.time()
+        try:
+            params = manager.stored_response_filter if manager.stored_responses_enabled else None
+            with manager.metrics.time(PHASE_METRIC, phase='storage_fetch'):
+                question_response = await self.storage_client.get(f"/question/{question_id}", params=params)
+            error = manager._question_status_error(question_id, question_response.status_code)
+            if error:
+                return await self.store_negative_response(question_id, error)
+
+            question_data = question_response.json()
+        except Exception as e:
+            logger.error(f"Error obteniendo pregunta {question_id}: {e}")
+            return await self.store_negative_response(
+                question_id, manager._error_response(question_id, "Error obteniendo pregunta"))
+
+        stored = manager._take_stored_response(question_id, question_data)
+        if stored:
+            await self._redis(question_id).incr("stats:stored_response_hits")
+            return await self._store_generated(question_id, stored, start_time)
+
+        print("🤖 Enviando pregunta al LLM Service para generar respuesta...")
+        try:
+            with manager.metrics.time(PHASE_METRIC, phase='llm_call'):
+                llm_response = await self.llm_client.post("/generate-response", json=question_data)
+            error = manager._llm_status_error(question_id, llm_response.status_code)
+            if error:
+                return await self.store_negative_response(question_id, error)
+
+            response_data = llm_response.json()
+            print("✅ Respuesta generada por LLM y evaluada")
+        except Exception as e:
+            print(f"❌ Error llamando LLM service: {e}")
+            logger.error(f"Error llamando LLM service: {e}")
+            return await self.store_negative_response(
+                question_id, manager._error_response(question_id, "Error en servicio LLM"))
+
+        return await self._store_generated(question_id, response_data, start_time)
+
+    async def _store_generated(self, question_id: int, response_data: Dict, start_time: float) -> Dict:
+
+        manager = self.manager
+        pipe = self._redis(question_id).pipeline(transaction=False)
+        await queue_commands(pipe, manager._generated_commands(question_id)).execute()
+
+        await self.store_response(question_id, response_data, time.time() - start_time)
+
+        manager._notify_access(question_id, False)
+
+        return response_data
+
+    async def _wait_for_remote_flight(self, question_id: int, lock_key: str) -> Optional[Dict]:
+
+        cache_key = self.manager._generate_cache_key(question_id)
+        redis_client = self._redis(question_id)
+        deadline = time.time() + self.manager.single_flight_wait_timeout
+        delay = 0.05
+        while time.time() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+            cached_data = await redis_client.get(cache_key)
+            if cached_data:
+                return self.manager._decode_flight_result(cached_data)
+            if not await redis_client.exists(lock_key):
+                return await self.get_negative_response(question_id)
+        return None
+
+    async def _generate_with_distributed_lock(self, question_id: int) -> Dict:
+
+        redis_client = self._redis(question_id)
+        lock_key = f"lock:question:{question_id}"
+        token = uuid.uuid4().hex
+
+        try:
+            acquired = await redis_client.set(lock_key, token, nx=True,
+                                              px=self.manager.single_flight_lock_ttl_ms)
+        except Exception as e:
+            logger.warning(f"Error adquiriendo lock {lock_key}, generando sin coordinación: {e}")
+            return await self._generate_response(question_id)
+
+        if acquired:
+            try:
+                return await self._generate_response(question_id)
+            finally:
+                try:
+                    await self._release_lock_script(keys=[lock_key], args=[token], client=redis_client)
+                except Exception as e:
+                    logger.warning(f"Error liberando lock {lock_key}: {e}")
+
+        print(f"⏳ Pregunta {question_id} ya se está generando en otra réplica, esperando resultado...")
+        with self.manager.metrics.time(PHASE_METRIC, phase='lock_wait'):
+            response_data = await self._wait_for_remote_flight(question_id, lock_key)
+        if response_data is not None:
+            response_data['coalesced'] = True
+            return response_data
+        return await self._generate_response(question_id)
+
+    async def _single_flight(self, question_id: int) -> Dict:
+
+        flight = self.inflight.get(question_id)
+        if flight is not None:
+            print(f"⏳ Pregunta {question_id} ya se está generando, esperando resultado compartido...")
+            try:
+                result = await asyncio.wait_for(asyncio.shield(flight), self.manager.single_flight_wait_timeout)
+            except asyncio.TimeoutError:
+                result = None
+            if result is not None:
+                response_data = dict(result)
+                response_data['coalesced'] = True
+                return response_data
+            return await self._generate_with_distributed_lock(question_id)
+
+        flight = asyncio.get_running_loop().create_future()
+        self.inflight[question_id] = flight
+        result = None
+        try:
+            result = await self._generate_with_distributed_lock(question_id)
+            return dict(result)
+        finally:
+            self.inflight.pop(question_id, None)
+            flight.set_result(result)
+
+    async def process_question_request(self, question_id: int) -> Dict:
+
+        start = time.perf_counter()
+        response_data = await self._process_question_request(question_id)
+        self.manager.metrics.observe(REQUEST_METRIC, time.perf_counter() - start,
+                                     outcome=self.manager._request_outcome(response_data))
+        return response_data
+
+    async def _process_question_request(self, question_id: int) -> Dict:
+
+        manager = self.manager
+        start_time = time.time()
+        print(f"\n🔄 PROCESANDO CONSULTA - Pregunta ID: {question_id}")
+
+        cached_response = await self.get_cached_response(question_id)
+        if cached_response:
+
+            manager._notify_access(question_id, True)
+
+            return manager._finalize_response(cached_response, start_time, True)
+
+        negative_response = await self.get_negative_response(question_id)
+        if negative_response:
+            return manager._finalize_response(negative_response, start_time)
+
+        response_data = await self._single_flight(question_id)
+        if "error" in response_data:
+            return response_data
+
+        if response_data.get('coalesced'):
+            pipe = self._redis(question_id).pipeline(transaction=False)
+            await queue_commands(pipe, manager._coalesced_commands()).execute()
+            manager._notify_access(question_id, False)
+
+        return manager._finalize_response(response_data, start_time, False)
+
+    async def close(self):
+
+        await self.storage_client.aclose()
+        await self.llm_client.aclose()
+        for redis_client in self.redis_clients.values():
+            await redis_client.close()
+
+async_cache_manager = AsyncCacheManager(cache_manager)
+
+async def health_check(request: Request):
+
+    try:
+        for redis_client in async_cache_manager.redis_clients.values():
+            await redis_client.ping()
+        return JSONResponse({"status": "healthy", "service": "cache", "mode": "asgi"})
+    except Exception:
+        return JSONResponse({"status": "unhealthy", "service": "cache", "mode": "asgi"}, status_code=500)
+
+async def process_question(request: Request):
+
+    question_id = request.path_params['question_id']
+    result = await async_cache_manager.process_question_request(question_id)
+    if request.query_params.get('full', 'false').lower() == 'true':
+        result = await asyncio.to_thread(cache_manager.rehydrate_response, question_id, result)
+    return JSONResponse(result)
+
+async def read_json(request: Request) -> Dict:
+
+    # Mismo criterio que json_body() en la app Flask: un cuerpo inválido responde 400, no 500
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+async def process_question_batch(request: Request):
+
+    data = await read_json(request)
+    question_ids = data.get('ids')
+
+    if not isinstance(question_ids, list) or not all(isinstance(i, int) for i in question_ids):
+        return JSONResponse({"error": "Se requiere una lista de IDs enteros"}, status_code=400)
+    if len(question_ids) > cache_manager.batch_max_ids:
+        return JSONResponse({"error": f"Máximo {cache_manager.batch_max_ids} IDs por lote"}, status_code=400)
+
+    if data.get('stream') or 'application/x-ndjson' in request.headers.get('accept', ''):
+        # Starlette itera generadores síncronos en su threadpool, sin bloquear el event loop
+        results = (json.dumps(result) + "\n" for result in cache_manager.iter_batch_results(question_ids))
+        return StreamingResponse(results, media_type='application/x-ndjson')
+
+    result = await asyncio.to_thread(cache_manager.process_batch_request, question_ids)
+    return JSONResponse(result)
+
+async def get_metrics(request: Request):
+
+    metrics = await asyncio.to_thread(cache_manager.render_metrics)
+    return PlainTextResponse(metrics, media_type='text/plain; version=0.0.4')
+
+async def get_cache_stats(request: Request):
+
+    stats = await asyncio.to_thread(cache_manager.get_cache_stats)
+    return JSONResponse(stats)
+
+async def clear_cache(request: Request):
+
+    try:
+        await asyncio.to_thread(cache_manager.clear_cache)
+        if request.query_params.get('warm', 'false').lower() == 'true':
+            cache_manager.start_warmup()
+        return JSONResponse({"success": True, "message": "Cache limpiado"})
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+async def warm_cache(request: Request):
+
+    data = await read_json(request)
+    limit = data.get('limit')
+    if limit is not None and (not isinstance(limit, int) or limit <= 0):
+        return JSONResponse({"error": "limit debe ser un entero positivo"}, status_code=400)
+
+    cache_manager.start_warmup(limit, bool(data.get('regenerate', False)))
+    return JSONResponse({"success": True, "message": "Precarga iniciada",
+                         "limit": limit or cache_manager.max_cache_size}, status_code=202)
+
+async def get_cache_config(request: Request):
+
+    return JSONResponse({"policy": cache_manager.cache_policy.value, "settings": cache_manager.get_settings()})
+
+async def update_cache_config(request: Request):
+
+    data = await read_json(request)
+    error = validate_settings(data)
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+
+    changed = await asyncio.to_thread(cache_manager.update_settings, data)
+    return JSONResponse({"success": True, "changed": changed, "settings": cache_manager.get_settings()})
+
+async def get_cache_replicas(request: Request):
+
+    replicas = await asyncio.to_thread(cache_manager.get_replicas)
+    return JSONResponse({"replica_id": cache_manager.replica_id, "replicas": replicas})
+
+async def rebalance_cache_shards(request: Request):
+
+    cache_manager.start_rebalance()
+    return JSONResponse({"success": True, "message": "Rebalanceo iniciado",
+                         "nodes": cache_manager.ring.nodes}, status_code=202)
+
+async def change_cache_policy(request: Request):
+
+    data = await read_json(request)
+    policy = data.get('policy')
+
+    if policy not in [p.value for p in CachePolicy]:
+        return JSONResponse({"error": "Política inválida"}, status_code=400)
+
+    await asyncio.to_thread(cache_manager.change_policy, CachePolicy(policy))
+    return JSONResponse({"success": True, "new_policy": policy})
+
+async def reset_cache_stats(request: Request):
+
+    try:
+        await asyncio.to_thread(cache_manager.reset_stats)
+        return JSONResponse({"success": True, "message": "Estadísticas reseteadas"})
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+app = Starlette(
+    routes=[
+        Route('/health', health_check, methods=['GET']),
+        Route('/question/{question_id:int}', process_question, methods=['GET']),
+        Route('/questions/batch', process_question_batch, methods=['POST']),
+        Route('/metrics', get_metrics, methods=['GET']),
+        Route('/cache/stats', get_cache_stats, methods=['GET']),
+        Route('/cache/clear', clear_cache, methods=['POST']),
+        Route('/cache/warm', warm_cache, methods=['POST']),
+        Route('/cache/config', get_cache_config, methods=['GET']),
+        Route('/cache/config', update_cache_config, methods=['POST']),
+        Route('/cache/replicas', get_cache_replicas, methods=['GET']),
+        Route('/cache/rebalance', rebalance_cache_shards, methods=['POST']),
+        Route('/cache/policy', change_cache_policy, methods=['POST']),
+        Route('/cache/reset-stats', reset_cache_stats, methods=['POST']),
+    ],
+    on_shutdown=[async_cache_manager.close]
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=8000)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+
+import json
+import zlib
+import logging
+from typing import Dict
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = 0x01
+
+SERIALIZERS = {'json': 1, 'msgpack': 2}
+COMPRESSIONS = {'none': 0, 'zlib': 1, 'zstd': 2, 'lz4': 3}
+
+FLAG_COMPACT = 0x01
+
+COMPACT_DROPPED_FIELDS = ('question_title', 'question_text', 'original_answer')
+
+class ValueCodec:
+    def __init__(self, serializer: str = 'json', compression: str = 'none',
+                 compression_min_bytes: int = 512, compact_schema: bool = False):
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Codec inválido: {serializer}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Compresión inválida: {compression}")
+
+        if serializer == 'msgpack' and msgpack is None:
+            logger.warning("msgpack no instalado, usando json")
+            serializer = 'json'
+        if (compression == 'zstd' and zstandard is None) or (compression == 'lz4' and lz4 is None):
+            logger.warning(f"{compression} no instalado, usando zlib")
+            compression = 'zlib'
+
+        self.serializer = serializer
+        self.compression = compression
+        self.compression_min_bytes = compression_min_bytes
+        self.compact_schema = compact_schema
+
+        self._zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+    def _serialize(self, value: Dict) -> bytes:
+
+        if self.serializer == 'msgpack':
+            return msgpack.packb(value, use_bin_type=True)
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    def _compress(self, payload: bytes) -> bytes:
+
+        if self.compression == 'zlib':
+            return zlib.compress(payload, 6)
+        if self.compression == 'zstd':
+            return self._zstd_compressor.compress(payload)
+        if self.compression == 'lz4':
+            return lz4.frame.compress(payload)
+        return payload
+
+    def _decompress(self, compression_id: int, payload: bytes) -> bytes:
+
+        if compression_id == COMPRESSIONS['zlib']:
+            return zlib.decompress(payload)
+        if compression_id == COMPRESSIONS['zstd']:
+            return self._zstd_decompressor.decompress(payload)
+        if compression_id == COMPRESSIONS['lz4']:
+            return lz4.frame.decompress(payload)
+        return payload
+
+    def encode(self, value: Dict) -> bytes:
+
+        flags = 0
+        if self.compact_schema:
+            value = {k: v for k, v in value.items() if k not in COMPACT_DROPPED_FIELDS}
+            flags |= FLAG_COMPACT
+
+        payload = self._serialize(value)
+        compression = self.compression
+        if compression != 'none' and len(payload) >= self.compression_min_bytes:
+            payload = self._compress(payload)
+        else:
+            compression = 'none'
+
+        header = bytes([MAGIC, SERIALIZERS[self.serializer], COMPRESSIONS[compression], flags])
+        return header + payload
+
+    def decode(self, data) -> Dict:
+
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if not data or data[0] != MAGIC:
+            return json.loads(data)
+
+        serializer_id, compression_id, flags = data[1], data[2], data[3]
+        payload = self._decompress(compression_id, data[4:])
+        if serializer_id == SERIALIZERS['msgpack']:
+            value = msgpack.unpackb(payload, raw=False)
+        else:
+            value = json.loads(payload)
+
+        if flags & FLAG_COMPACT:
+            value['compact'] = True
+        return value
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+
+import heapq
+import itertools
+import threading
+from typing import Dict, FrozenSet, Hashable, List, Tuple
+
+RESULT_TIERS = ('l1', 'replica', 'shard', 'miss')
+
+class SpaceSaving:
+    def __init__(self, capacity: int):
+        # Space-Saving: `capacity` contadores bastan para no perder ningún elemento con
+        # frecuencia > total/capacity; `error` acota cuánto se sobreestimó cada uno
+        self.capacity = capacity
+        self.counters: Dict[Hashable, List[float]] = {}
+        self.total = 0.0
+        # Min-heap con una entrada (cuenta, orden, clave) por contador; los contadores solo crecen
+        # entre decaimientos, así que una entrada desactualizada se corrige al llegar a la cima
+        self.heap: List[Tuple[float, int, Hashable]] = []
+        self.sequence = itertools.count()
+
+    def offer(self, key: Hashable, weight: float = 1.0):
+
+        self.total += weight
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [weight, 0.0]
+            heapq.heappush(self.heap, (weight, next(self.sequence), key))
+            return
+
+        while True:
+            count, _, victim = self.heap[0]
+            current = self.counters[victim][0]
+            if count == current:
+                break
+            heapq.heapreplace(self.heap, (current, next(self.sequence), victim))
+        floor = self.counters.pop(victim)[0]
+        self.counters[key] = [floor + weight, floor]
+        heapq.heapreplace(self.heap, (floor + weight, next(self.sequence), key))
+
+    def decay(self, factor: float):
+
+        self.total *= factor
+        for counter in self.counters.values():
+            counter[0] *= factor
+            counter[1] *= factor
+        # Escalar por un factor positivo conserva el orden del heap
+        self.heap = [(count * factor, order, key) for count, order, key in self.heap]
+
+    def top(self, n: int) -> List[Tuple[Hashable, float, float]]:
+
+        ranked = heapq.nlargest(n, self.counters.items(), key=lambda item: item[1][0])
+        return [(key, count, error) for key, (count, error) in ranked]
+
+class HotKeyTracker:
+    def __init__(self, capacity: int = 128, threshold: float = 0.01, max_hot: int = 16,
+                 min_requests: float = 100, decay: float = 0.5):
+        self.sketch = SpaceSaving(capacity)
+        self.threshold = threshold
+        self.max_hot = max_hot
+        self.min_requests = min_requests
+        self.decay = decay
+        self.lock = threading.Lock()
+        self.hot: FrozenSet[Hashable] = frozenset()
+        self.estimates: Dict[Hashable, Tuple[float, float]] = {}
+        self.results: Dict[Hashable, Dict[str, int]] = {}
+        self.detections = 0
+
+    def record(self, key: Hashable):
+
+        with self.lock:
+            self.sketch.offer(key)
+
+    def is_hot(self, key: Hashable) -> bool:
+
+        return key in self.hot
+
+    def record_result(self, key: Hashable, tier: str):
+
+        if key not in self.hot:
+            return
+        with self.lock:
+            results = self.results.setdefault(key, dict.fromkeys(RESULT_TIERS, 0))
+            results[tier] += 1
+
+    def refresh(self) -> Tuple[FrozenSet[Hashable], FrozenSet[Hashable]]:
+
+        with self.lock:
+            # Solo es caliente lo que supera el umbral aun restando el error máximo del sketch
+            total = self.sketch.total
+            estimates = {}
+            if total >= self.min_requests:
+                estimates = {key: (count, error) for key, count, error in self.sketch.top(self.max_hot)
+                             if count - error >= self.threshold * total}
+            hot = frozenset(estimates)
+            previous = self.hot
+            self.hot = hot
+            self.estimates = {key: (count / total, error / total) for key, (count, error) in estimates.items()}
+            for key in previous - hot:
+                self.results.pop(key, None)
+            self.detections += len(hot - previous)
+            self.sketch.decay(self.decay)
+        return hot - previous, previous - hot
+
+    def get_stats(self) -> List[Dict]:
+
+        with self.lock:
+            keys = []
+            for key, (share, error) in sorted(self.estimates.items(), key=lambda item: item[1][0], reverse=True):
+                results = self.results.get(key, dict.fromkeys(RESULT_TIERS, 0))
+                served = sum(results.values())
+                hits = served - results['miss']
+                keys.append({
+                    'key': key,
+                    'share': round(share, 4),
+                    'share_error': round(error, 4),
+                    **{f"{tier}_hits" if tier != 'miss' else 'misses': count for tier, count in results.items()},
+                    'hit_rate': round(hits / served, 4) if served > 0 else 0
+                })
+            return keys
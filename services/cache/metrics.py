@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+
+import math
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Límites acumulados que se exportan a Prometheus; internamente el histograma es más fino
+PROMETHEUS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+class LatencyHistogram:
+    def __init__(self, min_value: float = 1e-6, max_value: float = 600.0, buckets_per_octave: int = 16,
+                 export_bounds: Tuple[float, ...] = PROMETHEUS_BUCKETS):
+        # Buckets log-lineales al estilo HDR: error relativo acotado (~2^(1/16) ≈ 4.4%)
+        # en todo el rango, desde microsegundos hasta minutos, con memoria fija
+        self.min_value = min_value
+        self.log_growth = math.log(2) / buckets_per_octave
+        self.bucket_count = int(math.log(max_value / min_value) / self.log_growth) + 2
+        self.counts = [0] * self.bucket_count
+        # Los límites exportados no coinciden con los internos (0.0025 cae dentro de un bucket
+        # log), así que cada observación se cuenta también en su bucket `le` exacto
+        self.export_bounds = export_bounds
+        self.export_counts = [0] * (len(export_bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def upper_bound(self, index: int) -> float:
+
+        return self.min_value * math.exp(index * self.log_growth)
+
+    def record(self, value: float):
+
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(self.bucket_count - 1, int(math.log(value / self.min_value) / self.log_growth) + 1)
+        export_index = bisect.bisect_left(self.export_bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.export_counts[export_index] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+            maximum = self.max
+        if count == 0:
+            return 0.0
+        rank = max(1, math.ceil(q * count))
+        seen = 0
+        for index, bucket in enumerate(counts):
+            seen += bucket
+            if seen >= rank:
+                return min(self.upper_bound(index), maximum)
+        return maximum
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+
+        with self.lock:
+            counts = list(self.export_counts[:-1])
+        cumulative = []
+        seen = 0
+        for bound, count in zip(self.export_bounds, counts):
+            seen += count
+            cumulative.append((bound, seen))
+        return cumulative
+
+    def summary(self) -> Dict:
+
+        summary = {'count': self.count, 'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0}
+        for q in QUANTILES:
+            summary[f"p{round(q * 100)}_ms"] = round(self.quantile(q) * 1000, 3)
+        summary['max_ms'] = round(self.max * 1000, 3)
+        return summary
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], **extra) -> str:
+
+    pairs = list(labels) + sorted(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, Dict[Tuple, LatencyHistogram]] = {}
+        self.counters: Dict[str, Dict[Tuple, float]] = {}
+        self.descriptions: Dict[str, str] = {}
+
+    def describe(self, name: str, description: str):
+
+        self.descriptions[name] = description
+
+    def _histogram(self, name: str, labels: Tuple) -> LatencyHistogram:
+
+        series = self.histograms.get(name, {}).get(labels)
+        if series is None:
+            with self.lock:
+                series = self.histograms.setdefault(name, {}).setdefault(labels, LatencyHistogram())
+        return series
+
+    def observe(self, name: str, seconds: float, **labels):
+
+        self._histogram(name, tuple(sorted(labels.items()))).record(seconds)
+
+    @contextmanager
+    def time(self, name: str, **labels) -> Iterator[None]:
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def summary(self, name: str) -> Dict[str, Dict]:
+
+        return {','.join(value for _, value in labels) or 'all': histogram.summary()
+                for labels, histogram in sorted(self.histograms.get(name, {}).items())}
+
+    def render(self, gauges: Optional[Dict[str, Dict[Tuple, float]]] = None) -> str:
+
+        lines = []
+        for name, series in sorted(self.histograms.items()):
+            lines.append(f"# HELP {name} {self.descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(series.items()):
+                for bound, count in histogram.cumulative():
+                    lines.append(f"{name}_bucket{_format_labels(labels, le=repr(bound))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+            # Cuantiles calculados en el proceso, sin depender de histogram_quantile()
+            quantile_name = name.replace('_seconds', '_quantile_seconds')
+            lines.append(f"# HELP {quantile_name} Cuantiles de {name} desde el inicio del proceso")
+            lines.append(f"# TYPE {quantile_name} gauge")
+            for labels, histogram in sorted(series.items()):
+                for q in QUANTILES:
+                    lines.append(f"{quantile_name}{_format_labels(labels, quantile=str(q))} "
+                                 f"{histogram.quantile(q):.6f}")
+
+        with self.lock:
+            counters = {name: dict(series) for name, series in self.counters.items()}
+        for name, series in sorted(counters.items()):
+            lines.append(f"# HELP {name} {self.descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        for name, series in sorted((gauges or {}).items()):
+            lines.append(f"# HELP {name} {self.descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        return '\n'.join(lines) + '\n'
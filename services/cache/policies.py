@@ -0,0 +1,759 @@
+#!/usr/bin/env python3
+
+
+from typing import Dict, List, Optional
+from enum import Enum
+
+class CachePolicy(Enum):
+    LRU = "lru"
+    LFU = "lfu"
+    FIFO = "fifo"
+    SLRU = "slru"
+    ARC = "arc"
+    TINYLFU = "tinylfu"
+    GDS = "gds"
+
+SIZES_KEY = "cache:sizes"
+BYTES_KEY = "cache:bytes"
+
+POLICY_PRELUDE = """
+local sizes_key = 'cache:sizes'
+
+local function entry_size(key)
+    return tonumber(redis.call('HGET', sizes_key, key) or 1)
+end
+
+local function lowest(zset, avoid)
+    local candidates = redis.call('ZRANGE', zset, 0, 1)
+    for _, candidate in ipairs(candidates) do
+        if candidate ~= avoid then
+            return candidate
+        end
+    end
+    return nil
+end
+
+local function pop_lowest(zset, avoid)
+    local candidate = lowest(zset, avoid)
+    if candidate then
+        redis.call('ZREM', zset, candidate)
+    end
+    return candidate
+end
+
+local function record_miss(key)
+end
+"""
+
+STORE_TEMPLATE = """
+local key = KEYS[1]
+local prefix = KEYS[2]
+local index_key = KEYS[3]
+local bytes_key = KEYS[4]
+local value = ARGV[1]
+local ttl = tonumber(ARGV[2])
+local max_size = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local max_bytes = tonumber(ARGV[5])
+
+--POLICY--
+
+local function release(released_key)
+    local released_size = redis.call('HGET', sizes_key, released_key)
+    if not released_size then
+        return 0
+    end
+    redis.call('HDEL', sizes_key, released_key)
+    redis.call('DECRBY', bytes_key, released_size)
+    return tonumber(released_size)
+end
+
+local function prune_expired(limit)
+    local freed = 0
+    local expired = redis.call('ZRANGEBYSCORE', index_key, '-inf', now, 'LIMIT', 0, limit)
+    for _, expired_key in ipairs(expired) do
+        redis.call('ZREM', index_key, expired_key)
+        freed = freed + release(expired_key)
+        forget(expired_key)
+    end
+    return freed, #expired
+end
+
+prune_expired(64)
+
+local expires_at = redis.call('ZSCORE', index_key, key)
+redis.call('SET', key, value, 'EX', ttl)
+redis.call('ZADD', index_key, now + ttl, key)
+release(key)
+redis.call('HSET', sizes_key, key, #value)
+redis.call('INCRBY', bytes_key, #value)
+if expires_at and tonumber(expires_at) > now then
+    touch(key)
+else
+    forget(key)
+    insert(key)
+end
+redis.call('PUBLISH', 'cache:invalidations', key)
+
+local size = redis.call('ZCARD', index_key) - redis.call('ZCOUNT', index_key, '-inf', now)
+local used_bytes = tonumber(redis.call('GET', bytes_key) or 0)
+-- Las entradas vencidas siguen sumando en cache:bytes hasta podarlas: antes de desalojar
+-- entradas vivas por bytes se poda todo lo vencido que haga falta para entrar en el presupuesto
+while max_bytes > 0 and used_bytes > max_bytes do
+    local freed, pruned = prune_expired(64)
+    if pruned == 0 then
+        break
+    end
+    used_bytes = used_bytes - freed
+end
+local evicted = {}
+while size > max_size or (max_bytes > 0 and used_bytes > max_bytes) do
+    local victim = select_victim(key)
+    if not victim then
+        victim = lowest(index_key, key)
+        if not victim then
+            break
+        end
+        forget(victim)
+    end
+    local victim_expires_at = redis.call('ZSCORE', index_key, victim)
+    if victim_expires_at and tonumber(victim_expires_at) > now then
+        size = size - 1
+    end
+    used_bytes = used_bytes - release(victim)
+    redis.call('ZREM', index_key, victim)
+    redis.call('DEL', victim)
+    redis.call('PUBLISH', 'cache:invalidations', victim)
+    table.insert(evicted, victim)
+end
+return evicted
+"""
+
+LOOKUP_TEMPLATE = """
+local key = KEYS[1]
+local prefix = KEYS[2]
+local max_size = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+
+--POLICY--
+
+redis.call('INCR', 'stats:total_requests')
+local value = redis.call('GET', key)
+if not value then
+    record_miss(key)
+    return false
+end
+
+touch(key)
+redis.call('INCR', 'stats:cache_hits')
+return value
+"""
+
+LOOKUP_MANY_TEMPLATE = """
+local prefix = KEYS[1]
+local max_size = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+
+--POLICY--
+
+local values = {}
+local hits = 0
+for i = 3, #ARGV do
+    local key = ARGV[i]
+    local value = redis.call('GET', key)
+    if value then
+        touch(key)
+        hits = hits + 1
+        values[#values + 1] = value
+    else
+        record_miss(key)
+        values[#values + 1] = false
+    end
+end
+redis.call('INCRBY', 'stats:total_requests', #ARGV - 2)
+redis.call('INCRBY', 'stats:cache_hits', hits)
+return values
+"""
+
+TOUCH_MANY_TEMPLATE = """
+local prefix = KEYS[1]
+local index_key = KEYS[2]
+local max_size = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+
+--POLICY--
+
+local total_hits = 0
+for i = 3, #ARGV, 2 do
+    local key = ARGV[i]
+    local hits = tonumber(ARGV[i + 1])
+    total_hits = total_hits + hits
+    local expires_at = redis.call('ZSCORE', index_key, key)
+    if expires_at and tonumber(expires_at) > now then
+        for _ = 1, math.min(hits, 16) do
+            touch(key)
+        end
+    end
+end
+redis.call('INCRBY', 'stats:total_requests', total_hits)
+redis.call('INCRBY', 'stats:cache_hits', total_hits)
+return total_hits
+"""
+
+REMOVE_MANY_TEMPLATE = """
+local prefix = KEYS[1]
+local index_key = KEYS[2]
+local bytes_key = KEYS[3]
+local max_size = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+
+--POLICY--
+
+local removed = 0
+for i = 3, #ARGV do
+    local key = ARGV[i]
+    forget(key)
+    redis.call('ZREM', index_key, key)
+    local size = redis.call('HGET', sizes_key, key)
+    if size then
+        redis.call('HDEL', sizes_key, key)
+        redis.call('DECRBY', bytes_key, size)
+    end
+    removed = removed + redis.call('DEL', key)
+    redis.call('PUBLISH', 'cache:invalidations', key)
+end
+return removed
+"""
+
+ADOPT_TEMPLATE = """
+local prefix = KEYS[1]
+local index_key = KEYS[2]
+local max_size = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+
+--POLICY--
+
+local adopted = 0
+for i = 4, #ARGV do
+    local key = ARGV[i]
+    local expires_at = redis.call('ZSCORE', index_key, key)
+    if expires_at and tonumber(expires_at) > now and redis.call('EXISTS', key) == 1 then
+        adopt(key, tonumber(expires_at) - ttl)
+        adopted = adopted + 1
+    end
+end
+return adopted
+"""
+
+class EvictionPolicy:
+    name = None
+    segments = ('',)
+    extra_keys = ()
+    lua = ""
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.prefix = self.segment_key('')
+        self.sources = {}
+        self._store_script = self._register('store', STORE_TEMPLATE)
+        self._lookup_script = self._register('lookup', LOOKUP_TEMPLATE)
+        self._lookup_many_script = self._register('lookup_many', LOOKUP_MANY_TEMPLATE)
+        self._touch_many_script = self._register('touch_many', TOUCH_MANY_TEMPLATE)
+        self._adopt_script = self._register('adopt', ADOPT_TEMPLATE)
+        self._remove_many_script = self._register('remove_many', REMOVE_MANY_TEMPLATE)
+
+    def _register(self, name: str, template: str):
+
+        source = template.replace('--POLICY--', POLICY_PRELUDE + self.lua)
+        self.sources[name] = source
+        self.redis_client.script_load(source)
+        return self.redis_client.register_script(source)
+
+    @classmethod
+    def segment_key(cls, segment: str) -> str:
+
+        prefix = f"cache:{cls.name}"
+        return f"{prefix}:{segment}" if segment else prefix
+
+    @classmethod
+    def metadata_keys(cls) -> List[str]:
+
+        return [cls.segment_key(s) for s in cls.segments + cls.extra_keys]
+
+    def lookup(self, cache_key: str, max_size: int, now: float) -> Optional[str]:
+
+        return self._lookup_script(keys=[cache_key, self.prefix], args=[max_size, now])
+
+    def store(self, cache_key: str, value: bytes, ttl: int, max_size: int, now: float, index_key: str,
+              max_bytes: int = 0) -> List[str]:
+
+        return self._store_script(keys=[cache_key, self.prefix, index_key, BYTES_KEY],
+                                  args=[value, ttl, max_size, now, max_bytes])
+
+    def store_many(self, entries: List, ttl: int, max_size: int, now: float, index_key: str,
+                   max_bytes: int = 0) -> List[List[str]]:
+
+        # Cada entrada es (clave, valor) o (clave, valor, ttl) para conservar el TTL restante
+        pipe = self.redis_client.pipeline(transaction=False)
+        for entry in entries:
+            cache_key, value = entry[0], entry[1]
+            entry_ttl = entry[2] if len(entry) > 2 else ttl
+            self._store_script(keys=[cache_key, self.prefix, index_key, BYTES_KEY],
+                               args=[value, entry_ttl, max_size, now, max_bytes], client=pipe)
+        return pipe.execute()
+
+    def lookup_many(self, cache_keys: List[str], max_size: int, now: float) -> List[Optional[bytes]]:
+
+        return self._lookup_many_script(keys=[self.prefix], args=[max_size, now] + list(cache_keys))
+
+    def touch_many(self, hits: Dict[str, int], max_size: int, now: float, index_key: str) -> int:
+
+        args = [max_size, now]
+        for cache_key, count in hits.items():
+            args.extend([cache_key, count])
+        return self._touch_many_script(keys=[self.prefix, index_key], args=args)
+
+    def adopt_many(self, cache_keys: List[str], ttl: int, max_size: int, now: float, index_key: str) -> int:
+
+        return self._adopt_script(keys=[self.prefix, index_key], args=[max_size, now, ttl] + list(cache_keys))
+
+    def remove_many(self, cache_keys: List[str], max_size: int, now: float, index_key: str) -> int:
+
+        return self._remove_many_script(keys=[self.prefix, index_key, BYTES_KEY],
+                                        args=[max_size, now] + list(cache_keys))
+
+    def get_stats(self) -> Dict:
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for segment in self.segments:
+            pipe.zcard(self.segment_key(segment))
+        counts = pipe.execute()
+
+        stats = {}
+        for segment, count in zip(self.segments, counts):
+            label = f"{self.name}_{segment}_entries" if segment else f"{self.name}_entries"
+            stats[label] = count
+        return stats
+
+class AsyncPolicyScripts:
+    def __init__(self, policy: EvictionPolicy, redis_client):
+        self.policy = policy
+        self._store_script = redis_client.register_script(policy.sources['store'])
+        self._lookup_script = redis_client.register_script(policy.sources['lookup'])
+
+    async def lookup(self, cache_key: str, max_size: int, now: float) -> Optional[bytes]:
+
+        return await self._lookup_script(keys=[cache_key, self.policy.prefix], args=[max_size, now])
+
+    async def store(self, cache_key: str, value: bytes, ttl: int, max_size: int, now: float, index_key: str,
+                    max_bytes: int = 0) -> List[bytes]:
+
+        return await self._store_script(keys=[cache_key, self.policy.prefix, index_key, BYTES_KEY],
+                                        args=[value, ttl, max_size, now, max_bytes])
+
+class LRUPolicy(EvictionPolicy):
+    name = "lru"
+    lua = """
+local function touch(key)
+    redis.call('ZADD', prefix, now, key)
+end
+
+local function insert(key)
+    redis.call('ZADD', prefix, now, key)
+end
+
+local function forget(key)
+    redis.call('ZREM', prefix, key)
+end
+
+local function select_victim(avoid)
+    return pop_lowest(prefix, avoid)
+end
+
+local function adopt(key, inserted_at)
+    redis.call('ZADD', prefix, 'NX', inserted_at, key)
+end
+"""
+
+class LFUPolicy(EvictionPolicy):
+    name = "lfu"
+    lua = """
+local function touch(key)
+    redis.call('ZINCRBY', prefix, 1, key)
+end
+
+local function insert(key)
+    redis.call('ZADD', prefix, 1, key)
+end
+
+local function forget(key)
+    redis.call('ZREM', prefix, key)
+end
+
+local function select_victim(avoid)
+    return pop_lowest(prefix, avoid)
+end
+
+local function adopt(key, inserted_at)
+    redis.call('ZADD', prefix, 'NX', 1, key)
+end
+"""
+
+class FIFOPolicy(EvictionPolicy):
+    name = "fifo"
+    lua = """
+local function touch(key)
+    if not redis.call('ZSCORE', prefix, key) then
+        redis.call('ZADD', prefix, now, key)
+    end
+end
+
+local function insert(key)
+    redis.call('ZADD', prefix, now, key)
+end
+
+local function forget(key)
+    redis.call('ZREM', prefix, key)
+end
+
+local function select_victim(avoid)
+    return pop_lowest(prefix, avoid)
+end
+
+local function adopt(key, inserted_at)
+    redis.call('ZADD', prefix, 'NX', inserted_at, key)
+end
+"""
+
+class SLRUPolicy(EvictionPolicy):
+    name = "slru"
+    segments = ('probation', 'protected')
+    lua = """
+local probation = prefix .. ':probation'
+local protected = prefix .. ':protected'
+
+local function touch(key)
+    if redis.call('ZREM', probation, key) == 1 or redis.call('ZSCORE', protected, key) then
+        redis.call('ZADD', protected, now, key)
+        if redis.call('ZCARD', protected) > math.max(1, math.floor(max_size * 0.8)) then
+            local demoted = pop_lowest(protected, key)
+            if demoted then
+                redis.call('ZADD', probation, now, demoted)
+            end
+        end
+    else
+        redis.call('ZADD', probation, now, key)
+    end
+end
+
+local function insert(key)
+    redis.call('ZADD', probation, now, key)
+end
+
+local function forget(key)
+    redis.call('ZREM', probation, key)
+    redis.call('ZREM', protected, key)
+end
+
+local function select_victim(avoid)
+    return pop_lowest(probation, avoid) or pop_lowest(protected, avoid)
+end
+
+local function adopt(key, inserted_at)
+    if not redis.call('ZSCORE', probation, key) and not redis.call('ZSCORE', protected, key) then
+        redis.call('ZADD', probation, inserted_at, key)
+    end
+end
+"""
+
+class ARCPolicy(EvictionPolicy):
+    name = "arc"
+    segments = ('t1', 't2', 'b1', 'b2')
+    extra_keys = ('p',)
+    lua = """
+local t1 = prefix .. ':t1'
+local t2 = prefix .. ':t2'
+local b1 = prefix .. ':b1'
+local b2 = prefix .. ':b2'
+local target_key = prefix .. ':p'
+local ghost_b2_hit = false
+
+local function target()
+    return tonumber(redis.call('GET', target_key) or 0)
+end
+
+local function touch(key)
+    if redis.call('ZREM', t1, key) == 1 or redis.call('ZSCORE', t2, key) then
+        redis.call('ZADD', t2, now, key)
+    else
+        redis.call('ZADD', t1, now, key)
+    end
+end
+
+local function insert(key)
+    if redis.call('ZSCORE', b1, key) then
+        local delta = math.max(1, redis.call('ZCARD', b2) / redis.call('ZCARD', b1))
+        redis.call('SET', target_key, math.min(max_size, target() + delta))
+        redis.call('ZREM', b1, key)
+        redis.call('ZADD', t2, now, key)
+    elseif redis.call('ZSCORE', b2, key) then
+        local delta = math.max(1, redis.call('ZCARD', b1) / redis.call('ZCARD', b2))
+        redis.call('SET', target_key, math.max(0, target() - delta))
+        redis.call('ZREM', b2, key)
+        redis.call('ZADD', t2, now, key)
+        ghost_b2_hit = true
+    else
+        redis.call('ZADD', t1, now, key)
+    end
+end
+
+local function forget(key)
+    redis.call('ZREM', t1, key)
+    redis.call('ZREM', t2, key)
+end
+
+local function trim_ghosts()
+    local t1_size = redis.call('ZCARD', t1)
+    local b1_excess = t1_size + redis.call('ZCARD', b1) - max_size
+    if b1_excess > 0 then
+        redis.call('ZREMRANGEBYRANK', b1, 0, b1_excess - 1)
+    end
+    local b2_excess = t1_size + redis.call('ZCARD', t2) + redis.call('ZCARD', b1)
+        + redis.call('ZCARD', b2) - 2 * max_size
+    if b2_excess > 0 then
+        redis.call('ZREMRANGEBYRANK', b2, 0, b2_excess - 1)
+    end
+end
+
+local function select_victim(avoid)
+    local t1_size = redis.call('ZCARD', t1)
+    local p = target()
+    local victim = nil
+    if t1_size > 0 and (t1_size > p or (ghost_b2_hit and t1_size == math.floor(p))) then
+        victim = pop_lowest(t1, avoid)
+        if victim then
+            redis.call('ZADD', b1, now, victim)
+        end
+    end
+    if not victim then
+        victim = pop_lowest(t2, avoid)
+        if victim then
+            redis.call('ZADD', b2, now, victim)
+        end
+    end
+    if not victim then
+        victim = pop_lowest(t1, avoid)
+        if victim then
+            redis.call('ZADD', b1, now, victim)
+        end
+    end
+    trim_ghosts()
+    return victim
+end
+
+local function adopt(key, inserted_at)
+    if not redis.call('ZSCORE', t1, key) and not redis.call('ZSCORE', t2, key) then
+        redis.call('ZADD', t1, inserted_at, key)
+    end
+end
+"""
+
+    def get_stats(self) -> Dict:
+
+        stats = super().get_stats()
+        stats['arc_target_t1'] = round(float(self.redis_client.get(self.segment_key('p')) or 0), 2)
+        return stats
+
+class TinyLFUPolicy(EvictionPolicy):
+    name = "tinylfu"
+    segments = ('window', 'probation', 'protected')
+    extra_keys = ('sketch', 'aging_cursor')
+    lua = """
+local window = prefix .. ':window'
+local probation = prefix .. ':probation'
+local protected = prefix .. ':protected'
+local sketch = prefix .. ':sketch'
+local aging_cursor = prefix .. ':aging_cursor'
+local window_capacity = math.max(1, math.floor(max_size * 0.01))
+local protected_capacity = math.max(1, math.floor((max_size - window_capacity) * 0.8))
+local sketch_width = math.max(256, max_size * 4)
+local sketch_slots_total = 4 * sketch_width
+-- Envejecimiento incremental: cada acceso divide a la mitad unas pocas celdas bajo un
+-- cursor, de modo que todo el sketch se recorre una vez cada 10 * max_size accesos
+local aging_step = math.ceil(sketch_slots_total / (10 * max_size))
+
+local function sketch_slots(key)
+    local digest = redis.sha1hex(key)
+    local slots = {}
+    for row = 0, 3 do
+        local hash = tonumber(string.sub(digest, row * 8 + 1, row * 8 + 8), 16)
+        table.insert(slots, row .. ':' .. (hash % sketch_width))
+    end
+    return slots
+end
+
+local function frequency(key)
+    local counts = redis.call('HMGET', sketch, unpack(sketch_slots(key)))
+    local estimate = nil
+    for _, count in ipairs(counts) do
+        local value = tonumber(count) or 0
+        if not estimate or value < estimate then
+            estimate = value
+        end
+    end
+    return estimate or 0
+end
+
+local function record_access(key)
+    for _, slot in ipairs(sketch_slots(key)) do
+        redis.call('HINCRBY', sketch, slot, 1)
+    end
+    local cursor = tonumber(redis.call('GET', aging_cursor) or 0) % sketch_slots_total
+    local aged = {}
+    for offset = 0, aging_step - 1 do
+        local index = (cursor + offset) % sketch_slots_total
+        table.insert(aged, math.floor(index / sketch_width) .. ':' .. (index % sketch_width))
+    end
+    local counts = redis.call('HMGET', sketch, unpack(aged))
+    for i, slot in ipairs(aged) do
+        local count = tonumber(counts[i])
+        if count then
+            local halved = math.floor(count / 2)
+            if halved > 0 then
+                redis.call('HSET', sketch, slot, halved)
+            else
+                redis.call('HDEL', sketch, slot)
+            end
+        end
+    end
+    redis.call('SET', aging_cursor, (cursor + aging_step) % sketch_slots_total)
+end
+
+local function record_miss(key)
+    record_access(key)
+end
+
+local function touch(key)
+    record_access(key)
+    if redis.call('ZSCORE', window, key) then
+        redis.call('ZADD', window, now, key)
+    elseif redis.call('ZREM', probation, key) == 1 or redis.call('ZSCORE', protected, key) then
+        redis.call('ZADD', protected, now, key)
+        if redis.call('ZCARD', protected) > protected_capacity then
+            local demoted = pop_lowest(protected, key)
+            if demoted then
+                redis.call('ZADD', probation, now, demoted)
+            end
+        end
+    else
+        redis.call('ZADD', probation, now, key)
+    end
+end
+
+local function insert(key)
+    redis.call('ZADD', window, now, key)
+    local main_size = redis.call('ZCARD', probation) + redis.call('ZCARD', protected)
+    if redis.call('ZCARD', window) > window_capacity and main_size < max_size - window_capacity then
+        local candidate = pop_lowest(window, key)
+        if candidate then
+            redis.call('ZADD', probation, now, candidate)
+        end
+    end
+end
+
+local function forget(key)
+    redis.call('ZREM', window, key)
+    redis.call('ZREM', probation, key)
+    redis.call('ZREM', protected, key)
+end
+
+local function select_victim(avoid)
+    if redis.call('ZCARD', window) > window_capacity then
+        local candidate = pop_lowest(window, avoid)
+        if candidate then
+            local main_victim = lowest(probation, avoid)
+            local main_segment = probation
+            if not main_victim then
+                main_victim = lowest(protected, avoid)
+                main_segment = protected
+            end
+            if not main_victim then
+                return candidate
+            end
+            if frequency(candidate) > frequency(main_victim) then
+                redis.call('ZREM', main_segment, main_victim)
+                redis.call('ZADD', probation, now, candidate)
+                return main_victim
+            end
+            return candidate
+        end
+    end
+    return pop_lowest(probation, avoid) or pop_lowest(protected, avoid) or pop_lowest(window, avoid)
+end
+
+local function adopt(key, inserted_at)
+    if not redis.call('ZSCORE', window, key) and not redis.call('ZSCORE', probation, key)
+        and not redis.call('ZSCORE', protected, key) then
+        redis.call('ZADD', probation, inserted_at, key)
+    end
+end
+"""
+
+    def get_stats(self) -> Dict:
+
+        stats = super().get_stats()
+        stats['tinylfu_sketch_counters'] = self.redis_client.hlen(self.segment_key('sketch'))
+        return stats
+
+class GDSPolicy(EvictionPolicy):
+    name = "gds"
+    extra_keys = ('inflation',)
+    lua = """
+local inflation_key = prefix .. ':inflation'
+
+local function priority(key)
+    return tonumber(redis.call('GET', inflation_key) or 0) + 1024 / math.max(entry_size(key), 1)
+end
+
+local function touch(key)
+    redis.call('ZADD', prefix, priority(key), key)
+end
+
+local function insert(key)
+    redis.call('ZADD', prefix, priority(key), key)
+end
+
+local function forget(key)
+    redis.call('ZREM', prefix, key)
+end
+
+local function select_victim(avoid)
+    local victim = lowest(prefix, avoid)
+    if victim then
+        redis.call('SET', inflation_key, redis.call('ZSCORE', prefix, victim))
+        redis.call('ZREM', prefix, victim)
+    end
+    return victim
+end
+
+local function adopt(key, inserted_at)
+    if not redis.call('ZSCORE', prefix, key) then
+        redis.call('ZADD', prefix, priority(key), key)
+    end
+end
+"""
+
+POLICIES = {
+    CachePolicy.LRU: LRUPolicy,
+    CachePolicy.LFU: LFUPolicy,
+    CachePolicy.FIFO: FIFOPolicy,
+    CachePolicy.SLRU: SLRUPolicy,
+    CachePolicy.ARC: ARCPolicy,
+    CachePolicy.TINYLFU: TinyLFUPolicy,
+    CachePolicy.GDS: GDSPolicy,
+}
+
+def create_policy(policy: CachePolicy, redis_client) -> EvictionPolicy:
+
+    return POLICIES[policy](redis_client)
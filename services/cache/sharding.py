@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+
+import bisect
+import hashlib
+import redis
+from typing import Dict, Iterable, List, Optional
+
+class CacheShard:
+    def __init__(self, host: str, port: int, db: int = 0):
+        self.name = f"{host}:{port}"
+        self.host = host
+        self.port = port
+        self.db = db
+        self.client = redis.Redis(host=host, port=port, db=db, decode_responses=True)
+        self.raw = redis.Redis(host=host, port=port, db=db, decode_responses=False)
+        self.policy = None
+        self.max_size = 0
+        self.max_bytes = 0
+
+    @classmethod
+    def from_address(cls, address: str, db: int = 0, default_port: int = 6379) -> 'CacheShard':
+
+        host, _, port = address.strip().rpartition(':')
+        if not host:
+            host, port = port, default_port
+        return cls(host, int(port), db)
+
+def split_capacity(total: int, parts: int) -> List[int]:
+
+    # Reparto exacto: la suma de las partes es `total` (el resto va a las primeras)
+    share, remainder = divmod(total, parts)
+    return [share + 1 if index < remainder else share for index in range(parts)]
+
+class HashRing:
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 160):
+        # Cada nodo ocupa `vnodes` puntos del anillo, así el espacio de claves se
+        # reparte de forma pareja y al agregar un nodo solo se remapea ~1/N de ellas
+        self.vnodes = vnodes
+        self.hashes: List[int] = []
+        self.owners: List[str] = []
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+    @property
+    def nodes(self) -> List[str]:
+
+        return sorted(set(self.owners))
+
+    def add_node(self, node: str):
+
+        if node in self.owners:
+            return
+        for replica in range(self.vnodes):
+            point = self._hash(f"{node}#{replica}")
+            index = bisect.bisect(self.hashes, point)
+            self.hashes.insert(index, point)
+            self.owners.insert(index, node)
+
+    def remove_node(self, node: str):
+
+        points = [(point, owner) for point, owner in zip(self.hashes, self.owners) if owner != node]
+        self.hashes = [point for point, _ in points]
+        self.owners = [owner for _, owner in points]
+
+    def get_node(self, key: str) -> Optional[str]:
+
+        if not self.owners:
+            return None
+        if len(self.owners) == self.vnodes:
+            return self.owners[0]
+        index = bisect.bisect(self.hashes, self._hash(key)) % len(self.hashes)
+        return self.owners[index]
+
+    def distribution(self) -> Dict[str, float]:
+
+        # Fracción del espacio de hashes que posee cada nodo (arco hasta su punto)
+        space = 2 ** 64
+        shares = {node: 0 for node in set(self.owners)}
+        for index, (point, owner) in enumerate(zip(self.hashes, self.owners)):
+            previous = self.hashes[index - 1] if index > 0 else self.hashes[-1] - space
+            shares[owner] += point - previous
+        return {node: round(share / space, 4) for node, share in sorted(shares.items())}
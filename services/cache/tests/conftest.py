@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+import redis
+
+CACHE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(CACHE_DIR))
+sys.path.insert(0, CACHE_DIR)
+
+# Un FakeServer por dirección host:port, así cada nodo de REDIS_NODES es un shard independiente
+SERVERS = {}
+
+class FakeNode(fakeredis.FakeRedis):
+    def __init__(self, *args, **kwargs):
+        address = (kwargs.pop('host', 'localhost'), kwargs.pop('port', 6379))
+        super().__init__(*args, server=SERVERS.setdefault(address, fakeredis.FakeServer()), **kwargs)
+
+redis.Redis = FakeNode
+os.environ.setdefault('REDIS_NODES', 'redis:6379')
+os.environ.setdefault('STORAGE_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('LLM_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('HOT_KEYS_ENABLED', 'false')
+
+import app as cache_app
+
+@pytest.fixture
+def make_manager(monkeypatch):
+
+    # Cada test arranca con nodos Redis vacíos y su propio entorno
+    def factory(reset=True, **env):
+        if reset:
+            SERVERS.clear()
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        return cache_app.CacheManager()
+
+    return factory
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import app as cache_app
+
+class RecordingStorage:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.release = threading.Event()
+
+    def post(self, path, json=None, **kwargs):
+
+        # Retiene el primer POST para que las notificaciones siguientes se acumulen en la cola
+        self.release.wait(5)
+        self.batches.append((path, json))
+        if self.fail:
+            raise ConnectionError("storage caído")
+        return self
+
+    def raise_for_status(self):
+
+        pass
+
+def _wait(predicate, timeout=5.0):
+
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.02)
+    assert predicate()
+
+def _dropped(manager, reason):
+
+    return manager.metrics.counters.get(cache_app.ACCESS_DROPPED_METRIC, {}).get((('reason', reason),), 0)
+
+def test_access_notifications_are_coalesced_per_batch(make_manager):
+
+    manager = make_manager()
+    storage = manager.storage_client = RecordingStorage()
+    manager._notify_access(1, False)
+    _wait(lambda: manager.access_queue.empty())
+    for _ in range(50):
+        manager._notify_access(7, True)
+    manager._notify_access(8, False)
+    storage.release.set()
+
+    _wait(lambda: sum(access['count'] for _, batch in storage.batches for access in batch['accesses']) == 52)
+    assert all(path == "/questions/access" for path, _ in storage.batches)
+    assert len(storage.batches) < 52
+    totals = {}
+    for _, batch in storage.batches:
+        for access in batch['accesses']:
+            count, hits = totals.get(access['question_id'], (0, 0))
+            totals[access['question_id']] = (count + access['count'], hits + access['cache_hits'])
+    assert totals == {1: (1, 0), 7: (50, 50), 8: (1, 0)}
+
+def test_dropped_notifications_are_counted(make_manager):
+
+    manager = make_manager(ACCESS_QUEUE_SIZE=2)
+    storage = manager.storage_client = RecordingStorage(fail=True)
+    manager._notify_access(1, True)
+    _wait(lambda: manager.access_queue.empty())
+    for question_id in range(5):
+        manager._notify_access(question_id, True)
+    assert _dropped(manager, 'queue_full') == 3
+
+    storage.release.set()
+    _wait(lambda: _dropped(manager, 'error') == 3)
@@ -0,0 +1,84 @@
+import app as cache_app
+
+QUESTION = {'id': 42, 'title': 't', 'question': 'q', 'best_answer': 'a'}
+STORED = {'llm_response': 'persistida', 'quality_score': 0.5, 'response_time_ms': 10,
+          'llm_model': 'gemini-pro', 'created_at': '2026-01-01T00:00:00'}
+LLM_PAYLOAD = {'question_id': 42, 'question_title': 't', 'question_text': 'q', 'original_answer': 'a',
+               'llm_response': 'nueva', 'response_time_ms': 20, 'llm_model': 'gemini-pro',
+               'composite_score': 0.8, 'cosine_similarity': 0.7, 'bleu_score': 0.6, 'length_similarity': 0.9,
+               'keyword_overlap': 0.5, 'weights': {'cosine': 0.4, 'bleu': 0.3, 'length': 0.1, 'keyword': 0.2},
+               'evaluation_time_ms': 3, 'original_length': 1, 'llm_length': 1, 'stored': True}
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+
+        return dict(self.payload)
+
+    def raise_for_status(self):
+
+        pass
+
+class FakeStorage:
+    def __init__(self, stored=STORED):
+        self.stored = stored
+
+    def get(self, path, params=None, **kwargs):
+
+        question = dict(QUESTION)
+        if params and params.get('include_response'):
+            question['stored_response'] = dict(self.stored)
+        return FakeResponse(question)
+
+    def post(self, path, **kwargs):
+
+        return FakeResponse({'success': True})
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def post(self, path, json=None, **kwargs):
+
+        self.calls += 1
+        return FakeResponse(LLM_PAYLOAD)
+
+def _manager(make_manager):
+
+    manager = make_manager(CACHE_SOFT_TTL=60)
+    manager.storage_client = FakeStorage()
+    manager.llm_client = FakeLLM()
+    return manager
+
+def test_background_refresh_regenerates_instead_of_rereading_storage(make_manager):
+
+    manager = _manager(make_manager)
+    assert manager._request_generation(42)['llm_response'] == 'persistida'
+    assert manager.llm_client.calls == 0
+
+    manager._refresh_entry(42)
+    assert manager.llm_client.calls == 1
+    assert manager.get_cached_response(42)['llm_response'] == 'nueva'
+    assert int(manager._shard(42).client.get('stats:background_refreshes')) == 1
+
+def test_stored_tier_response_has_the_llm_response_shape(make_manager):
+
+    manager = _manager(make_manager)
+    manager.storage_client = FakeStorage(dict(STORED, score_details={
+        field: LLM_PAYLOAD[field] for field in cache_app.SCORE_FIELDS if field != 'composite_score'}))
+    stored = manager._request_generation(42)
+    generated = manager._request_generation(42, skip_stored=True)
+
+    assert stored['source'] == 'storage' and 'source' not in generated
+    assert set(stored) - {'stored_at', 'source'} == set(generated)
+    assert stored['cosine_similarity'] == generated['cosine_similarity']
+
+def test_stored_tier_response_without_details_keeps_the_shape(make_manager):
+
+    manager = _manager(make_manager)
+    stored = manager._request_generation(42)
+    assert set(stored) - {'stored_at', 'source'} == set(LLM_PAYLOAD)
+    assert stored['composite_score'] == 0.5 and stored['cosine_similarity'] is None
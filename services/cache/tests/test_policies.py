@@ -0,0 +1,25 @@
+import fakeredis
+import pytest
+
+from policies import BYTES_KEY, CachePolicy, create_policy
+
+INDEX_KEY = "cache:entries"
+VALUE = b'x' * 100
+
+@pytest.mark.parametrize('policy', list(CachePolicy))
+def test_expired_entries_do_not_evict_live_ones_for_bytes(policy):
+
+    client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+    scripts = create_policy(policy, client)
+    live_keys = [f"question:{i}" for i in range(5)]
+    for key in live_keys:
+        scripts.store(key, VALUE, 100000, 1000, 1000.0, INDEX_KEY)
+    # 200 entradas vencidas (20 KB) que por sí solas superan con creces el presupuesto de bytes
+    for i in range(200):
+        scripts.store(f"question:{1000 + i}", VALUE, 10, 1000, 1000.0, INDEX_KEY)
+
+    evicted = scripts.store("question:5", VALUE, 100000, 1000, 2000.0, INDEX_KEY, max_bytes=700)
+    assert evicted == []
+    assert all(client.exists(key) for key in live_keys)
+    assert int(client.get(BYTES_KEY)) == 600
+    assert client.zcard(INDEX_KEY) == 6
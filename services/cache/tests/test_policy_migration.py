@@ -0,0 +1,59 @@
+import time
+
+import app as cache_app
+from policies import CachePolicy, LFUPolicy
+
+def _store(manager, count):
+
+    for question_id in range(count):
+        manager.store_response(question_id, {'question_id': question_id, 'llm_response': 'x'})
+
+def _wait_completed(manager, timeout=10.0):
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        state = manager.redis_client.hgetall(cache_app.POLICY_MIGRATION_KEY)
+        if state.get('status') == 'completed':
+            return state
+        time.sleep(0.05)
+    raise AssertionError(f"la migración no terminó: {state}")
+
+def _adopted(shard):
+
+    return {key for key, _ in shard.client.zscan_iter(LFUPolicy.segment_key(''))}
+
+def _indexed(shard):
+
+    return {key for key, _ in shard.client.zscan_iter(cache_app.ENTRIES_INDEX_KEY)}
+
+def test_pending_migration_is_resumed_from_the_saved_cursor(make_manager):
+
+    manager = make_manager(REDIS_NODES='r1:6379,r2:6379', POLICY_MIGRATION_RATE=100000)
+    _store(manager, 40)
+    first, second = manager.shards
+
+    # Una réplica cambió a LFU, migró el primer shard y murió: su lock venció y quedó el cursor guardado
+    manager.redis_client.set(cache_app.POLICY_CONFIG_KEY, CachePolicy.LFU.value)
+    manager.redis_client.hset(cache_app.POLICY_MIGRATION_KEY, mapping={
+        'status': 'running', 'policy': 'lfu', 'migrated': 7, 'shard': second.name, 'cursor': 0})
+
+    manager._resume_pending_migration()
+    state = _wait_completed(manager)
+    assert _adopted(second) == _indexed(second)
+    assert not _adopted(first)
+    assert int(state['migrated']) == 7 + len(_indexed(second))
+
+def test_policy_change_leaves_a_marker_that_other_replicas_resume(make_manager):
+
+    manager = make_manager(REDIS_NODES='r1:6379,r2:6379', POLICY_MIGRATION_RATE=100000)
+    _store(manager, 40)
+    manager._mark_migration_pending(CachePolicy.LFU)
+    manager.redis_client.set(cache_app.POLICY_CONFIG_KEY, CachePolicy.LFU.value)
+
+    # Otra réplica que arranca (o su heartbeat) encuentra la marca sin lock y completa la migración
+    other = make_manager(reset=False, REDIS_NODES='r1:6379,r2:6379', POLICY_MIGRATION_RATE=100000)
+    assert other.cache_policy == CachePolicy.LFU
+    other._resume_pending_migration()
+    _wait_completed(other)
+    for shard in other.shards:
+        assert _adopted(shard) == _indexed(shard)
@@ -0,0 +1,16 @@
+import pytest
+from starlette.testclient import TestClient
+
+import app as cache_app
+import asgi_app
+
+MALFORMED_BODIES = [b'{"ids": [1, 2', b'[1, 2, 3]', b'\xff\xfe']
+
+@pytest.mark.parametrize('path', ['/questions/batch', '/cache/policy', '/cache/config'])
+@pytest.mark.parametrize('body', MALFORMED_BODIES)
+def test_malformed_json_returns_same_400_in_both_servers(path, body):
+
+    flask_response = cache_app.app.test_client().post(path, data=body, content_type='application/json')
+    asgi_response = TestClient(asgi_app.app).post(path, content=body, headers={'content-type': 'application/json'})
+    assert flask_response.status_code == asgi_response.status_code == 400
+    assert flask_response.get_json() == asgi_response.json()
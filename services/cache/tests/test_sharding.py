@@ -0,0 +1,43 @@
+import time
+
+import app as cache_app
+from sharding import split_capacity
+
+def test_split_capacity_sums_to_total():
+
+    for total in (0, 1, 99, 100, 1000, 4096):
+        for parts in range(1, 8):
+            shares = split_capacity(total, parts)
+            assert sum(shares) == total
+            assert max(shares) - min(shares) <= 1
+
+def test_shard_limits_sum_to_max_cache_size(make_manager):
+
+    manager = make_manager(REDIS_NODES='r1:6379,r2:6379,r3:6379', MAX_CACHE_SIZE=100, MAX_CACHE_BYTES=1000)
+    assert [shard.max_size for shard in manager.shards] == [34, 33, 33]
+    assert sum(shard.max_size for shard in manager.shards) == 100
+    assert sum(shard.max_bytes for shard in manager.shards) == 1000
+
+def _wait_rebalance(manager, timeout=10.0):
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if manager.redis_client.hget(cache_app.SHARD_REBALANCE_KEY, 'status') in ('completed', 'failed'):
+            return
+        time.sleep(0.05)
+    raise AssertionError("el rebalanceo no terminó")
+
+def test_rebalance_keeps_total_limit_with_uneven_shard_count(make_manager):
+
+    manager = make_manager(REDIS_NODES='r1:6379,r2:6379', MAX_CACHE_SIZE=7)
+    for question_id in range(20):
+        manager.store_response(question_id, {'question_id': question_id, 'llm_response': 'x'})
+    assert manager.get_cache_stats()['current_size'] <= 7
+
+    # Un tercer nodo: 7 no se divide entre 3 y el límite total tiene que seguir siendo 7
+    grown = make_manager(reset=False, REDIS_NODES='r1:6379,r2:6379,r3:6379', MAX_CACHE_SIZE=7)
+    _wait_rebalance(grown)
+    assert sorted(shard.max_size for shard in grown.shards) == [2, 2, 3]
+    for question_id in range(20, 40):
+        grown.store_response(question_id, {'question_id': question_id, 'llm_response': 'x'})
+    assert grown.get_cache_stats()['current_size'] <= 7
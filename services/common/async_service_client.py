@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+
+import time
+import asyncio
+import httpx
+from typing import Dict
+
+from common.service_client import BaseServiceClient
+
+class AsyncServiceClient(BaseServiceClient):
+    connect_errors = (httpx.ConnectTimeout,)
+    transport_errors = (httpx.TransportError,)
+
+    def __init__(self, name: str, base_url: str, pool_size: int = 10, **kwargs):
+        # Mismo nombre de ajustes (<NAME>_HTTP_*) que el cliente síncrono, distinto nombre en las estadísticas
+        super().__init__(f"{name}_async", base_url, pool_size=pool_size, **kwargs)
+
+        connect_timeout, read_timeout = self.timeout
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+
+    def _connection_trace(self):
+
+        # httpcore informa cada connect() a través de la extensión "trace"
+        started = []
+
+        async def trace(event_name: str, info: Dict):
+            if event_name == 'connection.connect_tcp.started':
+                started.append(time.perf_counter())
+            elif event_name == 'connection.connect_tcp.complete' and started:
+                self.timer.record(time.perf_counter() - started.pop())
+
+        return trace
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+
+        method = method.upper()
+        self._start_request()
+
+        attempt = 0
+        while True:
+            error = None
+            response = None
+            try:
+                response = await self.client.request(method, path, extensions={'trace': self._connection_trace()},
+                                                     **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            else:
+                self._record_response()
+
+            status_code = response.status_code if response is not None else None
+            if not self._should_retry(method, path, attempt, error, status_code):
+                break
+
+            attempt += 1
+            if response is not None:
+                await response.aclose()
+            await asyncio.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+
+        if error is not None:
+            self._record_error()
+            raise error
+        return response
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+
+        return await self.request('POST', path, **kwargs)
+
+    async def aclose(self):
+
+        await self.client.aclose()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+
+import os
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Métodos que se pueden reintentar ante cualquier fallo de transporte; el resto
+# solo se reintenta si la conexión no llegó a establecerse (la petición no salió)
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRYABLE_STATUS = frozenset({502, 503, 504})
+
+class ConnectionTimer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.connect_seconds = 0.0
+
+    def record(self, seconds: float):
+
+        with self.lock:
+            self.connections += 1
+            self.connect_seconds += seconds
+
+class TimedHTTPConnection(HTTPConnection):
+    timer: Optional[ConnectionTimer] = None
+
+    def connect(self):
+
+        start = time.perf_counter()
+        super().connect()
+        if self.timer is not None:
+            self.timer.record(time.perf_counter() - start)
+
+class TimedHTTPSConnection(HTTPSConnection):
+    timer: Optional[ConnectionTimer] = None
+
+    def connect(self):
+
+        start = time.perf_counter()
+        super().connect()
+        if self.timer is not None:
+            self.timer.record(time.perf_counter() - start)
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def __init__(self, timer: ConnectionTimer, **kwargs):
+        self.timer = timer
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+
+        super().init_poolmanager(*args, **kwargs)
+        http_connection = type('TimedHTTPConnection', (TimedHTTPConnection,), {'timer': self.timer})
+        https_connection = type('TimedHTTPSConnection', (TimedHTTPSConnection,), {'timer': self.timer})
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('TimedHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http_connection}),
+            'https': type('TimedHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': https_connection}),
+        }
+
+class RetryBudget:
+    def __init__(self, ratio: float, burst: float):
+        # Cada petición deposita `ratio` fichas y cada reintento consume una,
+        # con un máximo acumulado de `burst` (evita tormentas de reintentos)
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self.lock = threading.Lock()
+
+    def deposit(self):
+
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+
+        with self.lock:
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+class BaseServiceClient:
+    # Excepciones de transporte de la librería HTTP concreta (ver _retryable)
+    connect_errors: tuple = ()
+    transport_errors: tuple = ()
+
+    def __init__(self, name: str, base_url: str, pool_size: int = 10, connect_timeout: float = 2.0,
+                 read_timeout: float = 10.0, retries: int = 2, retry_backoff: float = 0.1,
+                 retry_budget_ratio: float = 0.1, retry_budget_burst: float = 10.0):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.retry_budget = RetryBudget(retry_budget_ratio, retry_budget_burst)
+
+        self.timer = ConnectionTimer()
+        self.stats_lock = threading.Lock()
+        self.requests = 0
+        self.responses = 0
+        self.retried = 0
+        self.budget_exhausted = 0
+        self.errors = 0
+
+        _clients.append(self)
+        logger.info(f"Cliente HTTP '{name}' → {self.base_url} (pool={pool_size}, "
+                    f"timeout={connect_timeout}s/{read_timeout}s, reintentos={retries})")
+
+    @classmethod
+    def from_env(cls, name: str, base_url: str, **defaults) -> 'BaseServiceClient':
+
+        prefix = f"{name.upper()}_HTTP_"
+        overrides = {
+            'pool_size': ('POOL_SIZE', int),
+            'connect_timeout': ('CONNECT_TIMEOUT', float),
+            'read_timeout': ('TIMEOUT', float),
+            'retries': ('RETRIES', int),
+            'retry_budget_ratio': ('RETRY_BUDGET', float),
+        }
+        for option, (suffix, cast) in overrides.items():
+            value = os.getenv(prefix + suffix)
+            if value is not None:
+                defaults[option] = cast(value)
+        return cls(name, base_url, **defaults)
+
+    def _retryable(self, method: str, error: Optional[Exception], status_code: Optional[int]) -> bool:
+
+        if error is not None:
+            if isinstance(error, self.connect_errors):
+                return True
+            return method in IDEMPOTENT_METHODS and isinstance(error, self.transport_errors)
+        return method in IDEMPOTENT_METHODS and status_code in RETRYABLE_STATUS
+
+    def _start_request(self):
+
+        with self.stats_lock:
+            self.requests += 1
+        self.retry_budget.deposit()
+
+    def _record_response(self):
+
+        with self.stats_lock:
+            self.responses += 1
+
+    def _record_error(self):
+
+        with self.stats_lock:
+            self.errors += 1
+
+    def _should_retry(self, method: str, path: str, attempt: int, error: Optional[Exception],
+                      status_code: Optional[int]) -> bool:
+
+        if attempt >= self.retries or not self._retryable(method, error, status_code):
+            return False
+        if not self.retry_budget.withdraw():
+            with self.stats_lock:
+                self.budget_exhausted += 1
+            logger.warning(f"Presupuesto de reintentos agotado para '{self.name}', sin reintentar {method} {path}")
+            return False
+        with self.stats_lock:
+            self.retried += 1
+        return True
+
+    def get_stats(self) -> Dict:
+
+        with self.stats_lock:
+            total_requests = self.requests
+            responses = self.responses
+            retried = self.retried
+            budget_exhausted = self.budget_exhausted
+            errors = self.errors
+        with self.timer.lock:
+            connections = self.timer.connections
+            connect_seconds = self.timer.connect_seconds
+
+        avg_connect_ms = connect_seconds / connections * 1000 if connections > 0 else 0
+        # Cada respuesta servida por una conexión ya abierta ahorra un connect()
+        reused = max(0, responses - connections)
+        saved_ms = reused * avg_connect_ms
+
+        return {
+            "target": self.base_url,
+            "pool_size": self.pool_size,
+            "connect_timeout": self.timeout[0],
+            "read_timeout": self.timeout[1],
+            "requests": total_requests,
+            "connections_opened": connections,
+            "connections_reused": reused,
+            "avg_connect_ms": round(avg_connect_ms, 3),
+            "connect_time_saved_ms": round(saved_ms, 3),
+            "connect_time_saved_per_request_ms": round(saved_ms / total_requests, 3) if total_requests > 0 else 0,
+            "retries": retried,
+            "retry_budget_exhausted": budget_exhausted,
+            "errors": errors
+        }
+
+class ServiceClient(BaseServiceClient):
+    connect_errors = (requests.exceptions.ConnectTimeout,)
+    transport_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+    def __init__(self, name: str, base_url: str, pool_size: int = 10, **kwargs):
+        super().__init__(name, base_url, pool_size=pool_size, **kwargs)
+
+        self.session = requests.Session()
+        adapter = TimedHTTPAdapter(self.timer, pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method: str, path: str, timeout=None, **kwargs) -> requests.Response:
+
+        method = method.upper()
+        url = f"{self.base_url}{path}"
+        timeout = timeout if timeout is not None else self.timeout
+        self._start_request()
+
+        attempt = 0
+        while True:
+            error = None
+            response = None
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                error = e
+            else:
+                self._record_response()
+
+            status_code = response.status_code if response is not None else None
+            if not self._should_retry(method, path, attempt, error, status_code):
+                break
+
+            attempt += 1
+            if response is not None:
+                response.close()
+            time.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+
+        if error is not None:
+            self._record_error()
+            raise error
+        return response
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+
+        return self.request('POST', path, **kwargs)
+
+_clients: List[BaseServiceClient] = []
+
+def get_client_stats() -> Dict:
+
+    return {client.name: client.get_stats() for client in _clients}
@@ -4,10 +4,10 @@
 import os
 import time
 import logging
-import requests
 from flask import Flask, jsonify, request
 from typing import Dict, Optional
 import google.generativeai as genai
+from common.service_client import ServiceClient, get_client_stats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,6 +25,7 @@ class LLMManager:
 
         self.score_url = os.getenv('SCORE_URL', 'http://score:8000')
         self.storage_url = os.getenv('STORAGE_URL', 'http://storage:8000')
+        self.score_client = ServiceClient.from_env('score', self.score_url, pool_size=10, read_timeout=30.0, retries=1)
 
         self.generation_config = {
             'temperature': 0.7,
@@ -87,11 +88,7 @@ Proporciona una respuesta informativa, precisa y bien estructurada. La respuesta
             }
 
             try:
-                score_response = requests.post(
-                    f"{self.score_url}/evaluate-response",
-                    json=response_data,
-                    timeout=30
-                )
+                score_response = self.score_client.post("/evaluate-response", json=response_data)
                 
                 if score_response.status_code == 200:
                     score_data = score_response.json()
@@ -170,6 +167,11 @@ def get_model_info():
     info = llm_manager.get_model_info()
     return jsonify(info)
 
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    
+    return jsonify({"service": "llm", "http_clients": get_client_stats()})
+
 @app.route('/test-generation', methods=['POST'])
 def test_generation():
     
@@ -4,7 +4,6 @@
 import os
 import time
 import logging
-import requests
 import numpy as np
 from flask import Flask, jsonify, request
 from typing import Dict, List, Optional
@@ -14,6 +13,7 @@ import nltk
 from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
 from nltk.tokenize import word_tokenize
 import re
+from common.service_client import ServiceClient, get_client_stats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,6 +23,7 @@ app = Flask(__name__)
 class ScoreManager:
     def __init__(self):
         self.storage_url = os.getenv('STORAGE_URL', 'http://storage:8000')
+        self.storage_client = ServiceClient.from_env('storage', self.storage_url, pool_size=10, read_timeout=10.0)
 
         try:
             nltk.data.find('tokenizers/punkt')
@@ -201,14 +202,13 @@ class ScoreManager:
                     'llm_response': llm_response,
                     'quality_score': scores['composite_score'],
                     'response_time_ms': response_data.get('response_time_ms'),
-                    'llm_model': response_data.get('llm_model', 'unknown')
+                    'llm_model': response_data.get('llm_model', 'unknown'),
+                    # El resto de las métricas, para que el cache sirva la respuesta persistida completa
+                    'score_details': {key: value for key, value in scores.items()
+                                      if key not in ('composite_score', 'question_id')}
                 }
                 
-                storage_response = requests.post(
-                    f"{self.storage_url}/llm-response",
-                    json=storage_data,
-                    timeout=10
-                )
+                storage_response = self.storage_client.post("/llm-response", json=storage_data)
                 
                 if storage_response.status_code == 200:
                     scores['stored'] = True
@@ -245,7 +245,7 @@ class ScoreManager:
         
         try:
 
-            storage_response = requests.get(f"{self.storage_url}/stats")
+            storage_response = self.storage_client.get("/stats")
             if storage_response.status_code == 200:
                 storage_stats = storage_response.json()
             else:
@@ -260,7 +260,8 @@ class ScoreManager:
                     'length': 0.1,
                     'keyword': 0.2
                 },
-                'storage_stats': storage_stats
+                'storage_stats': storage_stats,
+                'http_clients': get_client_stats()
             }
             
         except Exception as e:
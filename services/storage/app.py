@@ -1,11 +1,20 @@
 #!/usr/bin/env python3
 
 import os
+import time
+import atexit
+import bisect
 import logging
+import threading
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from flask import Flask, jsonify, request
-from typing import Dict, List, Optional, Any
+from array import array
+from contextlib import contextmanager
+from itertools import accumulate
+from psycopg2 import errors, extensions
+from psycopg2.extras import Json, RealDictCursor
+from psycopg2.pool import PoolError
+from flask import Flask, Response, jsonify, request
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Sequence, Tuple
 import random
 
 logging.basicConfig(level=logging.INFO)
@@ -13,6 +22,451 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+MAX_BULK_IDS = int(os.getenv('MAX_BULK_IDS', 1000))
+MAX_TOP_QUESTIONS = int(os.getenv('MAX_TOP_QUESTIONS', 10000))
+MAX_BULK_RANGES = int(os.getenv('MAX_BULK_RANGES', 100))
+MAX_BULK_STREAM_IDS = int(os.getenv('MAX_BULK_STREAM_IDS', 2000000))
+BULK_STREAM_BATCH = int(os.getenv('BULK_STREAM_BATCH', 2000))
+
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 2))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 20))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+DB_POOL_CHECK_INTERVAL = float(os.getenv('DB_POOL_CHECK_INTERVAL', 30))
+DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', 1800))
+RANDOM_SAMPLER_REFRESH = float(os.getenv('RANDOM_SAMPLER_REFRESH', 60))
+STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', 2))
+STATS_ROLLUP_INTERVAL = float(os.getenv('STATS_ROLLUP_INTERVAL', 10))
+
+# Write-behind de contadores de acceso: con ACCESS_WRITE_BEHIND=false cada acceso se
+# escribe al instante; si no, un fallo del proceso pierde a lo más ACCESS_FLUSH_INTERVAL s
+ACCESS_WRITE_BEHIND = os.getenv('ACCESS_WRITE_BEHIND', 'true').lower() == 'true'
+ACCESS_FLUSH_INTERVAL = float(os.getenv('ACCESS_FLUSH_INTERVAL', 1))
+ACCESS_FLUSH_MAX_PENDING = int(os.getenv('ACCESS_FLUSH_MAX_PENDING', 5000))
+
+# Última respuesta LLM de cada pregunta que cumple el umbral de calidad/edad;
+# usa idx_llm_responses_question_created para leer solo la fila más reciente
+STORED_RESPONSE_COLUMNS = """,
+                               lr.llm_response, lr.quality_score, lr.response_time_ms, lr.llm_model,
+                               lr.score_details, lr.created_at AS response_created_at"""
+
+STORED_RESPONSE_JOIN = """
+                        LEFT JOIN LATERAL (
+                            SELECT llm_response, quality_score, response_time_ms, llm_model, score_details, created_at
+                            FROM llm_responses
+                            WHERE question_id = yq.id
+                              AND (%(min_quality)s IS NULL OR quality_score >= %(min_quality)s)
+                              AND (%(max_age)s IS NULL
+                                   OR created_at >= CURRENT_TIMESTAMP - %(max_age)s * INTERVAL '1 second')
+                            ORDER BY created_at DESC
+                            LIMIT 1
+                        ) lr ON TRUE"""
+
+QUESTION_COLUMNS = "yq.id, yq.yahoo_id, yq.class_id, yq.title, yq.question, yq.best_answer"
+
+# Consultas del camino caliente que cada conexión prepara una sola vez (PREPARE) y
+# luego ejecuta por nombre (EXECUTE): el servidor reutiliza el análisis y el plan
+PREPARED_STATEMENTS = {
+    'question_by_id': ('integer', f"""
+                        SELECT {QUESTION_COLUMNS}
+                        FROM yahoo_questions yq
+                        WHERE yq.id = $1"""),
+    'question_by_id_with_response': ('integer, numeric, double precision', f"""
+                        SELECT {QUESTION_COLUMNS}{STORED_RESPONSE_COLUMNS}
+                        FROM yahoo_questions yq{STORED_RESPONSE_JOIN}
+                        WHERE yq.id = $1""".replace('%(min_quality)s', '$2').replace('%(max_age)s', '$3')),
+    'record_access': ('integer, integer', """
+                        INSERT INTO question_stats (question_id, access_count, cache_hits, last_accessed)
+                        VALUES ($1, 1, $2, CURRENT_TIMESTAMP)
+                        ON CONFLICT (question_id) DO UPDATE
+                        SET access_count = question_stats.access_count + 1,
+                            cache_hits = question_stats.cache_hits + EXCLUDED.cache_hits,
+                            last_accessed = EXCLUDED.last_accessed"""),
+    'save_llm_response': ('integer, text, numeric, integer, varchar, jsonb', """
+                        INSERT INTO llm_responses (question_id, llm_response, quality_score,
+                                                 response_time_ms, llm_model, score_details)
+                        VALUES ($1, $2, $3, $4, $5, $6)"""),
+}
+
+# Un único upsert por flush con los deltas acumulados. El JOIN descarta IDs inexistentes
+# (que de otro modo harían fallar todo el lote por la FK) y last_accessed se reconstruye
+# con el reloj del servidor a partir de la antigüedad de cada acceso
+FLUSH_ACCESS_SQL = """
+                        INSERT INTO question_stats (question_id, access_count, cache_hits, last_accessed)
+                        SELECT d.question_id, d.accesses, d.hits, CURRENT_TIMESTAMP - d.age * INTERVAL '1 second'
+                        FROM unnest(%s::integer[], %s::integer[], %s::integer[], %s::double precision[])
+                             AS d(question_id, accesses, hits, age)
+                        JOIN yahoo_questions yq ON yq.id = d.question_id
+                        ORDER BY d.question_id
+                        ON CONFLICT (question_id) DO UPDATE
+                        SET access_count = question_stats.access_count + EXCLUDED.access_count,
+                            cache_hits = question_stats.cache_hits + EXCLUDED.cache_hits,
+                            last_accessed = GREATEST(question_stats.last_accessed, EXCLUDED.last_accessed)"""
+
+class PooledConnection(extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+class ConnectionPool:
+    def __init__(self, db_config: Dict, min_size: int = 2, max_size: int = 20, timeout: float = 5,
+                 check_interval: float = 30, max_lifetime: float = 1800):
+        # Como máximo `max_size` conexiones abiertas; quien llega con el pool agotado
+        # espera hasta `timeout` segundos a que otra petición devuelva la suya
+        self.db_config = db_config
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.max_lifetime = max_lifetime
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        self.idle: List[PooledConnection] = []
+        self.in_use = 0
+        self.stats = dict.fromkeys(('created', 'reused', 'discarded', 'health_checks', 'failed_checks',
+                                    'waits', 'timeouts'), 0)
+        self.wait_seconds = 0.0
+
+        try:
+            for _ in range(self.min_size):
+                self.idle.append(self._connect())
+        except psycopg2.Error as e:
+            logger.warning(f"No se pudo precalentar el pool de conexiones: {e}")
+
+    def _connect(self) -> PooledConnection:
+
+        conn = psycopg2.connect(**self.db_config, connection_factory=PooledConnection,
+                                cursor_factory=RealDictCursor)
+        with self.lock:
+            self.stats['created'] += 1
+        return conn
+
+    def _close(self, conn: PooledConnection):
+
+        with self.lock:
+            self.stats['discarded'] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _healthy(self, conn: PooledConnection) -> bool:
+
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if now - conn.created_at > self.max_lifetime:
+            return False
+        if now - conn.last_used < self.check_interval:
+            return True
+
+        # Conexión ociosa por mucho tiempo: el servidor o un proxy pudo haberla cortado
+        with self.lock:
+            self.stats['health_checks'] += 1
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self.lock:
+                self.stats['failed_checks'] += 1
+            return False
+
+    def acquire(self) -> PooledConnection:
+
+        if not self.slots.acquire(blocking=False):
+            start = time.perf_counter()
+            acquired = self.slots.acquire(timeout=self.timeout)
+            with self.lock:
+                self.stats['waits'] += 1
+                self.wait_seconds += time.perf_counter() - start
+                if not acquired:
+                    self.stats['timeouts'] += 1
+            if not acquired:
+                raise PoolError(f"Sin conexiones disponibles tras {self.timeout}s")
+
+        try:
+            while True:
+                with self.lock:
+                    conn = self.idle.pop() if self.idle else None
+                if conn is None:
+                    conn = self._connect()
+                    break
+                if self._healthy(conn):
+                    with self.lock:
+                        self.stats['reused'] += 1
+                    break
+                self._close(conn)
+        except Exception:
+            self.slots.release()
+            raise
+
+        with self.lock:
+            self.in_use += 1
+        return conn
+
+    def release(self, conn: PooledConnection, discard: bool = False):
+
+        try:
+            if not discard and not conn.closed:
+                try:
+                    if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+            if discard or conn.closed:
+                self._close(conn)
+            else:
+                conn.last_used = time.monotonic()
+                with self.lock:
+                    self.idle.append(conn)
+        finally:
+            with self.lock:
+                self.in_use -= 1
+            self.slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+
+        conn = self.acquire()
+        discard = False
+        try:
+            # Mismo contrato que `with psycopg2.connect()`: commit al salir, rollback ante error
+            with conn:
+                yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard)
+
+    def close(self):
+
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            self._close(conn)
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self.lock:
+            stats = dict(self.stats)
+            stats.update({
+                'max_size': self.max_size,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'avg_wait_ms': round(self.wait_seconds / stats['waits'] * 1000, 3) if stats['waits'] else 0
+            })
+        return stats
+
+class RandomSampler:
+    def __init__(self, db_manager: 'DatabaseManager', refresh_interval: float = 60):
+        # IDs agrupados por clase en arreglos compactos (4 bytes por ID): elegir preguntas
+        # al azar cuesta O(log clases) por muestra, sin ordenar ni recorrer la tabla
+        self.db_manager = db_manager
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.ids: Dict[int, array] = {}
+        self.sizes: Dict[int, int] = {}
+        self.max_id = 0
+        self.refreshed_at = 0.0
+
+    def _refresh(self):
+
+        # Solo se leen las filas nuevas: los IDs SERIAL crecen, así que basta con id > último visto
+        added = 0
+        with self.db_manager.get_connection() as conn:
+            with conn.cursor(name='random_sampler_ids', cursor_factory=extensions.cursor) as cursor:
+                cursor.itersize = 50000
+                cursor.execute("SELECT id, class_id FROM yahoo_questions WHERE id > %s ORDER BY id",
+                               (self.max_id,))
+                for question_id, class_id in cursor:
+                    self.ids.setdefault(class_id, array('i')).append(question_id)
+                    self.max_id = question_id
+                    added += 1
+
+        # Los lectores usan el snapshot de tamaños, así nunca indexan más allá de lo publicado
+        self.sizes = {class_id: len(ids) for class_id, ids in self.ids.items()}
+        self.refreshed_at = time.monotonic()
+        if added:
+            logger.info(f"Muestreador aleatorio: {added} IDs nuevos ({sum(self.sizes.values())} en total)")
+
+    def _ensure_fresh(self):
+
+        if not self.refreshed_at:
+            with self.lock:
+                if not self.refreshed_at:
+                    self._refresh()
+        elif time.monotonic() - self.refreshed_at > self.refresh_interval and self.lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            except Exception as e:
+                logger.warning(f"No se pudo refrescar el muestreador aleatorio: {e}")
+            finally:
+                self.lock.release()
+
+    def _draw(self, k: int, sizes: Dict[int, int]) -> List[int]:
+
+        classes = list(sizes)
+        cumulative = list(accumulate(sizes[class_id] for class_id in classes))
+        total = cumulative[-1] if cumulative else 0
+        drawn = []
+        for position in random.sample(range(total), min(k, total)):
+            index = bisect.bisect_right(cumulative, position)
+            offset = position - (cumulative[index - 1] if index else 0)
+            drawn.append(self.ids[classes[index]][offset])
+        return drawn
+
+    def sample(self, n: int = 1, class_id: Optional[int] = None, stratified: bool = False) -> List[int]:
+
+        self._ensure_fresh()
+        sizes = self.sizes
+        if class_id is not None:
+            sizes = {class_id: sizes[class_id]} if class_id in sizes else {}
+        if not stratified or len(sizes) <= 1:
+            return self._draw(n, sizes)
+
+        # Estratificado: la misma cantidad por clase y el resto a clases elegidas al azar
+        classes = list(sizes)
+        extra = set(random.sample(classes, n % len(classes)))
+        drawn = []
+        for stratum in classes:
+            drawn.extend(self._draw(n // len(classes) + (stratum in extra), {stratum: sizes[stratum]}))
+        random.shuffle(drawn)
+        return drawn
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        return {
+            'ids': sum(self.sizes.values()),
+            'classes': len(self.sizes),
+            'max_id': self.max_id,
+            'refreshed_ago_s': round(time.monotonic() - self.refreshed_at, 1) if self.refreshed_at else None
+        }
+
+class AccessCounterBuffer:
+    def __init__(self, db_manager: 'DatabaseManager', flush_interval: float = 1, max_pending: int = 5000):
+        # Deltas por pregunta: [accesos, cache hits, instante del último acceso]
+        self.db_manager = db_manager
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pending: Dict[int, List[float]] = {}
+        self.oldest_pending: Optional[float] = None
+        self.stats = dict.fromkeys(('recorded', 'flushes', 'flushed_accesses', 'dropped_questions',
+                                    'flush_errors'), 0)
+        self.last_flush_at: Optional[float] = None
+        self.last_flush_ms = 0.0
+        self.stopped = False
+
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def record(self, question_id: int, is_cache_hit: bool = False):
+
+        self.record_many({question_id: (1, 1 if is_cache_hit else 0)})
+
+    def record_many(self, counts: Dict[int, Tuple[int, int]]):
+
+        # counts: pregunta → (accesos, cache hits), ya agregados por quien llama
+        now = time.monotonic()
+        with self.lock:
+            for question_id, (accesses, hits) in counts.items():
+                entry = self.pending.get(question_id)
+                if entry is None:
+                    entry = self.pending[question_id] = [0, 0, now]
+                    if self.oldest_pending is None:
+                        self.oldest_pending = now
+                entry[0] += accesses
+                entry[1] += hits
+                entry[2] = now
+                self.stats['recorded'] += accesses
+            full = len(self.pending) >= self.max_pending
+        if full:
+            self.wakeup.set()
+
+    def _restore(self, pending: Dict[int, List[float]], oldest: float):
+
+        with self.lock:
+            for question_id, (accesses, hits, last_seen) in pending.items():
+                entry = self.pending.setdefault(question_id, [0, 0, last_seen])
+                entry[0] += accesses
+                entry[1] += hits
+                entry[2] = max(entry[2], last_seen)
+            self.oldest_pending = min(oldest, self.oldest_pending or oldest)
+
+    def flush(self) -> int:
+
+        with self.flush_lock:
+            with self.lock:
+                pending, self.pending = self.pending, {}
+                oldest, self.oldest_pending = self.oldest_pending, None
+            if not pending:
+                return 0
+
+            now = time.monotonic()
+            question_ids = sorted(pending)
+            start = time.perf_counter()
+            try:
+                with self.db_manager.get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(FLUSH_ACCESS_SQL, (
+                            question_ids,
+                            [pending[question_id][0] for question_id in question_ids],
+                            [pending[question_id][1] for question_id in question_ids],
+                            [now - pending[question_id][2] for question_id in question_ids]
+                        ))
+                        applied = cursor.rowcount
+            except Exception as e:
+                # Los deltas vuelven al buffer y se reintentan en el próximo flush
+                self._restore(pending, oldest)
+                with self.lock:
+                    self.stats['flush_errors'] += 1
+                logger.error(f"Error escribiendo contadores de acceso de {len(pending)} preguntas: {e}")
+                return 0
+
+            dropped = len(question_ids) - applied
+            if dropped:
+                logger.warning(f"{dropped} preguntas inexistentes descartadas al escribir contadores de acceso")
+            with self.lock:
+                self.stats['flushes'] += 1
+                self.stats['flushed_accesses'] += sum(entry[0] for entry in pending.values())
+                self.stats['dropped_questions'] += dropped
+                self.last_flush_at = time.monotonic()
+                self.last_flush_ms = (time.perf_counter() - start) * 1000
+            return applied
+
+    def _flush_loop(self):
+
+        while not self.stopped:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def close(self):
+
+        self.stopped = True
+        self.wakeup.set()
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        now = time.monotonic()
+        with self.lock:
+            stats = dict(self.stats)
+            stats.update({
+                'flush_interval_s': self.flush_interval,
+                'pending_questions': len(self.pending),
+                'pending_accesses': sum(entry[0] for entry in self.pending.values()),
+                'lag_s': round(now - self.oldest_pending, 3) if self.oldest_pending is not None else 0,
+                'last_flush_ago_s': round(now - self.last_flush_at, 3) if self.last_flush_at is not None else None,
+                'last_flush_ms': round(self.last_flush_ms, 3)
+            })
+        return stats
+
 class DatabaseManager:
     def __init__(self):
         self.db_config = {
@@ -22,93 +476,481 @@ class DatabaseManager:
             'user': os.getenv('DB_USER', 'admin'),
             'password': os.getenv('DB_PASSWORD', 'password')
         }
+        self.pool = ConnectionPool(self.db_config, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT,
+                                   DB_POOL_CHECK_INTERVAL, DB_POOL_MAX_LIFETIME)
+        logger.info(f"Pool de conexiones a PostgreSQL (min={self.pool.min_size}, max={self.pool.max_size})")
+        self.sampler = RandomSampler(self, RANDOM_SAMPLER_REFRESH)
+        self.stats_lock = threading.Lock()
+        self.stats_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        self.access_buffer = None
+        if ACCESS_WRITE_BEHIND:
+            self.access_buffer = AccessCounterBuffer(self, ACCESS_FLUSH_INTERVAL, ACCESS_FLUSH_MAX_PENDING)
+            atexit.register(self.access_buffer.close)
+            logger.info(f"Contadores de acceso en write-behind (flush cada {ACCESS_FLUSH_INTERVAL}s)")
+        if STATS_ROLLUP_INTERVAL > 0:
+            threading.Thread(target=self._stats_rollup_loop, daemon=True).start()
 
     def get_connection(self):
-        return psycopg2.connect(**self.db_config, cursor_factory=RealDictCursor)
+        return self.pool.connection()
+
+    def _execute_prepared(self, cursor, name: str, params: Tuple):
+
+        conn = cursor.connection
+        if name not in conn.prepared:
+            types, sql = PREPARED_STATEMENTS[name]
+            cursor.execute(f"PREPARE {name} ({types}) AS {sql}")
+            conn.prepared.add(name)
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+    def get_random_question(self, class_id: Optional[int] = None) -> Optional[Dict]:
+
+        questions = self.get_random_questions(1, class_id)
+        return questions[0] if questions else None
 
-    def get_random_question(self) -> Optional[Dict]:
+    def get_random_questions(self, n: int, class_id: Optional[int] = None,
+                             stratified: bool = False) -> Optional[List[Dict]]:
+
+        try:
+            question_ids = self.sampler.sample(n, class_id, stratified)
+        except Exception as e:
+            logger.error(f"Error muestreando preguntas aleatorias: {e}")
+            return None
+        if len(question_ids) == 1:
+            question = self.get_question_by_id(question_ids[0])
+            return [question] if question else []
+        if not question_ids:
+            return []
+
+        questions = self.get_questions_by_ids(question_ids)
+        if questions is None:
+            return None
+        position = {question_id: index for index, question_id in enumerate(question_ids)}
+        return sorted(questions, key=lambda question: position[question['id']])
+
+    def _extract_stored_response(self, row: Dict) -> Dict:
+
+        question = dict(row)
+        llm_response = question.pop('llm_response')
+        stored_response = {
+            'llm_response': llm_response,
+            'quality_score': question.pop('quality_score'),
+            'response_time_ms': question.pop('response_time_ms'),
+            'llm_model': question.pop('llm_model'),
+            'score_details': question.pop('score_details'),
+            'created_at': question.pop('response_created_at')
+        }
+        if stored_response['quality_score'] is not None:
+            stored_response['quality_score'] = float(stored_response['quality_score'])
+        question['stored_response'] = stored_response if llm_response is not None else None
+        return question
+
+    def _stored_response_sql(self, response_filter: Optional[Dict]) -> Tuple[str, str]:
+
+        if response_filter is None:
+            return "", ""
+        return STORED_RESPONSE_COLUMNS, STORED_RESPONSE_JOIN
+
+    def get_question_by_id(self, question_id: int, response_filter: Optional[Dict] = None) -> Optional[Dict]:
+
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    if response_filter is None:
+                        self._execute_prepared(cursor, 'question_by_id', (question_id,))
+                    else:
+                        self._execute_prepared(cursor, 'question_by_id_with_response', (
+                            question_id, response_filter['min_quality'], response_filter['max_age']))
+                    result = cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Error obteniendo pregunta {question_id}: {e}")
+            return None
+
+        if not result:
+            return None
+        return self._extract_stored_response(result) if response_filter is not None else dict(result)
+
+    def _bulk_filter(self, question_ids: Iterable[int], ranges: Sequence[Tuple[int, int]]) -> Tuple[str, Dict]:
+
+        # Un BETWEEN por rango (no se expanden a IDs): cada uno es un recorrido del índice de la PK
+        conditions = ["yq.id = ANY(%(question_ids)s)"]
+        params = {'question_ids': list(question_ids)}
+        for index, (start, end) in enumerate(ranges):
+            conditions.append(f"yq.id BETWEEN %(range_start_{index})s AND %(range_end_{index})s")
+            params[f"range_start_{index}"] = start
+            params[f"range_end_{index}"] = end
+        return " OR ".join(conditions), params
+
+    def get_questions_by_ids(self, question_ids: Iterable[int], response_filter: Optional[Dict] = None,
+                             ranges: Sequence[Tuple[int, int]] = ()) -> Optional[List[Dict]]:
+
+        response_columns, response_join = self._stored_response_sql(response_filter)
+        where, params = self._bulk_filter(question_ids, ranges)
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT id, yahoo_id, class_id, title, question, best_answer
-                        FROM yahoo_questions 
-                        ORDER BY RANDOM() 
-                        LIMIT 1
-                    Obtener pregunta por ID"""
+                    cursor.execute(f"""
+                        SELECT yq.id, yq.yahoo_id, yq.class_id, yq.title, yq.question, yq.best_answer{response_columns}
+                        FROM yahoo_questions yq{response_join}
+                        WHERE {where}
+                    """, dict(response_filter or {}, **params))
+                    rows = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error obteniendo {len(params['question_ids'])} preguntas y {len(ranges)} rangos: {e}")
+            return None
+
+        if response_filter is not None:
+            return [self._extract_stored_response(row) for row in rows]
+        return [dict(row) for row in rows]
+
+    def iter_questions_by_ids(self, question_ids: Iterable[int], response_filter: Optional[Dict] = None,
+                              ranges: Sequence[Tuple[int, int]] = (),
+                              batch_size: int = BULK_STREAM_BATCH) -> Iterator[Dict]:
+
+        # Cursor del lado del servidor: se traen `batch_size` filas por vez, así la memoria
+        # no crece con el tamaño del lote aunque se pidan cientos de miles de preguntas
+        response_columns, response_join = self._stored_response_sql(response_filter)
+        where, params = self._bulk_filter(question_ids, ranges)
+        with self.get_connection() as conn:
+            with conn.cursor(name='bulk_questions') as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(f"""
+                    SELECT yq.id, yq.yahoo_id, yq.class_id, yq.title, yq.question, yq.best_answer{response_columns}
+                    FROM yahoo_questions yq{response_join}
+                    WHERE {where}
+                    ORDER BY yq.id
+                """, dict(response_filter or {}, **params))
+                for row in cursor:
+                    yield self._extract_stored_response(row) if response_filter is not None else dict(row)
+
+    def get_top_questions(self, limit: int, response_filter: Optional[Dict] = None) -> Optional[List[Dict]]:
+
+        response_columns, response_join = self._stored_response_sql(response_filter)
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT id, yahoo_id, class_id, title, question, best_answer
-                        FROM yahoo_questions 
-                        WHERE id = %s
-                    Incrementar contador de acceso a pregunta"""
+                    cursor.execute(f"""
+                        SELECT yq.id, yq.yahoo_id, yq.class_id, yq.title, yq.question, yq.best_answer,
+                               qs.access_count, qs.last_accessed{response_columns}
+                        FROM question_stats qs
+                        JOIN yahoo_questions yq ON yq.id = qs.question_id{response_join}
+                        WHERE qs.access_count > 0
+                        ORDER BY qs.access_count DESC, qs.last_accessed DESC
+                        LIMIT %(limit)s
+                    """, dict(response_filter or {}, limit=limit))
+                    rows = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error obteniendo preguntas más accedidas: {e}")
+            return None
+
+        if response_filter is not None:
+            return [self._extract_stored_response(row) for row in rows]
+        return [dict(row) for row in rows]
+
+    def increment_access_count(self, question_id: int, is_cache_hit: bool = False):
+
+        if self.access_buffer is not None:
+            self.access_buffer.record(question_id, is_cache_hit)
+            return
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    if is_cache_hit:
-                        cursor.execute("""
-                            UPDATE question_stats 
-                            SET access_count = access_count + 1,
-                                cache_hits = cache_hits + 1,
-                                last_accessed = CURRENT_TIMESTAMP
-                            WHERE question_id = %s
-                        
-                            UPDATE question_stats 
-                            SET access_count = access_count + 1,
-                                last_accessed = CURRENT_TIMESTAMP
-                            WHERE question_id = %s
-                        
-                            INSERT INTO question_stats (question_id, access_count, cache_hits)
-                            VALUES (%s, 1, %s)
-                        Guardar respuesta del LLM"""
+                    self._execute_prepared(cursor, 'record_access', (question_id, 1 if is_cache_hit else 0))
+        except Exception as e:
+            logger.error(f"Error incrementando acceso de pregunta {question_id}: {e}")
+
+    def increment_access_counts(self, counts: Dict[int, Tuple[int, int]]):
+
+        if self.access_buffer is not None:
+            self.access_buffer.record_many(counts)
+            return
+        question_ids = sorted(counts)
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
-                        INSERT INTO llm_responses (question_id, llm_response, quality_score, 
-                                                 response_time_ms, llm_model)
-                        VALUES (%s, %s, %s, %s, %s)
-                    Obtener estadísticas de la base de datos"""
+                    cursor.execute(FLUSH_ACCESS_SQL, (
+                        question_ids,
+                        [counts[question_id][0] for question_id in question_ids],
+                        [counts[question_id][1] for question_id in question_ids],
+                        [0.0] * len(question_ids)
+                    ))
+        except Exception as e:
+            logger.error(f"Error incrementando accesos de {len(question_ids)} preguntas: {e}")
+
+    def save_llm_response(self, question_id: int, llm_response: str, quality_score: Optional[float] = None,
+                          response_time_ms: Optional[int] = None, llm_model: str = 'gemini',
+                          score_details: Optional[Dict] = None) -> bool:
+
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    stats = {}
+                    self._execute_prepared(cursor, 'save_llm_response', (
+                        question_id, llm_response, quality_score, response_time_ms, llm_model,
+                        Json(score_details) if score_details is not None else None))
+                    return True
+        except Exception as e:
+            logger.error(f"Error guardando respuesta LLM de pregunta {question_id}: {e}")
+            return False
+
+    def _read_stats_summary(self, cursor) -> Optional[Dict[str, Any]]:
+
+        # Resumen consolidado más los deltas que aún no consolidó _stats_rollup_loop
+        cursor.execute("""
+            SELECT s.total_questions + d.total_questions AS total_questions,
+                   s.total_llm_responses + d.total_llm_responses AS total_llm_responses,
+                   s.quality_score_sum + d.quality_score_sum AS quality_score_sum,
+                   s.quality_score_count + d.quality_score_count AS quality_score_count,
+                   s.stats_rows + d.stats_rows AS stats_rows,
+                   s.total_accesses + d.total_accesses AS total_accesses,
+                   s.total_cache_hits + d.total_cache_hits AS total_cache_hits
+            FROM storage_stats_summary s, (
+                SELECT COALESCE(SUM(total_questions), 0)::bigint AS total_questions,
+                       COALESCE(SUM(total_llm_responses), 0)::bigint AS total_llm_responses,
+                       COALESCE(SUM(quality_score_sum), 0) AS quality_score_sum,
+                       COALESCE(SUM(quality_score_count), 0)::bigint AS quality_score_count,
+                       COALESCE(SUM(stats_rows), 0)::bigint AS stats_rows,
+                       COALESCE(SUM(total_accesses), 0)::bigint AS total_accesses,
+                       COALESCE(SUM(total_cache_hits), 0)::bigint AS total_cache_hits
+                FROM storage_stats_deltas
+            ) d
+        """)
+        summary = cursor.fetchone()
+        if summary is None:
+            return None
+        return {
+            'total_questions': summary['total_questions'],
+            'total_llm_responses': summary['total_llm_responses'],
+            'total_accesses': int(summary['total_accesses']),
+            'total_cache_hits': int(summary['total_cache_hits']),
+            'avg_accesses_per_question': (float(summary['total_accesses']) / summary['stats_rows']
+                                          if summary['stats_rows'] else 0.0),
+            'avg_quality_score': (float(summary['quality_score_sum']) / summary['quality_score_count']
+                                  if summary['quality_score_count'] else None),
+            'stats_source': 'summary'
+        }
+
+    def _estimate_stats(self, cursor) -> Dict[str, Any]:
+
+        # Sin tabla de resumen (base creada antes de init.sql actual): conteos estimados
+        # desde pg_class, actualizados por ANALYZE/autovacuum, y agregados en vivo
+        cursor.execute("""
+            SELECT relname, GREATEST(reltuples, 0)::bigint AS estimate
+            FROM pg_class
+            WHERE relname IN ('yahoo_questions', 'llm_responses') AND relkind = 'r'
+        """)
+        estimates = {row['relname']: row['estimate'] for row in cursor.fetchall()}
+        cursor.execute("""
+            SELECT
+                SUM(access_count) as total_accesses,
+                SUM(cache_hits) as total_cache_hits,
+                AVG(access_count) as avg_accesses_per_question
+            FROM question_stats
+        """)
+        access_stats = cursor.fetchone()
+        cursor.execute("SELECT AVG(quality_score) AS avg_quality_score FROM llm_responses")
+        avg_quality_score = cursor.fetchone()['avg_quality_score']
+        return {
+            'total_questions': estimates.get('yahoo_questions', 0),
+            'total_llm_responses': estimates.get('llm_responses', 0),
+            'total_accesses': int(access_stats['total_accesses'] or 0),
+            'total_cache_hits': int(access_stats['total_cache_hits'] or 0),
+            'avg_accesses_per_question': float(access_stats['avg_accesses_per_question'] or 0),
+            'avg_quality_score': float(avg_quality_score) if avg_quality_score is not None else None,
+            'stats_source': 'estimate'
+        }
 
-                    cursor.execute("SELECT COUNT(*) FROM yahoo_questions")
-                    stats['total_questions'] = cursor.fetchone()[0]
+    def _stats_rollup_loop(self):
 
-                    cursor.execute("SELECT COUNT(*) FROM llm_responses")
-                    stats['total_llm_responses'] = cursor.fetchone()[0]
+        # Consolida los deltas de los triggers en storage_stats_summary; varias réplicas
+        # pueden hacerlo a la vez porque cada fila de deltas se borra una sola vez
+        while True:
+            time.sleep(STATS_ROLLUP_INTERVAL)
+            try:
+                with self.get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT rollup_storage_stats_summary() AS moved")
+                        moved = cursor.fetchone()['moved']
+                if moved:
+                    logger.debug(f"Resumen de estadísticas consolidado: {moved} deltas")
+            except errors.UndefinedFunction:
+                logger.warning("rollup_storage_stats_summary() no existe (init.sql anterior), sin consolidar")
+                return
+            except Exception as e:
+                logger.warning(f"Error consolidando el resumen de estadísticas: {e}")
+
+    def get_database_stats(self) -> Dict[str, Any]:
+
+        # /stats se consulta en bucle (monitor_cache.sh, servicio de score): una sola
+        # lectura a PostgreSQL cada STATS_CACHE_TTL segundos por proceso
+        cached = self.stats_cache
+        if cached is not None and time.monotonic() - cached[0] < STATS_CACHE_TTL:
+            return dict(cached[1])
+
+        with self.stats_lock:
+            cached = self.stats_cache
+            if cached is not None and time.monotonic() - cached[0] < STATS_CACHE_TTL:
+                return dict(cached[1])
+            try:
+                with self.get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        try:
+                            stats = self._read_stats_summary(cursor)
+                        except errors.UndefinedTable:
+                            conn.rollback()
+                            stats = None
+                        if stats is None:
+                            logger.warning("Tabla storage_stats_summary no disponible, usando estimaciones")
+                            stats = self._estimate_stats(cursor)
+            except Exception as e:
+                logger.error(f"Error obteniendo estadísticas: {e}")
+                return {"error": str(e)}
+
+            self.stats_cache = (time.monotonic(), stats)
+            return dict(stats)
+
+db_manager = DatabaseManager()
+
+def parse_response_filter(params) -> Optional[Dict]:
+
+    if str(params.get('include_response', 'false')).lower() != 'true':
+        return None
+    min_quality = params.get('min_quality')
+    max_age = params.get('max_age')
+    return {
+        'min_quality': float(min_quality) if min_quality is not None else None,
+        'max_age': float(max_age) if max_age is not None else None
+    }
+
+@app.route('/health', methods=['GET'])
+def health_check():
 
-                    cursor.execute("""
-                        SELECT 
-                            SUM(access_count) as total_accesses,
-                            SUM(cache_hits) as total_cache_hits,
-                            AVG(access_count) as avg_accesses_per_question
-                        FROM question_stats
-                    Health check endpoint"""
     return jsonify({"status": "healthy", "service": "storage"})
 
 @app.route('/question/random', methods=['GET'])
 def get_random_question():
     
-    question = db_manager.get_random_question()
-    if question:
-        return jsonify(question)
-    else:
-        return jsonify({"error": "No se pudo obtener pregunta"}), 500
+    n = request.args.get('n', type=int)
+    class_id = request.args.get('class_id', type=int)
+    stratified = request.args.get('stratified', 'false').lower() == 'true'
+
+    if n is None:
+        question = db_manager.get_random_question(class_id)
+        if question:
+            return jsonify(question)
+        else:
+            return jsonify({"error": "No se pudo obtener pregunta"}), 500
+
+    if not 1 <= n <= MAX_BULK_IDS:
+        return jsonify({"error": f"n debe estar entre 1 y {MAX_BULK_IDS}"}), 400
+    questions = db_manager.get_random_questions(n, class_id, stratified)
+    if questions is None:
+        return jsonify({"error": "Error obteniendo preguntas"}), 500
+    return jsonify({"questions": questions, "total": len(questions)})
 
 @app.route('/question/<int:question_id>', methods=['GET'])
 def get_question(question_id):
     
-    question = db_manager.get_question_by_id(question_id)
+    try:
+        response_filter = parse_response_filter(request.args)
+    except ValueError:
+        return jsonify({"error": "min_quality y max_age deben ser numéricos"}), 400
+
+    question = db_manager.get_question_by_id(question_id, response_filter)
     if question:
         return jsonify(question)
     else:
         return jsonify({"error": "Pregunta no encontrada"}), 404
 
+def parse_bulk_ranges(raw) -> List[Tuple[int, int]]:
+
+    if raw is None:
+        return []
+    if not isinstance(raw, list) or len(raw) > MAX_BULK_RANGES:
+        raise ValueError(f"ranges debe ser una lista de hasta {MAX_BULK_RANGES} pares [inicio, fin]")
+    ranges = []
+    for item in raw:
+        if (not isinstance(item, list) or len(item) != 2 or not all(isinstance(i, int) for i in item)
+                or item[0] > item[1]):
+            raise ValueError("Cada rango debe ser un par de enteros [inicio, fin] con inicio <= fin")
+        ranges.append((item[0], item[1]))
+    return ranges
+
+def stream_questions(question_ids: List[int], ranges: List[Tuple[int, int]], response_filter: Optional[Dict]):
+
+    # NDJSON: una pregunta por línea y al final una línea con los IDs pedidos que no existen
+    requested = set(question_ids)
+    found = set()
+    total = 0
+    try:
+        for question in db_manager.iter_questions_by_ids(requested, response_filter, ranges):
+            if question['id'] in requested:
+                found.add(question['id'])
+            total += 1
+            yield app.json.dumps(question) + "\n"
+    except Exception as e:
+        logger.error(f"Error transmitiendo preguntas tras {total} filas: {e}")
+        yield app.json.dumps({"error": "Error obteniendo preguntas", "total": total}) + "\n"
+        return
+    yield app.json.dumps({
+        "total": total,
+        "missing": [i for i in dict.fromkeys(question_ids) if i not in found]
+    }) + "\n"
+
+@app.route('/questions/bulk', methods=['POST'])
+def get_questions_bulk():
+
+    data = request.get_json() or {}
+    question_ids = data.get('ids', [])
+
+    if not isinstance(question_ids, list) or not all(isinstance(i, int) for i in question_ids):
+        return jsonify({"error": "Se requiere una lista de IDs enteros"}), 400
+    try:
+        ranges = parse_bulk_ranges(data.get('ranges'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not question_ids and not ranges:
+        return jsonify({"error": "Se requiere una lista de IDs enteros o de rangos"}), 400
+
+    stream = data.get('stream') is True or request.accept_mimetypes.best_match(
+        ['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+    requested = len(question_ids) + sum(end - start + 1 for start, end in ranges)
+    if stream and requested > MAX_BULK_STREAM_IDS:
+        return jsonify({"error": f"Máximo {MAX_BULK_STREAM_IDS} IDs por solicitud"}), 400
+    if not stream and requested > MAX_BULK_IDS:
+        return jsonify({"error": f"Máximo {MAX_BULK_IDS} IDs por solicitud "
+                                 f"(hasta {MAX_BULK_STREAM_IDS} con stream o Accept: application/x-ndjson)"}), 400
+
+    try:
+        response_filter = parse_response_filter(data)
+    except (TypeError, ValueError):
+        return jsonify({"error": "min_quality y max_age deben ser numéricos"}), 400
+
+    if stream:
+        return Response(stream_questions(question_ids, ranges, response_filter), mimetype='application/x-ndjson')
+
+    questions = db_manager.get_questions_by_ids(set(question_ids), response_filter, ranges)
+    if questions is None:
+        return jsonify({"error": "Error obteniendo preguntas"}), 500
+
+    found = {question['id'] for question in questions}
+    return jsonify({
+        "questions": questions,
+        "missing": [i for i in dict.fromkeys(question_ids) if i not in found]
+    })
+
+@app.route('/questions/top', methods=['GET'])
+def get_top_questions():
+
+    limit = min(request.args.get('limit', 100, type=int), MAX_TOP_QUESTIONS)
+    try:
+        response_filter = parse_response_filter(request.args)
+    except ValueError:
+        return jsonify({"error": "min_quality y max_age deben ser numéricos"}), 400
+
+    questions = db_manager.get_top_questions(limit, response_filter)
+    if questions is None:
+        return jsonify({"error": "Error obteniendo preguntas"}), 500
+    return jsonify({"questions": questions, "total": len(questions)})
+
 @app.route('/question/<int:question_id>/access', methods=['POST'])
 def increment_access(question_id):
     
@@ -118,6 +960,32 @@ def increment_access(question_id):
     db_manager.increment_access_count(question_id, is_cache_hit)
     return jsonify({"success": True})
 
+@app.route('/questions/access', methods=['POST'])
+def increment_access_bulk():
+
+    # Lote de accesos ya agregados por el cache: [{"question_id", "count", "cache_hits"}, ...]
+    data = request.get_json() or {}
+    accesses = data.get('accesses')
+    if not isinstance(accesses, list) or len(accesses) > MAX_BULK_IDS:
+        return jsonify({"error": f"Se requiere una lista de hasta {MAX_BULK_IDS} accesos"}), 400
+
+    counts = {}
+    for access in accesses:
+        if not isinstance(access, dict):
+            return jsonify({"error": "Cada acceso debe ser un objeto"}), 400
+        question_id = access.get('question_id')
+        count = access.get('count', 1)
+        cache_hits = access.get('cache_hits', 0)
+        if not all(isinstance(value, int) and not isinstance(value, bool)
+                   for value in (question_id, count, cache_hits)) or not 0 <= cache_hits <= count:
+            return jsonify({"error": "question_id, count y cache_hits deben ser enteros (0 <= cache_hits <= count)"}), 400
+        previous = counts.get(question_id, (0, 0))
+        counts[question_id] = (previous[0] + count, previous[1] + cache_hits)
+
+    if counts:
+        db_manager.increment_access_counts(counts)
+    return jsonify({"success": True, "questions": len(counts)})
+
 @app.route('/llm-response', methods=['POST'])
 def save_response():
     
@@ -132,7 +1000,8 @@ def save_response():
         llm_response=data['llm_response'],
         quality_score=data.get('quality_score'),
         response_time_ms=data.get('response_time_ms'),
-        llm_model=data.get('llm_model', 'gemini')
+        llm_model=data.get('llm_model', 'gemini'),
+        score_details=data.get('score_details')
     )
     
     if success:
@@ -144,7 +1013,13 @@ def save_response():
 def get_stats():
     
     stats = db_manager.get_database_stats()
+    stats['connection_pool'] = db_manager.pool.get_stats()
+    stats['random_sampler'] = db_manager.sampler.get_stats()
+    if db_manager.access_buffer is not None:
+        stats['access_write_behind'] = db_manager.access_buffer.get_stats()
     return jsonify(stats)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=True)
+    # El reloader de Werkzeug importa el módulo también en el proceso padre, que abriría
+    # un segundo pool de conexiones a PostgreSQL y su propio flusher de accesos
+    app.run(host='0.0.0.0', port=8000, debug=True, use_reloader=False)
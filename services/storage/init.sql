@@ -23,8 +23,10 @@ CREATE TABLE IF NOT EXISTS llm_responses (
     quality_score DECIMAL(5,4), -- Score de 0.0000 a 1.0000
     response_time_ms INTEGER,
     llm_model VARCHAR(100),
+    score_details JSONB, -- Métricas del score service además del compuesto (cosine, BLEU, ...)
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+ALTER TABLE llm_responses ADD COLUMN IF NOT EXISTS score_details JSONB;
 
 -- Tabla para contabilizar accesos y cache hits
 CREATE TABLE IF NOT EXISTS question_stats (
@@ -52,6 +54,9 @@ CREATE INDEX IF NOT EXISTS idx_llm_responses_question ON llm_responses(question_
 CREATE INDEX IF NOT EXISTS idx_llm_responses_created ON llm_responses(created_at);
 CREATE INDEX IF NOT EXISTS idx_question_stats_question ON question_stats(question_id);
 CREATE INDEX IF NOT EXISTS idx_question_stats_accessed ON question_stats(last_accessed);
+CREATE INDEX IF NOT EXISTS idx_question_stats_top ON question_stats(access_count DESC, last_accessed DESC);
+-- Última respuesta por pregunta (precarga del cache y segundo nivel ante misses)
+CREATE INDEX IF NOT EXISTS idx_llm_responses_question_created ON llm_responses(question_id, created_at DESC);
 
 -- Función para actualizar timestamp de updated_at
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -83,7 +88,175 @@ WHERE NOT EXISTS (
     SELECT 1 FROM question_stats WHERE question_id = yahoo_questions.id
 );
 
--- Vista para consultas optimizadas
+-- Resumen de estadísticas mantenido por triggers a nivel de sentencia: /stats lo lee
+-- en O(1) en vez de recorrer yahoo_questions, llm_responses y question_stats
+CREATE TABLE IF NOT EXISTS storage_stats_summary (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    total_questions BIGINT NOT NULL DEFAULT 0,
+    total_llm_responses BIGINT NOT NULL DEFAULT 0,
+    quality_score_sum NUMERIC NOT NULL DEFAULT 0,
+    quality_score_count BIGINT NOT NULL DEFAULT 0,
+    stats_rows BIGINT NOT NULL DEFAULT 0,
+    total_accesses BIGINT NOT NULL DEFAULT 0,
+    total_cache_hits BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Los triggers solo agregan una fila de deltas por sentencia: los escritores no compiten
+-- por la fila del resumen. El servicio de storage las consolida periódicamente con
+-- rollup_storage_stats_summary() y /stats suma resumen + deltas pendientes
+CREATE TABLE IF NOT EXISTS storage_stats_deltas (
+    total_questions BIGINT NOT NULL DEFAULT 0,
+    total_llm_responses BIGINT NOT NULL DEFAULT 0,
+    quality_score_sum NUMERIC NOT NULL DEFAULT 0,
+    quality_score_count BIGINT NOT NULL DEFAULT 0,
+    stats_rows BIGINT NOT NULL DEFAULT 0,
+    total_accesses BIGINT NOT NULL DEFAULT 0,
+    total_cache_hits BIGINT NOT NULL DEFAULT 0
+);
+
+-- Recalcula el resumen desde cero (inicialización, TRUNCATE o reparación manual); el lock
+-- frena a los escritores hasta el commit para que ningún delta quede contado dos veces
+CREATE OR REPLACE FUNCTION refresh_storage_stats_summary()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE storage_stats_deltas IN EXCLUSIVE MODE;
+    DELETE FROM storage_stats_deltas;
+    INSERT INTO storage_stats_summary (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+    UPDATE storage_stats_summary SET
+        total_questions = (SELECT COUNT(*) FROM yahoo_questions),
+        (total_llm_responses, quality_score_sum, quality_score_count) = (
+            SELECT COUNT(*), COALESCE(SUM(quality_score), 0), COUNT(quality_score) FROM llm_responses),
+        (stats_rows, total_accesses, total_cache_hits) = (
+            SELECT COUNT(*), COALESCE(SUM(access_count), 0), COALESCE(SUM(cache_hits), 0) FROM question_stats),
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ language 'plpgsql';
+
+-- Traslada los deltas pendientes al resumen en una sola sentencia; devuelve cuántos consolidó
+CREATE OR REPLACE FUNCTION rollup_storage_stats_summary()
+RETURNS BIGINT AS $$
+DECLARE
+    moved BIGINT;
+BEGIN
+    WITH deltas AS (
+        DELETE FROM storage_stats_deltas RETURNING *
+    ), totals AS (
+        SELECT COUNT(*) AS moved,
+               COALESCE(SUM(total_questions), 0) AS total_questions,
+               COALESCE(SUM(total_llm_responses), 0) AS total_llm_responses,
+               COALESCE(SUM(quality_score_sum), 0) AS quality_score_sum,
+               COALESCE(SUM(quality_score_count), 0) AS quality_score_count,
+               COALESCE(SUM(stats_rows), 0) AS stats_rows,
+               COALESCE(SUM(total_accesses), 0) AS total_accesses,
+               COALESCE(SUM(total_cache_hits), 0) AS total_cache_hits
+        FROM deltas
+    )
+    UPDATE storage_stats_summary s SET
+        total_questions = s.total_questions + t.total_questions,
+        total_llm_responses = s.total_llm_responses + t.total_llm_responses,
+        quality_score_sum = s.quality_score_sum + t.quality_score_sum,
+        quality_score_count = s.quality_score_count + t.quality_score_count,
+        stats_rows = s.stats_rows + t.stats_rows,
+        total_accesses = s.total_accesses + t.total_accesses,
+        total_cache_hits = s.total_cache_hits + t.total_cache_hits,
+        updated_at = CURRENT_TIMESTAMP
+    FROM totals t
+    WHERE t.moved > 0
+    RETURNING t.moved INTO moved;
+    RETURN COALESCE(moved, 0);
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION summary_questions_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO storage_stats_deltas (total_questions)
+        SELECT COUNT(*) FROM new_rows HAVING COUNT(*) > 0;
+    ELSE
+        INSERT INTO storage_stats_deltas (total_questions)
+        SELECT -COUNT(*) FROM old_rows HAVING COUNT(*) > 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION summary_llm_responses_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO storage_stats_deltas (total_llm_responses, quality_score_sum, quality_score_count)
+        SELECT COUNT(*), COALESCE(SUM(quality_score), 0), COUNT(quality_score)
+        FROM new_rows HAVING COUNT(*) > 0;
+    ELSE
+        INSERT INTO storage_stats_deltas (total_llm_responses, quality_score_sum, quality_score_count)
+        SELECT -COUNT(*), -COALESCE(SUM(quality_score), 0), -COUNT(quality_score)
+        FROM old_rows HAVING COUNT(*) > 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Un flush del write-behind de accesos es una sola sentencia, así que genera una sola
+-- fila de deltas por lote y no una por pregunta
+CREATE OR REPLACE FUNCTION summary_question_stats_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO storage_stats_deltas (stats_rows, total_accesses, total_cache_hits)
+        SELECT COUNT(*), COALESCE(SUM(access_count), 0), COALESCE(SUM(cache_hits), 0)
+        FROM new_rows HAVING COUNT(*) > 0;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO storage_stats_deltas (total_accesses, total_cache_hits)
+        SELECT n.accesses - o.accesses, n.hits - o.hits
+        FROM (SELECT COUNT(*) AS rows, COALESCE(SUM(access_count), 0) AS accesses,
+                     COALESCE(SUM(cache_hits), 0) AS hits FROM new_rows) n,
+             (SELECT COALESCE(SUM(access_count), 0) AS accesses, COALESCE(SUM(cache_hits), 0) AS hits
+              FROM old_rows) o
+        WHERE n.rows > 0;
+    ELSE
+        INSERT INTO storage_stats_deltas (stats_rows, total_accesses, total_cache_hits)
+        SELECT -COUNT(*), -COALESCE(SUM(access_count), 0), -COALESCE(SUM(cache_hits), 0)
+        FROM old_rows HAVING COUNT(*) > 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- TRUNCATE no dispara triggers de DELETE: se recalcula el resumen completo
+CREATE OR REPLACE FUNCTION summary_table_truncated()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_storage_stats_summary();
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE TRIGGER summary_questions_insert AFTER INSERT ON yahoo_questions
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION summary_questions_changed();
+CREATE OR REPLACE TRIGGER summary_questions_delete AFTER DELETE ON yahoo_questions
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION summary_questions_changed();
+CREATE OR REPLACE TRIGGER summary_questions_truncate AFTER TRUNCATE ON yahoo_questions
+    FOR EACH STATEMENT EXECUTE FUNCTION summary_table_truncated();
+CREATE OR REPLACE TRIGGER summary_llm_responses_insert AFTER INSERT ON llm_responses
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION summary_llm_responses_changed();
+CREATE OR REPLACE TRIGGER summary_llm_responses_delete AFTER DELETE ON llm_responses
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION summary_llm_responses_changed();
+CREATE OR REPLACE TRIGGER summary_llm_responses_truncate AFTER TRUNCATE ON llm_responses
+    FOR EACH STATEMENT EXECUTE FUNCTION summary_table_truncated();
+CREATE OR REPLACE TRIGGER summary_question_stats_insert AFTER INSERT ON question_stats
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION summary_question_stats_changed();
+CREATE OR REPLACE TRIGGER summary_question_stats_update AFTER UPDATE ON question_stats
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION summary_question_stats_changed();
+CREATE OR REPLACE TRIGGER summary_question_stats_delete AFTER DELETE ON question_stats
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION summary_question_stats_changed();
+CREATE OR REPLACE TRIGGER summary_question_stats_truncate AFTER TRUNCATE ON question_stats
+    FOR EACH STATEMENT EXECUTE FUNCTION summary_table_truncated();
+
+SELECT refresh_storage_stats_summary();
+
 CREATE OR REPLACE VIEW question_with_stats AS
 SELECT 
     yq.id,
@@ -5,7 +5,6 @@ import os
 import time
 import random
 import logging
-import requests
 import threading
 from flask import Flask, jsonify, request
 from typing import Dict, List, Optional
@@ -14,6 +13,7 @@ from enum import Enum
 from concurrent.futures import ThreadPoolExecutor
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from common.service_client import ServiceClient, get_client_stats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -39,6 +39,7 @@ class TrafficGenerator:
 
         self.cache_url = os.getenv('CACHE_URL', 'http://cache:8000')
         self.storage_url = os.getenv('STORAGE_URL', 'http://storage:8000')
+        self.cache_client = ServiceClient.from_env('cache', self.cache_url, pool_size=10, read_timeout=30.0, retries=0)
 
         self.is_running = False
         self.total_requests = 0
@@ -150,10 +151,7 @@ class TrafficGenerator:
         start_time = time.time()
         
         try:
-            response = requests.get(
-                f"{self.cache_url}/question/{question_id}",
-                timeout=30
-            )
+            response = self.cache_client.get(f"/question/{question_id}")
             
             response_time = (time.time() - start_time) * 1000
             
@@ -267,7 +265,8 @@ class TrafficGenerator:
             'success_rate': self.successful_requests / self.total_requests if self.total_requests > 0 else 0,
             'elapsed_time': elapsed,
             'current_rate': current_rate,
-            'available_questions': len(self.question_ids)
+            'available_questions': len(self.question_ids),
+            'http_clients': get_client_stats()
         }
 
 traffic_generator = TrafficGenerator()